@@ -0,0 +1,465 @@
+"""
+Batch Engine Module
+
+This module defines the BatchEngine class, which steps thousands of independent games in lockstep
+with one vectorized update per tick. Every game is a row of the state arrays: Pacman's position and
+direction, the ghosts' positions and modes, the coin bitmap, the timers and the lives.
+
+The rules mirror the sprite-based Game pixel for pixel: Pacman's 20x20 rectangle collides with the
+27x27 wall, door and coin tiles exactly like pygame's rectangles do, the ghost collisions, pick-ups
+and the frightened timer follow Game.effects and apply_effect_to_tile, and the teleport wraps at the
+same coordinates. Everything that depends on Pacman's pixel position alone, the tiles he overlaps
+and whether he is inside a wall, is computed once into lookup tables over every pixel.
+
+The ghosts follow the rules of their classes, with numpy's random generator instead of the random
+module. Blinky keeps his direction until a wall is ahead, Clyde prefers his current direction,
+frightened Blinky and Clyde pick uniformly among the legal directions, and Pinky and Inky chase
+Pacman along shortest paths, Pinky only choosing a new target once the old one is reached. Paths
+are looked up in a next-direction table instead of being searched, so among paths of equal length
+the ghosts may pick a different one than the sprites do. The batch ghosts always move a pixel a
+tick, while frightened sprites keep their fractional speed of 0.8 in fixed point. The batch games
+play the first level only, with its 16 seconds of frightened mode.
+
+Attributes:
+    PINKY, BLINKY, INKY, CLYDE (int): The columns of the ghosts in the ghost arrays, in Game's order.
+    STOP (int): The direction index of a ghost that doesn't move.
+    GHOST_DIRECTIONS (numpy.ndarray): The (x, y) step of every ghost direction index, STOP last.
+    PACMAN_DIRECTIONS (numpy.ndarray): The (x, y) step of Pacman's directions (0: right, 1: left, 2: up, 3: down).
+
+Classes:
+    BatchEngine: Steps many games in lockstep on numpy arrays.
+        - reset: Puts every game back to its start.
+        - step: Advances every running game by one tick.
+        - run: Steps until every game is over or a number of ticks has passed.
+        - coin_board: Returns the pick-ups left in one game, shaped like Map.tile_types.
+
+Functions:
+    shortest_distances: Computes the length of the shortest path between every two tiles.
+    create_next_directions: Computes the first step of a shortest path between every two tiles.
+"""
+import numpy as np
+from Tiles.map import BOARD, MOVE_DIRECTIONS, DOOR_SHIFT, Map
+from Engine.timers import TICKS_PER_SECOND
+
+PINKY, BLINKY, INKY, CLYDE = range(4)
+STOP = 4
+GHOST_DIRECTIONS = np.array(MOVE_DIRECTIONS + [(0, 0)], dtype=np.int32)
+PACMAN_DIRECTIONS = np.array([(1, 0), (-1, 0), (0, -1), (0, 1)], dtype=np.int32)
+
+TILE = 27
+PACMAN_SIZE = 20
+WRAP_X = 800
+PACMAN_START = (15 * TILE - PACMAN_SIZE // 2, 24 * TILE - PACMAN_SIZE // 2)
+GHOST_STARTS = [(12 * TILE, 14 * TILE), (13 * TILE, 11 * TILE), (14 * TILE, 14 * TILE), (16 * TILE, 14 * TILE)]
+PINKY_FIRST_TARGET = (14, 12)
+HOUSE_EXITS = ((14, 12), (15, 12))
+# Pacman's top left corner moves at most this far outside of the board before the teleport
+PIXEL_MARGIN = 32
+# The set bits of every 4-bit mask, padded with STOP, and how many there are
+NTH_BIT = np.array([[bit for bit in range(4) if mask >> bit & 1] + [STOP] * (4 - bin(mask).count('1')) for mask in range(16)], dtype=np.int8)
+BIT_COUNT = np.array([bin(mask).count('1') for mask in range(16)], dtype=np.int8)
+UNREACHED = np.iinfo(np.int32).max
+
+def shortest_distances(walkable):
+    """
+    Computes the length of the shortest path between every two tiles with one breadth-first search
+    per target, all of them advanced together.
+
+    Parameters:
+        - walkable (numpy.ndarray): 2D boolean array indexed by (x, y), True for tiles the ghosts can walk on.
+
+    Returns:
+        - numpy.ndarray: distance[target cell, x, y], the number of steps from (x, y) to the target,
+          or UNREACHED.
+    """
+    width, height = walkable.shape
+    cells = width * height
+    distance = np.full((cells, width, height), UNREACHED, dtype=np.int32)
+    frontier = np.zeros((cells, width, height), dtype=bool)
+    targets = np.flatnonzero(walkable)
+    frontier.reshape(cells, cells)[targets, targets] = True
+    distance[frontier] = 0
+    steps = 0
+    while frontier.any():
+        steps += 1
+        reached = np.roll(frontier, 1, axis=1) | np.roll(frontier, -1, axis=1)
+        reached[:, :, :-1] |= frontier[:, :, 1:]
+        reached[:, :, 1:] |= frontier[:, :, :-1]
+        frontier = reached & walkable & (distance == UNREACHED)
+        distance[frontier] = steps
+    return distance
+
+def create_next_directions(walkable):
+    """
+    Computes the first step of a shortest path between every two tiles, teleport included.
+
+    Parameters:
+        - walkable (numpy.ndarray): 2D boolean array indexed by (x, y), True for tiles the ghosts can walk on.
+
+    Returns:
+        - numpy.ndarray: For every (start cell, target cell), with cell = x * height + y, the index in
+          MOVE_DIRECTIONS of the first step, or STOP if the tiles are equal or not connected.
+    """
+    distance = shortest_distances(walkable)
+    cells = walkable.size
+    flat = distance.reshape(cells, cells)
+    next_directions = np.full((cells, cells), STOP, dtype=np.int8)
+    # Earlier directions win ties, so fill them in last
+    for index in reversed(range(len(MOVE_DIRECTIONS))):
+        dx, dy = MOVE_DIRECTIONS[index]
+        neighbor = np.roll(distance, (-dx, -dy), axis=(1, 2))
+        if dy:
+            # Vertically there's no teleport, the rolled-in edge row is not a neighbor
+            neighbor[:, :, -1 if dy > 0 else 0] = UNREACHED
+        closer = (flat != UNREACHED) & (flat > 0) & (neighbor.reshape(cells, cells) == flat - 1)
+        next_directions[closer.T] = index
+    return next_directions
+
+class BatchEngine(): # pylint: disable=too-many-instance-attributes
+    """
+    Steps many independent games in lockstep on numpy arrays, one row per game.
+
+    Tiles are numbered as cells, cell = x * height + y, so a tile of every game is one column of the
+    cell arrays. The coin arrays have one extra cell that is always empty, which the lookup tables
+    use for tiles outside of the board.
+
+    Attributes:
+        - games (int): The number of games.
+        - tick (int): The number of ticks stepped since the last reset.
+        - pacman (numpy.ndarray): The top left corner of Pacman's rectangle, one (x, y) row per game.
+        - direction (numpy.ndarray): Pacman's direction in every game.
+        - ghosts (numpy.ndarray): The centers of the ghosts, shaped (games, ghosts, 2).
+        - ghost_direction (numpy.ndarray): The direction index of every ghost, STOP when standing.
+        - frightened (numpy.ndarray): Whether every ghost is frightened.
+        - outside (numpy.ndarray): Whether every ghost has left the ghost house.
+        - target (numpy.ndarray): The cell every ghost that chases Pacman heads for.
+        - coins (numpy.ndarray): The pick-ups left in every cell of every game: 1 for coins, 2 for power-ups.
+        - score, lives, remaining, timer (numpy.ndarray): The HUD counters of every game.
+        - vulnerable (numpy.ndarray): Whether the ghosts of every game are in frightened mode.
+        - countdown (numpy.ndarray): The ticks left before the frightened timer of every game goes down.
+        - died (numpy.ndarray): The lives Pacman lost in every game on the last tick.
+        - eaten (numpy.ndarray): Whether every ghost was eaten on the last tick.
+    """
+    def __init__(self, games, seed=None, ghosts=True):
+        """
+        Initializes a new instance of the BatchEngine class and builds its lookup tables.
+
+        Parameters:
+            - games (int): The number of games to step at once.
+            - seed (int): The seed of the ghosts' random generator.
+            - ghosts (bool): Include the four ghosts. Without them only Pacman's rules are simulated.
+        """
+        self.games = games
+        self.ghost_count = 4 if ghosts else 0
+        self.rng = np.random.default_rng(seed)
+        board = np.transpose(np.array(BOARD))
+        self.width, self.height = board.shape
+        self.walkable = board < 3
+        self.pickups = np.append(np.where((board == 1) | (board == 2), board, 0).ravel(), 0).astype(np.int8)
+        self.move_table = Map.create_move_table(np.transpose(board)).ravel()
+        self.next_directions = create_next_directions(self.walkable | (board == 9)) if ghosts else None
+        self.create_pixel_tables(board >= 3)
+        self.reset()
+
+    def create_pixel_tables(self, walls):
+        """
+        Precomputes, for every position of Pacman's top left corner, the cells his rectangle overlaps,
+        the cell the ghosts chase and whether he is inside a wall or the ghost door.
+
+        Parameters:
+            - walls (numpy.ndarray): 2D boolean array indexed by (x, y), True for walls and the ghost door.
+        """
+        xs = np.arange(-PIXEL_MARGIN, self.width * TILE + PIXEL_MARGIN)
+        ys = np.arange(-PIXEL_MARGIN, self.height * TILE + PIXEL_MARGIN)
+        # Tile j spans [27j - 13, 27j + 14) like the rectangle of a MapTile centered on 27j, so a
+        # rectangle [x, x + 20) overlaps the tiles from (x - 14) // 27 + 1 to (x + 32) // 27
+        columns = ((xs - 14) // TILE + 1, (xs + PACMAN_SIZE + 12) // TILE)
+        rows = ((ys - 14) // TILE + 1, (ys + PACMAN_SIZE + 12) // TILE)
+        walkable = np.append(self.walkable.ravel(), False)
+        shape = (len(xs), len(ys))
+        # pygame's sprite groups hold the tiles row by row, which is the order they are found in
+        self.overlaps = np.empty(shape + (4,), dtype=np.int16)
+        self.chased_cell = np.zeros(shape, dtype=np.int16)
+        self.blocked = np.zeros(shape, dtype=bool)
+        found = np.zeros(shape, dtype=bool)
+        for corner, (tile_rows, tile_columns) in enumerate((y, x) for y in rows for x in columns):
+            valid = ((tile_columns >= 0) & (tile_columns < self.width))[:, None] & ((tile_rows >= 0) & (tile_rows < self.height))[None, :]
+            cells = np.where(valid, tile_columns[:, None] * self.height + tile_rows[None, :], self.width * self.height)
+            self.overlaps[..., corner] = cells
+            self.blocked |= np.append(walls.ravel(), False)[cells]
+            first = walkable[cells] & ~found
+            self.chased_cell[first] = cells[first]
+            found |= first
+
+    def reset(self):
+        """
+        Puts every game back to its start.
+        """
+        games, count = self.games, self.ghost_count
+        self.tick = 0
+        self.pacman = np.tile(np.array(PACMAN_START, dtype=np.int32), (games, 1))
+        self.direction = np.zeros(games, dtype=np.int8)
+        self.ghosts = np.tile(np.array(GHOST_STARTS[:count], dtype=np.int32).reshape(count, 2), (games, 1, 1))
+        self.ghost_direction = np.full((games, count), STOP, dtype=np.int8)
+        self.frightened = np.zeros((games, count), dtype=bool)
+        self.outside = np.zeros((games, count), dtype=bool)
+        self.target = np.zeros((games, count), dtype=np.int32)
+        self.coins = np.tile(self.pickups, (games, 1))
+        self.score = np.zeros(games, dtype=np.int32)
+        self.lives = np.full(games, 3, dtype=np.int32)
+        self.remaining = np.full(games, int((self.pickups == 1).sum()), dtype=np.int32)
+        self.timer = np.zeros(games, dtype=np.int32)
+        self.vulnerable = np.zeros(games, dtype=bool)
+        self.countdown = np.zeros(games, dtype=np.int32)
+        self.died = np.zeros(games, dtype=np.int32)
+        self.eaten = np.zeros((games, count), dtype=bool)
+        if count:
+            self.respawn_ghosts(np.ones((games, count), dtype=bool))
+
+    def respawn_ghosts(self, respawned):
+        """
+        Puts ghosts back to their start, like their respawn methods.
+
+        Parameters:
+            - respawned (numpy.ndarray): Boolean array shaped (games, ghosts), True for the ghosts to respawn.
+        """
+        starts = np.broadcast_to(np.array(GHOST_STARTS, dtype=np.int32), self.ghosts.shape)
+        self.ghosts[respawned] = starts[respawned]
+        self.frightened[respawned] = False
+        self.outside[respawned] = False
+        self.ghost_direction[respawned] = STOP
+        blinky = np.flatnonzero(respawned[:, BLINKY])
+        self.outside[blinky, BLINKY] = True
+        self.ghost_direction[blinky, BLINKY] = self.rng.integers(0, 4, len(blinky))
+        self.ghost_direction[respawned[:, CLYDE], CLYDE] = MOVE_DIRECTIONS.index((1, 0))
+        self.target[respawned[:, PINKY], PINKY] = PINKY_FIRST_TARGET[0] * self.height + PINKY_FIRST_TARGET[1]
+
+    @property
+    def done(self):
+        """
+        Whether every game is over, won or lost. Like in Game, two ghosts caught at once cost two
+        lives, so a lost game can end below zero.
+        """
+        return (self.lives <= 0) | (self.remaining == 0)
+
+    def coin_board(self, game):
+        """
+        Returns the pick-ups left in one game, shaped like Map.tile_types.
+
+        Parameters:
+            - game (int): The row of the game.
+
+        Returns:
+            - numpy.ndarray: 1 for coins, 2 for power-ups and 0 elsewhere, indexed by (x, y).
+        """
+        return self.coins[game, :-1].reshape(self.width, self.height)
+
+    def step(self, directions=None):
+        """
+        Advances every running game by one tick, in the order of Game.run_game: Pacman's direction,
+        the moves of Pacman and the ghosts, then the effects.
+
+        Parameters:
+            - directions (numpy.ndarray): Pacman's new direction in every game, -1 to keep it. None keeps all.
+        """
+        running = ~self.done
+        if directions is not None:
+            directions = np.asarray(directions)
+            self.direction = np.where((directions >= 0) & running, directions, self.direction).astype(np.int8)
+        self.tick += 1
+        chased = self.chased_cell[self.pacman[:, 0] + PIXEL_MARGIN, self.pacman[:, 1] + PIXEL_MARGIN]
+        self.move_pacman(running)
+        if self.ghost_count:
+            self.move_ghosts(running, chased)
+            self.collide_ghosts(running)
+        self.pick_up(running)
+        self.count_down(running)
+
+    def move_pacman(self, running):
+        """
+        Moves Pacman one pixel, wrapping through the teleport and staying put in front of walls.
+
+        Parameters:
+            - running (numpy.ndarray): Whether every game is still running.
+        """
+        moved = self.pacman + PACMAN_DIRECTIONS[self.direction] * running[:, None]
+        # A center of -1 wraps to 800 and a center of 801 to 0
+        moved[:, 0] = (moved[:, 0] + PACMAN_SIZE // 2) % (WRAP_X + 1) - PACMAN_SIZE // 2
+        blocked = self.blocked[moved[:, 0] + PIXEL_MARGIN, moved[:, 1] + PIXEL_MARGIN]
+        self.pacman = np.where(blocked[:, None], self.pacman, moved)
+
+    def random_directions(self, masks):
+        """
+        Picks a uniformly random direction allowed by each mask.
+
+        Parameters:
+            - masks (numpy.ndarray): 4-bit masks of legal directions.
+
+        Returns:
+            - numpy.ndarray: The direction indices, STOP for empty masks.
+        """
+        picks = (self.rng.random(masks.shape) * BIT_COUNT[masks]).astype(np.int8)
+        return NTH_BIT[masks, picks]
+
+    def move_ghosts(self, running, chased):
+        """
+        Chooses new directions for the ghosts on the center of a tile and moves every ghost one pixel.
+
+        Parameters:
+            - running (numpy.ndarray): Whether every game is still running.
+            - chased (numpy.ndarray): The cell of Pacman before he moved, like pac_pos in Game.
+        """
+        x, y = self.ghosts[..., 0], self.ghosts[..., 1]
+        centered = (x % TILE == 0) & (y % TILE == 0) & running[:, None]
+        for ghost in range(self.ghost_count):
+            games = np.flatnonzero(centered[:, ghost])
+            if games.size == 0:
+                continue
+            cells = x[games, ghost] // TILE % self.width * self.height + y[games, ghost] // TILE
+            if ghost in (PINKY, INKY):
+                self.ghost_direction[games, ghost] = self.chase(ghost, games, cells, chased[games])
+            else:
+                self.ghost_direction[games, ghost] = self.wander(ghost, games, cells)
+        self.ghosts += GHOST_DIRECTIONS[self.ghost_direction] * running[:, None, None]
+        # A center of -1 wraps to 800 and a center of 801 to 0
+        self.ghosts[..., 0] %= WRAP_X + 1
+
+    def chase(self, ghost, games, cells, chased):
+        """
+        Chooses the next step of Pinky or Inky towards their target. Pinky keeps his target until he
+        reaches it, Inky heads for Pacman's current tile.
+
+        Parameters:
+            - ghost (int): PINKY or INKY.
+            - games (numpy.ndarray): The rows of the games where the ghost is on the center of a tile.
+            - cells (numpy.ndarray): The cell the ghost is on in each of these games.
+            - chased (numpy.ndarray): The cell of Pacman in each of these games.
+
+        Returns:
+            - numpy.ndarray: The direction indices.
+        """
+        targets = self.target[games, ghost]
+        if ghost == PINKY:
+            targets = np.where(cells == targets, chased, targets)
+        else:
+            targets = chased
+        self.target[games, ghost] = targets
+        return self.next_directions[cells, targets]
+
+    def wander(self, ghost, games, cells):
+        """
+        Chooses the next direction of Blinky or Clyde. Blinky keeps his direction until a wall is
+        ahead, Clyde draws from the legal directions with his current one listed three more times,
+        and frightened, both pick uniformly.
+
+        Parameters:
+            - ghost (int): BLINKY or CLYDE.
+            - games (numpy.ndarray): The rows of the games where the ghost is on the center of a tile.
+            - cells (numpy.ndarray): The cell the ghost is on in each of these games.
+
+        Returns:
+            - numpy.ndarray: The direction indices.
+        """
+        masks = self.move_table[cells].astype(np.int8)
+        if ghost == CLYDE:
+            exits = [exit_x * self.height + exit_y for exit_x, exit_y in HOUSE_EXITS]
+            self.outside[games, ghost] |= np.isin(cells, exits)
+        closed = masks & 0xF
+        legal = np.where(self.outside[games, ghost], closed, closed | masks >> DOOR_SHIFT)
+        current = self.ghost_direction[games, ghost]
+        if ghost == BLINKY:
+            ahead = (current != STOP) & (closed >> np.minimum(current, 3) & 1).astype(bool)
+            directions = np.where(ahead, current, self.random_directions(closed))
+        else:
+            keeps = (current != STOP) & (legal >> np.minimum(current, 3) & 1).astype(bool)
+            count = BIT_COUNT[legal]
+            picks = (self.rng.random(len(games)) * (count + 3 * keeps)).astype(np.int8)
+            directions = np.where(picks < count, NTH_BIT[legal, np.minimum(picks, 3)], np.where(keeps, current, STOP))
+        return np.where(self.frightened[games, ghost], self.random_directions(legal), directions)
+
+    def collide_ghosts(self, running):
+        """
+        Handles the ghosts touching Pacman: frightened ones are eaten, the others cost a life.
+
+        Parameters:
+            - running (numpy.ndarray): Whether every game is still running.
+        """
+        # The ghosts' 27x27 rectangles span [center - 13, center + 14), Pacman's [x, x + 20), so
+        # they touch when the center is between 13 pixels left of x and 32 pixels right of it
+        dx = self.ghosts[..., 0] - self.pacman[:, 0, None] + 13
+        dy = self.ghosts[..., 1] - self.pacman[:, 1, None] + 13
+        touching = (dx.view(np.uint32) < 46) & (dy.view(np.uint32) < 46) & running[:, None]
+        self.died[:] = 0
+        self.eaten[:] = False
+        if not touching.any():
+            return
+        eaten = touching & self.frightened
+        deaths = (touching & ~self.frightened).sum(axis=1, dtype=np.int32)
+        self.died = deaths
+        self.eaten = eaten
+        self.score += 100 * eaten.sum(axis=1, dtype=np.int32)
+        self.lives -= deaths
+        self.pacman[deaths > 0] = PACMAN_START
+        if eaten.any():
+            self.respawn_ghosts(eaten)
+
+    def pick_up(self, running):
+        """
+        Eats the coins and power-ups under Pacman, like apply_effect_to_tile.
+
+        Parameters:
+            - running (numpy.ndarray): Whether every game is still running.
+        """
+        cells = self.overlaps[self.pacman[:, 0] + PIXEL_MARGIN, self.pacman[:, 1] + PIXEL_MARGIN]
+        games = np.flatnonzero(np.take_along_axis(self.coins, cells, axis=1).any(axis=1) & running)
+        if games.size == 0:
+            return
+        cells = cells[games]
+        kinds = np.take_along_axis(self.coins[games], cells, axis=1)
+        # When Pacman is within one column or one row, a cell is listed twice; count it once
+        kinds[:, 1:][cells[:, 1:] == cells[:, :1]] = 0
+        kinds[:, 3][(cells[:, 3] == cells[:, 1]) | (cells[:, 3] == cells[:, 2])] = 0
+        coins = (kinds == 1).sum(axis=1, dtype=np.int32)
+        powerups = (kinds == 2).sum(axis=1, dtype=np.int32)
+        self.score[games] += 10 * coins + 50 * powerups
+        self.remaining[games] -= coins
+        self.coins[games[:, None], cells] = 0
+        frightening = games[powerups > 0]
+        self.vulnerable[frightening] = True
+        self.timer[frightening] = 16
+        self.countdown[frightening] = TICKS_PER_SECOND
+        self.frightened[frightening] = True
+
+    def count_down(self, running):
+        """
+        Counts the frightened timer down once every TICKS_PER_SECOND ticks since the last power-up
+        and ends frightened mode, like the countdown Game runs on its timer wheel.
+
+        Parameters:
+            - running (numpy.ndarray): Whether every game is still running.
+        """
+        counting = running & self.vulnerable
+        self.countdown -= counting
+        second = counting & (self.countdown == 0)
+        self.timer -= second
+        self.countdown[second] = TICKS_PER_SECOND
+        over = running & (self.timer == 0)
+        self.vulnerable &= ~over
+        self.frightened[over] = False
+
+    def run(self, ticks, controller=None):
+        """
+        Steps until every game is over or a number of ticks has passed.
+
+        Parameters:
+            - ticks (int): The largest number of ticks to step.
+            - controller: Called with the engine before every tick, returns the directions for step(). None keeps them.
+
+        Returns:
+            - int: The number of ticks stepped.
+        """
+        for stepped in range(ticks):
+            if self.done.all():
+                return stepped
+            self.step(controller(self) if controller else None)
+        return ticks
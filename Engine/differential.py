@@ -0,0 +1,473 @@
+"""
+Differential Testing Module
+
+This module runs the reference implementation of a game component and a faster candidate side by
+side on seeded, fuzzed game states and input sequences, and compares what they produce input by
+input. A mismatch is shrunk to a minimal reproducer: the inputs after the first difference are cut,
+then chunks of the inputs are dropped for as long as the two still disagree. The time spent in each
+implementation is measured, so every check also reports the speedup of its candidate.
+
+Three checks cover the fast paths of the game:
+    - pathfinding: bfs against the junction graph's find_path, comparing path lengths and validity.
+    - movement: Pacman.move against MapTile sprite groups and against the tile store's layers.
+    - effects: Game.update_players and Game.effects, with apply_effect_to_tile, against a
+      ghostless BatchEngine, comparing Pacman's position, the score, the counters and the coins.
+
+Run every check with:
+    python -m Engine.differential [cases]
+
+Attributes:
+    DEFAULT_CASES (int): The number of cases a check runs by default.
+    MAX_INPUTS (int): The largest number of inputs of a generated case.
+
+Classes:
+    Check (ABC): A reference and a candidate implementation of a component, with their inputs.
+        - generate: Creates a fuzzed case.
+        - reference: Runs the reference implementation.
+        - candidate: Runs the candidate implementation.
+        - observe: Turns the results into values compared input by input.
+        - close: Releases what the implementations hold.
+
+    PathCheck (Check): Compares bfs with find_path.
+    MovementCheck (Check): Compares Pacman's movement against sprite groups and tile layers.
+    EffectsCheck (Check): Compares the game's pick-ups and timers with a ghostless BatchEngine.
+
+Functions:
+    pacman_tiles: Returns the tiles Pacman can reach from his start.
+    direction_runs: Generates Pacman's directions, each held for a random number of ticks.
+    first_mismatch: Returns the first input whose observations differ.
+    find_mismatch: Runs both implementations on a case and returns the first difference.
+    shrink: Reduces the inputs of a mismatching case to a minimal reproducer.
+    run_check: Runs a check on fuzzed cases and reports mismatches and speedup.
+    run_checks: Runs every check.
+"""
+from abc import ABC, abstractmethod
+from time import perf_counter
+import sys
+import numpy as np
+import pygame
+from Players.pacman import Pacman
+from Players.ghost import bfs, get_neighbors
+from Tiles.map import Map, BOARD
+from Tiles.navgraph import find_path
+from Tiles.tilestore import sprite_groups, WALL, DOOR
+from Engine.batch import BatchEngine, shortest_distances, UNREACHED
+from game import Game
+
+DEFAULT_CASES = 1000
+MAX_INPUTS = 600
+
+def pacman_tiles():
+    """
+    Returns the tiles Pacman can reach from his start, the tiles fuzzed cases start on.
+
+    Returns:
+        - numpy.ndarray: The (x, y) of the tiles, one row each.
+    """
+    walkable = np.transpose(np.array(BOARD)) < 3
+    height = walkable.shape[1]
+    return np.argwhere(shortest_distances(walkable)[15 * height + 24] != UNREACHED)
+
+def direction_runs(rng, count):
+    """
+    Generates Pacman's directions for a number of ticks, each held for a random number of ticks.
+
+    Parameters:
+        - rng (numpy.random.Generator): The random generator.
+        - count (int): The number of ticks.
+
+    Returns:
+        - list: One direction per tick.
+    """
+    directions = []
+    while len(directions) < count:
+        directions += [int(rng.integers(4))] * int(rng.integers(1, 60))
+    return directions[:count]
+
+class Check(ABC):
+    """
+    Check Class
+
+    A reference and a candidate implementation of a game component, and how to generate their
+    inputs. A case is a setup, the state the inputs start from, and a list of inputs; both
+    implementations return one result per input.
+
+    Attributes:
+        - name (str): The name of the component.
+
+    Methods:
+        - generate: Creates a fuzzed case.
+        - reference: Runs the reference implementation.
+        - candidate: Runs the candidate implementation.
+        - observe: Turns the results into values compared input by input.
+        - close: Releases what the implementations hold.
+    """
+    name = 'check'
+
+    @abstractmethod
+    def generate(self, rng):
+        """
+        Creates a fuzzed case.
+
+        Parameters:
+            - rng (numpy.random.Generator): The random generator.
+
+        Returns:
+            - tuple: The setup and the list of inputs.
+        """
+        raise NotImplementedError("generate method must be implemented in derived classes.")
+
+    @abstractmethod
+    def reference(self, setup, inputs):
+        """
+        Runs the reference implementation.
+
+        Parameters:
+            - setup: The state the inputs start from.
+            - inputs (list): The inputs.
+
+        Returns:
+            - list: One result per input.
+        """
+        raise NotImplementedError("reference method must be implemented in derived classes.")
+
+    @abstractmethod
+    def candidate(self, setup, inputs):
+        """
+        Runs the candidate implementation.
+
+        Parameters:
+            - setup: The state the inputs start from.
+            - inputs (list): The inputs.
+
+        Returns:
+            - list: One result per input.
+        """
+        raise NotImplementedError("candidate method must be implemented in derived classes.")
+
+    def observe(self, setup, inputs, results): # pylint: disable=unused-argument
+        """
+        Turns the results into values compared input by input. Not timed.
+
+        Parameters:
+            - setup: The state the inputs started from.
+            - inputs (list): The inputs.
+            - results (list): The results of an implementation.
+
+        Returns:
+            - list: The values to compare.
+        """
+        return results
+
+    def close(self):
+        """
+        Releases what the implementations hold.
+        """
+
+class PathCheck(Check):
+    """
+    Compares the shortest paths of bfs with those of the junction graph. Shortest paths of equal
+    length may differ, so the length of the path is compared, and the path checked to be a walk
+    along neighboring tiles that ends on the target.
+
+    Attributes:
+        - simple_board (numpy.ndarray): The board searched, indexed by (x, y).
+        - cells (numpy.ndarray): The walkable tiles of the board.
+    """
+    name = 'pathfinding'
+
+    def __init__(self, simple_board=None):
+        """
+        Initializes a new instance of the PathCheck class.
+
+        Parameters:
+            - simple_board (numpy.ndarray): The board to search. Defaults to the game's board.
+        """
+        self.simple_board = Map().simple_board if simple_board is None else simple_board
+        self.cells = np.argwhere(self.simple_board)
+
+    def generate(self, rng):
+        pairs = self.cells[rng.integers(len(self.cells), size=(int(rng.integers(1, 40)), 2))]
+        return None, [(tuple(start.tolist()), tuple(target.tolist())) for start, target in pairs]
+
+    def reference(self, setup, inputs):
+        return [bfs(self.simple_board, start, target) for start, target in inputs]
+
+    def candidate(self, setup, inputs):
+        return [find_path(self.simple_board, start, target) for start, target in inputs]
+
+    def observe(self, setup, inputs, results):
+        observed = []
+        for (start, target), path in zip(inputs, results):
+            if path is None:
+                observed.append(None)
+                continue
+            steps = [start] + list(path)
+            valid = steps[-1] == target and all(step in get_neighbors(previous, self.simple_board) for previous, step in zip(steps, steps[1:]))
+            observed.append((len(path), valid))
+        return observed
+
+class MovementCheck(Check):
+    """
+    Compares Pacman's movement against one MapTile sprite per cell, collided with
+    pygame.sprite.spritecollideany, and against the map's tile layers. The setup is the tile
+    Pacman starts on, the inputs are his direction on every tick.
+
+    Attributes:
+        - groups (dict): The MapTile sprite groups of the board.
+        - map: Instance of the Map class, with the tile layers.
+        - player: Instance of the Pacman class that is moved.
+        - starts (numpy.ndarray): The tiles Pacman can reach, which cases start on.
+    """
+    name = 'movement'
+
+    def __init__(self):
+        """
+        Initializes a new instance of the MovementCheck class. Needs a display mode for Pacman's images.
+        """
+        self.groups = sprite_groups(BOARD)
+        self.map = Map()
+        self.player = Pacman()
+        self.starts = pacman_tiles()
+
+    def generate(self, rng):
+        start = self.starts[rng.integers(len(self.starts))]
+        return (int(start[0]) * 27, int(start[1]) * 27), direction_runs(rng, int(rng.integers(1, MAX_INPUTS)))
+
+    def run(self, walls, door, setup, inputs):
+        """
+        Moves Pacman from the setup with the given directions.
+
+        Parameters:
+            - walls (pygame.sprite.Group or TileLayer): The walls.
+            - door (pygame.sprite.Group or TileLayer): The ghost door.
+            - setup (tuple): The center Pacman starts on.
+            - inputs (list): Pacman's direction on every tick.
+
+        Returns:
+            - list: Pacman's top left corner after every tick.
+        """
+        player = self.player
+        player.rect.center = setup
+        positions = []
+        for direction in inputs:
+            player.direction = direction
+            player.move(walls, door)
+            positions.append(player.rect.topleft)
+        return positions
+
+    def reference(self, setup, inputs):
+        return self.run(self.groups[WALL], self.groups[DOOR], setup, inputs)
+
+    def candidate(self, setup, inputs):
+        return self.run(self.map.store.layer(WALL), self.map.store.layer(DOOR), setup, inputs)
+
+class EffectsCheck(Check):
+    """
+    Compares the game's movement, pick-ups and frightened timer with a ghostless BatchEngine. The
+    setup is the tile Pacman starts on and the coins already eaten, the inputs are his direction on
+    every tick. Both count the frightened timer in ticks, so the timers are deterministic.
+
+    Attributes:
+        - game: Instance of the Game class without ghosts, created on the first case.
+        - engine: Instance of the BatchEngine class running one game without ghosts.
+        - starts (numpy.ndarray): The tiles Pacman can reach, which cases start on.
+        - pickups (numpy.ndarray): The tiles with a coin or a power-up at the start.
+    """
+    name = 'effects'
+
+    def __init__(self):
+        """
+        Initializes a new instance of the EffectsCheck class.
+        """
+        self.game = None
+        self.engine = BatchEngine(1, ghosts=False)
+        board = np.transpose(np.array(BOARD))
+        self.starts = pacman_tiles()
+        self.pickups = np.argwhere((board == 1) | (board == 2))
+
+    def generate(self, rng):
+        start = self.starts[rng.integers(len(self.starts))]
+        eaten = self.pickups[rng.random(len(self.pickups)) < rng.random() * 0.9]
+        setup = ((int(start[0]) * 27, int(start[1]) * 27), tuple(map(tuple, eaten.tolist())))
+        return setup, direction_runs(rng, int(rng.integers(1, MAX_INPUTS)))
+
+    def reference(self, setup, inputs):
+        if self.game is None:
+            self.game = Game()
+            self.game.ghosts = []
+        game = self.game
+        center, eaten = setup
+        game.map.reset()
+        game.player.reset()
+        game.player.rect.center = center
+        for cell in eaten:
+            game.map.tile_types[cell] = 0
+        game.remaining_coins = int(np.count_nonzero(game.map.tile_types == 1))
+        game.end_frightened()
+        states = []
+        no_ghosts = pygame.sprite.Group()
+        for direction in inputs:
+            game.player.direction = direction
+            game.update_players(0)
+            game.effects(no_ghosts)
+            coins = np.isin(game.map.tile_types, (1, 2))
+            states.append((game.player.rect.topleft, game.player.score, game.remaining_coins, game.vulnerable_timer, game.vulnerable_mode, np.packbits(coins).tobytes()))
+        return states
+
+    def candidate(self, setup, inputs):
+        engine = self.engine
+        center, eaten = setup
+        engine.reset()
+        engine.pacman[0] = (center[0] - 10, center[1] - 10)
+        for x, y in eaten:
+            engine.coins[0, x * engine.height + y] = 0
+        engine.remaining[0] = int(np.count_nonzero(engine.coins[0] == 1))
+        states = []
+        directions = np.zeros(1, dtype=np.int8)
+        for direction in inputs:
+            directions[0] = direction
+            engine.step(directions)
+            coins = engine.coin_board(0) > 0
+            states.append((tuple(engine.pacman[0].tolist()), int(engine.score[0]), int(engine.remaining[0]), int(engine.timer[0]), bool(engine.vulnerable[0]), np.packbits(coins).tobytes()))
+        return states
+
+    def observe(self, setup, inputs, results):
+        return [(tuple(position), int(score), int(remaining), int(timer), bool(vulnerable), coins) for position, score, remaining, timer, vulnerable, coins in results]
+
+    def close(self):
+        if self.game is not None:
+            self.game.path_worker.shutdown()
+            self.game = None
+
+def first_mismatch(expected, actual):
+    """
+    Returns the first input whose observations differ.
+
+    Parameters:
+        - expected (list): The observations of the reference.
+        - actual (list): The observations of the candidate.
+
+    Returns:
+        - int or None: The index of the input, or None if they all match.
+    """
+    for index, (wanted, got) in enumerate(zip(expected, actual)):
+        if wanted != got:
+            return index
+    if len(expected) != len(actual):
+        return min(len(expected), len(actual))
+    return None
+
+def find_mismatch(check, setup, inputs):
+    """
+    Runs both implementations on a case and returns the first difference.
+
+    Parameters:
+        - check (Check): The check.
+        - setup: The state the inputs start from.
+        - inputs (list): The inputs.
+
+    Returns:
+        - dict or None: The index of the input, and the expected and actual observations, or None if they match.
+    """
+    expected = check.observe(setup, inputs, check.reference(setup, inputs))
+    actual = check.observe(setup, inputs, check.candidate(setup, inputs))
+    index = first_mismatch(expected, actual)
+    if index is None:
+        return None
+    return {
+        'index': index,
+        'expected': expected[index] if index < len(expected) else None,
+        'actual': actual[index] if index < len(actual) else None,
+    }
+
+def shrink(check, setup, inputs, mismatch=None):
+    """
+    Reduces the inputs of a mismatching case to a minimal reproducer. The inputs after the first
+    difference are cut, then ever smaller chunks are dropped while the implementations still differ.
+
+    Parameters:
+        - check (Check): The check.
+        - setup: The state the inputs start from.
+        - inputs (list): The inputs of the mismatching case.
+        - mismatch (dict): The mismatch of the case, if already known.
+
+    Returns:
+        - tuple: The shrunk inputs and their mismatch.
+    """
+    mismatch = mismatch or find_mismatch(check, setup, inputs)
+    inputs = list(inputs[:mismatch['index'] + 1])
+    chunk = len(inputs) // 2
+    while chunk >= 1:
+        start = 0
+        while start < len(inputs):
+            trial = inputs[:start] + inputs[start + chunk:]
+            found = find_mismatch(check, setup, trial) if trial else None
+            if found is None:
+                start += chunk
+            else:
+                inputs, mismatch = trial[:found['index'] + 1], found
+        chunk //= 2
+    return inputs, mismatch
+
+def run_check(check, cases=DEFAULT_CASES, seed=0):
+    """
+    Runs a check on seeded, fuzzed cases. The first mismatch is shrunk to a reproducer.
+
+    Parameters:
+        - check (Check): The check.
+        - cases (int): The number of cases.
+        - seed (int): The seed of the random generator.
+
+    Returns:
+        - dict: The number of cases, inputs and mismatches, the reproducer or None, the seconds
+          spent in each implementation and the speedup of the candidate.
+    """
+    rng = np.random.default_rng(seed)
+    report = {'check': check.name, 'cases': cases, 'inputs': 0, 'mismatches': 0, 'reproducer': None, 'reference_s': 0.0, 'candidate_s': 0.0}
+    for case in range(cases):
+        setup, inputs = check.generate(rng)
+        start = perf_counter()
+        expected = check.reference(setup, inputs)
+        middle = perf_counter()
+        actual = check.candidate(setup, inputs)
+        report['reference_s'] += middle - start
+        report['candidate_s'] += perf_counter() - middle
+        report['inputs'] += len(inputs)
+        if first_mismatch(check.observe(setup, inputs, expected), check.observe(setup, inputs, actual)) is None:
+            continue
+        report['mismatches'] += 1
+        if report['reproducer'] is None:
+            shrunk, mismatch = shrink(check, setup, inputs)
+            report['reproducer'] = dict(mismatch, case=case, setup=setup, inputs=shrunk)
+    report['speedup'] = report['reference_s'] / report['candidate_s'] if report['candidate_s'] else 0.0
+    return report
+
+def run_checks(checks=None, cases=DEFAULT_CASES, seed=0):
+    """
+    Runs every check, and closes them.
+
+    Parameters:
+        - checks (list): The checks. Defaults to the pathfinding, movement and effects checks.
+        - cases (int): The number of cases of each check.
+        - seed (int): The seed of the random generator.
+
+    Returns:
+        - list: The report of every check.
+    """
+    checks = checks or [PathCheck(), MovementCheck(), EffectsCheck()]
+    reports = []
+    for check in checks:
+        try:
+            reports.append(run_check(check, cases, seed))
+        finally:
+            check.close()
+    return reports
+
+if __name__ == "__main__":
+    pygame.init()
+    pygame.display.set_mode((795, 900))
+    for result in run_checks(cases=int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CASES):
+        print(f"{result['check']}: {result['cases']} cases, {result['inputs']} inputs, {result['mismatches']} mismatches, {result['speedup']:.1f}x faster")
+        if result['reproducer'] is not None:
+            print(f"    reproducer: {result['reproducer']}")
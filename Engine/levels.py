@@ -0,0 +1,187 @@
+"""
+Levels Module
+
+This module defines the level sequence of the game. Every level plays a board again with faster
+ghosts and a shorter frightened mode. What a level needs before it can be played is built ahead
+of time on a background thread while the previous level is played: the map with its typed arrays
+and legal-move table, the junction graph the ghosts search paths on, and the baked board layer.
+Moving to the next level then only swaps references, without a hitch in the game loop.
+
+Attributes:
+    LEVELS (tuple): The levels of the game, in order.
+
+Classes:
+    Level: The settings of one level.
+        - apply: Applies the settings to a game.
+        - build: Builds the map, the navigation graph and the board layer of the level.
+
+    PreparedLevel: A level with everything built that it needs to be played.
+
+    LevelLoader: Builds the levels of a sequence on a background thread, one level ahead.
+        - prepare: Starts building a level of the sequence.
+        - take: Returns a built level, waiting for it if it isn't ready yet.
+        - shutdown: Stops the background thread.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+import numpy as np
+from Tiles.map import Map
+from Tiles.navgraph import graph_for_board
+
+class Level():
+    """
+    The settings of one level.
+
+    Attributes:
+        - number (int): The number of the level, from 1.
+        - ghost_speed (float): The speed of the ghosts, in pixels per tick.
+        - frightened_speed (float): The speed of the frightened ghosts, in pixels per tick.
+        - frightened_time (int): The seconds a power-up frightens the ghosts for.
+        - board (list): The tile types of the board, one list per row, or None for Map's BOARD.
+    """
+    def __init__(self, number, ghost_speed, frightened_speed, frightened_time, board=None):
+        """
+        Initializes the settings of a level.
+
+        Parameters:
+            - number (int): The number of the level, from 1.
+            - ghost_speed (float): The speed of the ghosts, in pixels per tick.
+            - frightened_speed (float): The speed of the frightened ghosts, in pixels per tick.
+            - frightened_time (int): The seconds a power-up frightens the ghosts for.
+            - board (list): The tile types of the board, or None for Map's BOARD.
+        """
+        self.number = number
+        self.ghost_speed = ghost_speed
+        self.frightened_speed = frightened_speed
+        self.frightened_time = frightened_time
+        self.board = board
+
+    def apply(self, game):
+        """
+        Applies the settings to a game and its ghosts.
+
+        Parameters:
+            - game (Game): The game.
+        """
+        game.frightened_time = self.frightened_time
+        for ghost in game.ghosts:
+            ghost.base_speed = self.ghost_speed
+            ghost.frightened_speed = self.frightened_speed
+            ghost.speed = self.frightened_speed if ghost.freightened else self.ghost_speed
+
+    def build(self, game_map=None):
+        """
+        Builds the map, the navigation graph and the board layer of the level. Needs no display,
+        so it can run on a background thread.
+
+        Parameters:
+            - game_map (Map): A map to reuse, e.g. the one already loaded. None to build one.
+
+        Returns:
+            - PreparedLevel: The built level.
+        """
+        start = perf_counter()
+        if game_map is None:
+            game_map = Map(self.board)
+        # The graph is cached by the board, so the ghosts' first searches find it built
+        graph = graph_for_board(game_map.simple_board)
+        game_map.board_layer.bake()
+        return PreparedLevel(self, game_map, graph, perf_counter() - start)
+
+# The first level keeps the speeds and frightened time the game always had
+LEVELS = (
+    Level(1, 1, 0.8, 16),
+    Level(2, 1.1, 0.85, 12),
+    Level(3, 1.2, 0.9, 9),
+    Level(4, 1.35, 0.9, 6),
+    Level(5, 1.5, 0.95, 3),
+)
+
+class PreparedLevel(): # pylint: disable=too-few-public-methods
+    """
+    A level with everything built that it needs to be played.
+
+    Attributes:
+        - level (Level): The settings of the level.
+        - map (Map): The map of the level, with its legal-move table and baked board layer.
+        - graph (JunctionGraph): The navigation graph of the map, cached for the ghosts' path searches.
+        - coins (int): The number of coins on the board.
+        - seconds (float): The time it took to build, in seconds.
+    """
+    def __init__(self, level, game_map, graph, seconds):
+        """
+        Initializes a prepared level.
+
+        Parameters:
+            - level (Level): The settings of the level.
+            - game_map (Map): The map of the level.
+            - graph (JunctionGraph): The navigation graph of the map.
+            - seconds (float): The time it took to build, in seconds.
+        """
+        self.level = level
+        self.map = game_map
+        self.graph = graph
+        self.coins = int(np.count_nonzero(game_map.tile_types == 1))
+        self.seconds = seconds
+
+class LevelLoader():
+    """
+    Builds the levels of a sequence on a background thread, one level ahead of the one played.
+
+    Attributes:
+        - levels (tuple): The levels of the sequence.
+        - pending (dict): The future of every level being built, by index in the sequence.
+        - waits (list): The seconds the game waited for every level taken, 0 when it was ready.
+    """
+    def __init__(self, levels=LEVELS):
+        """
+        Initializes a loader and its background thread.
+
+        Parameters:
+            - levels (tuple): The levels of the sequence.
+        """
+        self.levels = tuple(levels)
+        self.pending = {}
+        self.waits = []
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='level-loader')
+
+    def prepare(self, index):
+        """
+        Starts building a level of the sequence, unless it is already being built.
+
+        Parameters:
+            - index (int): The index of the level in the sequence.
+
+        Returns:
+            - bool: False if the sequence has no such level.
+        """
+        if not 0 <= index < len(self.levels):
+            return False
+        if index not in self.pending:
+            self.pending[index] = self.executor.submit(self.levels[index].build)
+        return True
+
+    def take(self, index):
+        """
+        Returns a built level, waiting for it if it isn't ready yet, and records the wait.
+
+        Parameters:
+            - index (int): The index of the level in the sequence.
+
+        Returns:
+            - PreparedLevel: The built level.
+        """
+        self.prepare(index)
+        future = self.pending.pop(index)
+        ready = future.done()
+        start = perf_counter()
+        prepared = future.result()
+        self.waits.append(0.0 if ready else perf_counter() - start)
+        return prepared
+
+    def shutdown(self):
+        """
+        Stops the background thread and drops the levels not built yet.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.pending.clear()
@@ -0,0 +1,240 @@
+"""
+Frame Pacing Module
+
+This module paces the frames of the game loop. Game.run_game waits for the next frame in
+pygame's Clock.tick, which blocks the whole thread. Game.run_game_async awaits a FramePacer instead,
+so the tasks of its asyncio event loop, like a telemetry server, local IPC or an autosave, run in
+the rest of every frame without threads of their own.
+
+A FramePacer keeps a schedule of frame deadlines rather than sleeping for a frame after each one,
+so the frames don't drift. The timers of the event loop only wake it to within a millisecond or so,
+so it sleeps until shortly before the deadline and then yields to the other tasks until the deadline
+is reached. A frame that ends more than a frame late starts a new schedule, instead of rushing the
+following frames to catch up.
+
+The pacing of both loops is measured by FrameTimes, which records when every frame starts, and
+compare_pacing plays a game with each loop to compare their jitter. pygame's Clock waits in whole
+milliseconds, so its frames come every 16 or 17 milliseconds, and on average a little early.
+
+Attributes:
+    FPS (int): The frames per second of the game.
+    SPIN_S (float): How long before a deadline the pacer stops sleeping and only yields, in seconds.
+    KEY_POLL_S (float): How often the end screen of run_game_async looks for a key press, in seconds.
+    DEFAULT_FRAMES (int): The number of frames compare_pacing plays with each loop.
+
+Classes:
+    FramePacer: Paces the frames of an asyncio game loop.
+        - wait: Yields to the event loop until the next frame is due.
+    TimedClock: Wraps pygame's Clock to record the start of every frame.
+    UnthrottledClock: Stands in for pygame's Clock without waiting.
+    GameOverKey: Presses a key once a game is over, and gives up a game that lasts too long.
+    FrameTimes: Records when every frame starts.
+        - mark: Records the start of a frame.
+        - report: Returns the pacing statistics of the frames recorded.
+
+Functions:
+    compare_pacing: Plays a game with the blocking loop and one with the asyncio loop, and reports their pacing.
+"""
+from time import perf_counter
+import asyncio
+import numpy as np
+import pygame
+
+FPS = 60
+SPIN_S = 0.002
+KEY_POLL_S = 0.05
+DEFAULT_FRAMES = 300
+
+class FramePacer(): # pylint: disable=too-few-public-methods
+    """
+    Paces the frames of an asyncio game loop to a schedule of deadlines, yielding to the event loop
+    until every frame is due.
+
+    Attributes:
+        - period (float): The time between two frames, in seconds.
+        - deadline (float): When the next frame is due, as a perf_counter time, None before the first frame.
+        - resyncs (int): The number of frames that ended more than a frame late and started a new schedule.
+        - times (FrameTimes): Where the start of every frame is recorded, or None.
+    """
+    def __init__(self, fps=FPS, times=None):
+        """
+        Initializes a pacer.
+
+        Parameters:
+            - fps (int): The frames per second.
+            - times (FrameTimes): Where to record the start of every frame, None not to.
+        """
+        self.period = 1 / fps
+        self.deadline = None
+        self.resyncs = 0
+        self.times = times
+
+    async def wait(self):
+        """
+        Yields to the event loop until the next frame is due, a period after the last one was.
+        """
+        now = perf_counter()
+        self.deadline = (now if self.deadline is None else self.deadline) + self.period
+        if now > self.deadline:
+            self.resyncs += 1
+            self.deadline = now
+            await asyncio.sleep(0)
+        else:
+            if self.deadline - now > SPIN_S:
+                await asyncio.sleep(self.deadline - now - SPIN_S)
+            # Short of the deadline the event loop's timers are too coarse, the other tasks still run
+            while perf_counter() < self.deadline:
+                await asyncio.sleep(0)
+        if self.times is not None:
+            self.times.mark()
+
+class TimedClock(): # pylint: disable=too-few-public-methods
+    """
+    Wraps pygame's Clock in run_game to record the start of every frame, when tick returns.
+
+    Attributes:
+        - clock (pygame.time.Clock): The clock pacing the frames.
+        - times (FrameTimes): Where the start of every frame is recorded.
+    """
+    def __init__(self, clock, times):
+        """
+        Initializes the wrapper.
+
+        Parameters:
+            - clock (pygame.time.Clock): The clock pacing the frames.
+            - times (FrameTimes): Where to record the start of every frame.
+        """
+        self.clock = clock
+        self.times = times
+
+    def tick(self, framerate=0):
+        """
+        Waits in the clock for the next frame, and records its start.
+
+        Parameters:
+            - framerate (int): The frames per second.
+
+        Returns:
+            - int: The milliseconds since the last tick, as the clock returns.
+        """
+        elapsed = self.clock.tick(framerate)
+        self.times.mark()
+        return elapsed
+
+class UnthrottledClock(): # pylint: disable=too-few-public-methods
+    """
+    Stands in for pygame's Clock in run_game without waiting for the frame time, so a headless
+    game plays as fast as it runs.
+    """
+    def tick(self, framerate=0): # pylint: disable=unused-argument
+        """
+        Returns at once.
+
+        Parameters:
+            - framerate (int): Ignored.
+
+        Returns:
+            - int: The milliseconds waited, none.
+        """
+        return 0
+
+class GameOverKey(): # pylint: disable=too-few-public-methods
+    """
+    Observer of a game played without anyone there, which presses a key once the game is over, so
+    the win or lose screen returns. A game still running after max_ticks is given up as lost.
+
+    Attributes:
+        - max_ticks (int): The ticks after which a game is given up.
+    """
+    def __init__(self, max_ticks):
+        """
+        Initializes the observer.
+
+        Parameters:
+            - max_ticks (int): The ticks after which a game is given up.
+        """
+        self.max_ticks = max_ticks
+
+    def on_tick(self, game, tick):
+        """
+        Presses a key once the game is over, or gives it up when it lasts too long. A key pressed
+        when the board is cleared but another level follows is only read by the game loop.
+
+        Parameters:
+            - game (Game): The game.
+            - tick (int): The tick just played.
+        """
+        if tick + 1 >= self.max_ticks:
+            game.player.lives = 0
+        if game.player.lives == 0 or game.remaining_coins == 0:
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+
+class FrameTimes():
+    """
+    Records when every frame starts, once its wait is over, the same point of a frame in both loops.
+    The work of the frames doesn't move it, only how precisely they are paced.
+
+    Attributes:
+        - times (list): The perf_counter time of the start of every frame.
+    """
+    def __init__(self):
+        """
+        Initializes an empty record.
+        """
+        self.times = []
+
+    def mark(self):
+        """
+        Records the start of a frame.
+        """
+        self.times.append(perf_counter())
+
+    def report(self, fps=FPS):
+        """
+        Returns the pacing statistics of the frames recorded.
+
+        Parameters:
+            - fps (int): The frames per second the loop was paced to.
+
+        Returns:
+            - dict: The number of frames, the mean time between two frames, its standard deviation
+              (the jitter), and the median, 99th percentile and max of how far it was off the period,
+              in milliseconds.
+        """
+        if len(self.times) < 2:
+            return {'frames': len(self.times), 'mean_ms': 0.0, 'jitter_ms': 0.0, 'median_error_ms': 0.0, 'p99_error_ms': 0.0, 'max_error_ms': 0.0}
+        intervals = np.diff(self.times) * 1000
+        errors = np.abs(intervals - 1000 / fps)
+        return {
+            'frames': len(self.times),
+            'mean_ms': float(intervals.mean()),
+            'jitter_ms': float(intervals.std()),
+            'median_error_ms': float(np.median(errors)),
+            'p99_error_ms': float(np.percentile(errors, 99)),
+            'max_error_ms': float(errors.max()),
+        }
+
+def compare_pacing(new_game, screen, frames=DEFAULT_FRAMES):
+    """
+    Plays a game with the blocking loop, paced by pygame's Clock, and one with the asyncio loop,
+    paced by a FramePacer, for a number of frames each at FPS, and reports the pacing of both.
+
+    Parameters:
+        - new_game (callable): Returns a new game to play, e.g. the new_game of a GameFactory with an Autopilot.
+        - screen (pygame.Surface): The display surface.
+        - frames (int): The number of frames played with each loop.
+
+    Returns:
+        - dict: The report of FrameTimes for 'blocking' and for 'asyncio'.
+    """
+    reports = {}
+    for name in ('blocking', 'asyncio'):
+        game = new_game()
+        times = FrameTimes()
+        game.observers.append(GameOverKey(frames))
+        if name == 'blocking':
+            game.run_game(screen, TimedClock(pygame.time.Clock(), times))
+        else:
+            asyncio.run(game.run_game_async(screen, FramePacer(times=times)))
+        reports[name] = times.report()
+    return reports
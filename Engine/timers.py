@@ -0,0 +1,230 @@
+"""
+Timers Module
+
+This module defines the TimerWheel class, which runs the game's timers and scheduled effects on
+simulation ticks instead of the wall clock, so they never drift when frames run long and replay
+the same way on every run.
+
+The wheel is hierarchical: WHEEL_LEVELS rings of WHEEL_SIZE slots, each slot of a ring spanning a
+whole turn of the ring below. A timer is put in the slot of its deadline on the finest ring that
+reaches it. Every tick only the slot of that tick is fired, and when a ring completes a turn the
+next slot of the ring above is moved down. A tick therefore costs the timers that fire and the
+few that move, never the timers still pending. Cancelling a timer removes it from its slot at once.
+
+Attributes:
+    TICKS_PER_SECOND (int): The number of ticks in a second of game time.
+    WHEEL_BITS (int): The number of bits of a slot index, per ring.
+    WHEEL_SIZE (int): The number of slots of a ring.
+    WHEEL_LEVELS (int): The number of rings.
+
+Classes:
+    TimerHandle: A scheduled timer, returned by TimerWheel.schedule.
+        - cancel: Cancels the timer.
+        - active: Tells whether the timer is still scheduled.
+        - remaining: Returns the ticks left before the timer fires.
+
+    TimerWheel: Runs callbacks after a number of ticks.
+        - schedule: Schedules a callback after a delay, optionally repeating.
+        - schedule_at: Schedules a callback on a tick.
+        - advance: Moves time forward and fires the timers that are due.
+        - clear: Cancels every timer.
+"""
+TICKS_PER_SECOND = 60
+WHEEL_BITS = 6
+WHEEL_SIZE = 1 << WHEEL_BITS
+WHEEL_LEVELS = 4
+
+class TimerHandle():
+    """
+    A scheduled timer, returned by TimerWheel.schedule.
+
+    Attributes:
+        - wheel (TimerWheel): The wheel the timer runs on.
+        - deadline (int): The tick the timer fires on.
+        - callback (callable): The function called when the timer fires.
+        - args (tuple): The arguments of the callback.
+        - interval (int): The ticks between two firings of a repeating timer, or None.
+        - slot (dict): The slot holding the timer, or None once it fired or was cancelled.
+    """
+    def __init__(self, wheel, deadline, callback, args, interval):
+        """
+        Initializes a timer. Use TimerWheel.schedule to create one.
+
+        Parameters:
+            - wheel (TimerWheel): The wheel the timer runs on.
+            - deadline (int): The tick the timer fires on.
+            - callback (callable): The function called when the timer fires.
+            - args (tuple): The arguments of the callback.
+            - interval (int): The ticks between two firings of a repeating timer, or None.
+        """
+        self.wheel = wheel
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+        self.slot = None
+
+    def cancel(self):
+        """
+        Cancels the timer. A repeating timer can cancel itself from its callback.
+
+        Returns:
+            - bool: False if the timer had already fired or was already cancelled.
+        """
+        self.interval = None
+        if self.slot is None:
+            return False
+        self.slot.pop(self)
+        self.slot = None
+        self.wheel.pending -= 1
+        return True
+
+    def active(self):
+        """
+        Tells whether the timer is still scheduled.
+
+        Returns:
+            - bool: True until it fires for the last time or is cancelled.
+        """
+        return self.slot is not None
+
+    def remaining(self):
+        """
+        Returns the ticks left before the timer fires.
+
+        Returns:
+            - int: The number of ticks, 0 for a timer no longer scheduled.
+        """
+        return self.deadline - self.wheel.tick if self.active() else 0
+
+class TimerWheel():
+    """
+    Runs callbacks after a number of ticks, on a hierarchical timer wheel.
+
+    Attributes:
+        - tick (int): The current tick.
+        - rings (list): WHEEL_LEVELS lists of WHEEL_SIZE slots, every slot a dict of the TimerHandle it holds.
+        - pending (int): The number of scheduled timers.
+        - fired (int): The number of times a timer fired.
+    """
+    def __init__(self, tick=0):
+        """
+        Initializes an empty wheel.
+
+        Parameters:
+            - tick (int): The tick to start at.
+        """
+        self.tick = tick
+        self.rings = [[{} for _ in range(WHEEL_SIZE)] for _ in range(WHEEL_LEVELS)]
+        self.pending = 0
+        self.fired = 0
+
+    def __len__(self):
+        return self.pending
+
+    def insert(self, handle):
+        """
+        Puts a timer in the slot of its deadline, on the finest ring that reaches it. A deadline past
+        the last ring goes in its farthest slot and is placed again when that slot moves down.
+
+        Parameters:
+            - handle (TimerHandle): The timer.
+        """
+        deadline = min(handle.deadline, self.tick + (1 << WHEEL_BITS * WHEEL_LEVELS) - 1)
+        level = 0
+        while level < WHEEL_LEVELS - 1 and deadline - self.tick >= 1 << WHEEL_BITS * (level + 1):
+            level += 1
+        slot = self.rings[level][(deadline >> WHEEL_BITS * level) & (WHEEL_SIZE - 1)]
+        slot[handle] = None
+        handle.slot = slot
+
+    def schedule(self, delay, callback, *args, interval=None):
+        """
+        Schedules a callback after a delay, and then every interval ticks if given.
+
+        Parameters:
+            - delay (int): The ticks before the callback, at least 1.
+            - callback (callable): The function to call.
+            - args: The arguments of the callback.
+            - interval (int): The ticks between two calls of a repeating timer, or None to call it once.
+
+        Returns:
+            - TimerHandle: The timer, which can be cancelled.
+        """
+        return self.schedule_at(self.tick + max(int(delay), 1), callback, *args, interval=interval)
+
+    def schedule_at(self, tick, callback, *args, interval=None):
+        """
+        Schedules a callback on a tick. A tick already passed fires on the next one.
+
+        Parameters:
+            - tick (int): The tick to call the callback on.
+            - callback (callable): The function to call.
+            - args: The arguments of the callback.
+            - interval (int): The ticks between two calls of a repeating timer, or None to call it once.
+
+        Returns:
+            - TimerHandle: The timer, which can be cancelled.
+        """
+        handle = TimerHandle(self, max(int(tick), self.tick + 1), callback, args, interval)
+        self.insert(handle)
+        self.pending += 1
+        return handle
+
+    def cascade(self):
+        """
+        Moves down the next slot of every ring above the first whose ring below completed a turn.
+        """
+        for level in range(1, WHEEL_LEVELS):
+            if self.tick & ((1 << WHEEL_BITS * level) - 1):
+                break
+            ring = self.rings[level]
+            index = (self.tick >> WHEEL_BITS * level) & (WHEEL_SIZE - 1)
+            slot, ring[index] = ring[index], {}
+            for handle in slot:
+                self.insert(handle)
+
+    def advance(self, ticks=1):
+        """
+        Moves time forward and fires the timers that are due, in the order they were scheduled
+        within a tick. Callbacks may schedule and cancel timers.
+
+        Parameters:
+            - ticks (int): The number of ticks to move forward.
+
+        Returns:
+            - int: The number of timers fired.
+        """
+        fired = 0
+        for _ in range(ticks):
+            self.tick += 1
+            self.cascade()
+            ring = self.rings[0]
+            index = self.tick & (WHEEL_SIZE - 1)
+            slot, ring[index] = ring[index], {}
+            for handle in list(slot):
+                if handle.slot is not slot:
+                    # Cancelled by a callback fired before it
+                    continue
+                handle.slot = None
+                self.pending -= 1
+                fired += 1
+                if handle.interval:
+                    handle.deadline += handle.interval
+                    self.insert(handle)
+                    self.pending += 1
+                handle.callback(*handle.args)
+        self.fired += fired
+        return fired
+
+    def clear(self):
+        """
+        Cancels every timer.
+        """
+        for ring in self.rings:
+            for slot in ring:
+                for handle in slot:
+                    handle.slot = None
+                    handle.interval = None
+                slot.clear()
+        self.pending = 0
@@ -0,0 +1,250 @@
+"""
+Pacman Assets Module
+
+This module loads the images and music of the game. Decoding the PNG, JPG and MP3 files one by one
+is most of the cold start time, so a build step can pack every image as raw pixels, already scaled
+to the size the game uses, and every track as decoded PCM into one indexed pack file. At runtime the
+pack is memory-mapped and surfaces and sounds are created straight from its buffers. Assets missing
+from the pack, or every asset when there is no pack, are loaded from their files as before.
+
+Build the pack with:
+    python -m GUI.assets
+
+Attributes:
+    PACK_PATH (str): The default location of the pack file.
+    PACK_MAGIC (bytes): The first bytes of every pack file.
+    ASSET_IMAGES (list): The (path, size) of every image the game loads, size None for the original size.
+    ASSET_SOUNDS (list): The path of every sound the game loads.
+
+Classes:
+    AssetPack: A memory-mapped pack of decoded assets.
+        - image: Creates a surface from the packed pixels of an image.
+        - sound: Creates a sound from the packed PCM of a track.
+
+Functions:
+    image_key: Returns the key of an image in the pack.
+    build_pack: Decodes every asset and writes the pack file.
+    default_pack: Opens the pack file at PACK_PATH once, if it exists.
+    load_image: Loads an image, from the pack when possible.
+    load_sound: Loads a sound, from the pack when possible.
+    time_loading: Measures the time to load every asset.
+"""
+from time import perf_counter
+import json
+import mmap
+import os
+import struct
+import pygame
+
+PACK_PATH = 'Graphics/assets.pack'
+PACK_MAGIC = b'PMAP'
+ASSET_IMAGES = [
+    ('Graphics/pacman_2013.png', (600, 157)),
+    ('Graphics/background.jpg', (1632, 918)),
+    ('Graphics/start.png', (314, 127)),
+    ('Graphics/start_hover.png', (314, 127)),
+    ('Graphics/stop.png', (318, 130)),
+    ('Graphics/stop_hover.png', (318, 130)),
+    ('Graphics/coin.png', (27, 27)),
+    ('Graphics/powerup.png', (27, 27)),
+    ('Graphics/Ghosts/Vulnerable.png', (27, 27)),
+    ('Graphics/Ghosts/Pinky.png', (27, 27)),
+    ('Graphics/Ghosts/Blinky.png', (27, 27)),
+    ('Graphics/Ghosts/Inky.png', (27, 27)),
+    ('Graphics/Ghosts/Clyde.png', (27, 27)),
+] + [(f'Graphics/Pacman/{frame}.png', (20, 20)) for frame in range(1, 5)] \
+  + [(f'Graphics/wall{wall}.png', None) for wall in (3, 4, 5, 6, 7, 8, 10, 11, 12, 13)]
+ASSET_SOUNDS = [f'Music/Pacman_{name}.mp3' for name in ('closest', 'mid', 'far', 'vulnerable')]
+
+HEADER = struct.Struct('<4sI')
+
+_default = {}
+
+def image_key(path, size):
+    """
+    Returns the key of an image in the pack.
+
+    Parameters:
+        - path (str): The path of the image file.
+        - size (tuple): The size the image is scaled to, or None.
+
+    Returns:
+        - str: The key.
+    """
+    return path if size is None else f'{path}@{size[0]}x{size[1]}'
+
+class AssetPack():
+    """
+    A memory-mapped pack of decoded assets. Surfaces created from it share its memory, so the
+    pack stays open for as long as the game runs.
+
+    Attributes:
+        - index (dict): For every key, the offset and length of its data and how to decode it.
+        - misses (int): The number of assets asked for that were not in the pack.
+    """
+    def __init__(self, path):
+        """
+        Opens and maps a pack file.
+
+        Parameters:
+            - path (str): The path of the pack file.
+        """
+        with open(path, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+        magic, index_size = HEADER.unpack_from(self.data)
+        if magic != PACK_MAGIC:
+            raise ValueError(f"{path} is not an asset pack")
+        self.index = json.loads(self.data[HEADER.size:HEADER.size + index_size])
+        self.start = HEADER.size + index_size
+        self.misses = 0
+
+    def buffer(self, entry):
+        """
+        Returns the packed bytes of an entry without copying them.
+
+        Parameters:
+            - entry (dict): The entry from the index.
+
+        Returns:
+            - memoryview: The bytes.
+        """
+        offset = self.start + entry['offset']
+        return memoryview(self.data)[offset:offset + entry['length']]
+
+    def image(self, path, size=None):
+        """
+        Creates a surface from the packed pixels of an image.
+
+        Parameters:
+            - path (str): The path of the image file.
+            - size (tuple): The size the image was scaled to, or None.
+
+        Returns:
+            - pygame.Surface or None: The surface, or None if the image is not in the pack.
+        """
+        entry = self.index.get(image_key(path, size))
+        if entry is None:
+            self.misses += 1
+            return None
+        return pygame.image.frombuffer(self.buffer(entry), tuple(entry['size']), 'RGBA')
+
+    def sound(self, path):
+        """
+        Creates a sound from the packed PCM of a track.
+
+        Parameters:
+            - path (str): The path of the sound file.
+
+        Returns:
+            - pygame.mixer.Sound or None: The sound, or None if the track is not in the pack
+              or was decoded for another mixer format.
+        """
+        entry = self.index.get(path)
+        if entry is None or tuple(entry['format']) != pygame.mixer.get_init():
+            self.misses += 1
+            return None
+        return pygame.mixer.Sound(buffer=self.buffer(entry))
+
+def build_pack(path=PACK_PATH):
+    """
+    Decodes every asset and writes the pack file. Tracks are decoded for the current mixer format.
+
+    Parameters:
+        - path (str): Where to write the pack file.
+
+    Returns:
+        - int: The size of the pack file in bytes.
+    """
+    pygame.mixer.init()
+    index = {}
+    chunks = []
+    offset = 0
+    for image_path, size in ASSET_IMAGES:
+        surface = pygame.image.load(image_path)
+        if size is not None:
+            surface = pygame.transform.scale(surface, size)
+        chunks.append(pygame.image.tobytes(surface, 'RGBA'))
+        index[image_key(image_path, size)] = {'offset': offset, 'length': len(chunks[-1]), 'size': surface.get_size()}
+        offset += len(chunks[-1])
+    for sound_path in ASSET_SOUNDS:
+        chunks.append(pygame.mixer.Sound(sound_path).get_raw())
+        index[sound_path] = {'offset': offset, 'length': len(chunks[-1]), 'format': pygame.mixer.get_init()}
+        offset += len(chunks[-1])
+    encoded_index = json.dumps(index).encode()
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(PACK_MAGIC, len(encoded_index)))
+        file.write(encoded_index)
+        for chunk in chunks:
+            file.write(chunk)
+    return HEADER.size + len(encoded_index) + offset
+
+def default_pack():
+    """
+    Opens the pack file at PACK_PATH once, if it exists.
+
+    Returns:
+        - AssetPack or None: The pack, or None if it hasn't been built.
+    """
+    if 'pack' not in _default:
+        _default['pack'] = AssetPack(PACK_PATH) if os.path.exists(PACK_PATH) else None
+    return _default['pack']
+
+def load_image(path, size=None, pack=None):
+    """
+    Loads an image, from the pack when possible.
+
+    Parameters:
+        - path (str): The path of the image file.
+        - size (tuple): The size to scale the image to, or None to keep its size.
+        - pack (AssetPack): The pack to look in. Defaults to the pack at PACK_PATH, False for none.
+
+    Returns:
+        - pygame.Surface: The image.
+    """
+    if pack is None:
+        pack = default_pack()
+    surface = pack.image(path, size) if pack else None
+    if surface is None:
+        surface = pygame.image.load(path)
+        if size is not None:
+            surface = pygame.transform.scale(surface, size)
+    return surface
+
+def load_sound(path, pack=None):
+    """
+    Loads a sound, from the pack when possible.
+
+    Parameters:
+        - path (str): The path of the sound file.
+        - pack (AssetPack): The pack to look in. Defaults to the pack at PACK_PATH, False for none.
+
+    Returns:
+        - pygame.mixer.Sound: The sound.
+    """
+    if pack is None:
+        pack = default_pack()
+    sound = pack.sound(path) if pack else None
+    return sound if sound is not None else pygame.mixer.Sound(path)
+
+def time_loading(pack=None):
+    """
+    Measures the time to load every asset of the game, which is most of the cold start time.
+
+    Parameters:
+        - pack (AssetPack): The pack to load from, or False to decode the files.
+
+    Returns:
+        - float: The time in seconds.
+    """
+    start = perf_counter()
+    for path, size in ASSET_IMAGES:
+        load_image(path, size, pack)
+    for path in ASSET_SOUNDS:
+        load_sound(path, pack)
+    return perf_counter() - start
+
+if __name__ == "__main__":
+    pygame.init()
+    print(f"Wrote {build_pack() / 2**20:.1f} MiB to {PACK_PATH}")
+    print(f"Loading from files: {time_loading(False) * 1000:.0f} ms")
+    print(f"Loading from the pack: {time_loading(AssetPack(PACK_PATH)) * 1000:.0f} ms")
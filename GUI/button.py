@@ -9,6 +9,7 @@ Classes:
     - Btn_Stop: Represents the stop button.
 """
 import pygame
+from GUI.assets import load_image
 
 class Btn_Start(pygame.sprite.Sprite):
     """
@@ -30,10 +31,8 @@ class Btn_Start(pygame.sprite.Sprite):
             - height (int): The height of the game window.
         """
         super().__init__()
-        default_surf = pygame.image.load('Graphics/start.png').convert_alpha()
-        default_surf = pygame.transform.scale(default_surf, (default_surf.get_width() // 2, default_surf.get_height() // 2))
-        hover_surf = pygame.image.load('Graphics/start_hover.png').convert_alpha()
-        hover_surf = pygame.transform.scale(hover_surf, (hover_surf.get_width() // 2, hover_surf.get_height() // 2))
+        default_surf = load_image('Graphics/start.png', (314, 127)).convert_alpha()
+        hover_surf = load_image('Graphics/start_hover.png', (314, 127)).convert_alpha()
 
         self.btn_start = [default_surf, hover_surf]
         self.btn_index = 0
@@ -77,10 +76,8 @@ class Btn_Stop(pygame.sprite.Sprite):
             - height (int): The height of the game window.
         """
         super().__init__()
-        default_surf = pygame.image.load('Graphics/stop.png').convert_alpha()
-        default_surf = pygame.transform.scale(default_surf, (default_surf.get_width() // 2, default_surf.get_height() // 2))
-        hover_surf = pygame.image.load('Graphics/stop_hover.png').convert_alpha()
-        hover_surf = pygame.transform.scale(hover_surf, (hover_surf.get_width() // 2, hover_surf.get_height() // 2))
+        default_surf = load_image('Graphics/stop.png', (318, 130)).convert_alpha()
+        hover_surf = load_image('Graphics/stop_hover.png', (318, 130)).convert_alpha()
 
         self.btn_stop = [default_surf, hover_surf]
         self.btn_index = 0
@@ -0,0 +1,277 @@
+"""
+Pacman Frame Capture Module
+
+This module lets analysis tools look at the rendered frames of a running game without copying the
+screen. FrameCapture is a game observer: after every tick, when Game.draw_elements has rendered
+the frame and before it is shown, it hands its consumers the screen's pixels as a numpy view from
+pygame.surfarray.pixels3d. The view shares memory with the surface, so it is only valid during the
+call; consumers that keep a frame must copy it. Downscaling is done by striding the view, which is
+free as well. Tools in another process get the frames through a shared memory buffer, at the cost
+of exactly one copy per frame: the packed pixels are copied as they are laid out in the surface.
+
+For tools that only need the state of the board, tile_raster draws a grayscale image with one pixel
+per tile straight from the game state, without rendering anything.
+
+Measure the capture cost per frame with:
+    python -m GUI.capture
+
+Attributes:
+    SHADES (dict): The gray level of every kind of tile and actor in a tile raster.
+    TILE_SHADES (numpy.ndarray): The gray level of every tile type.
+    HEADER_SIZE (int): The bytes before the pixels in a shared frame buffer: the tick and the channel shifts.
+
+Classes:
+    SharedFrameBuffer: A frame in shared memory, with the tick it was captured at.
+        - attach: Opens the buffer created by another process.
+        - rgb: Unpacks the frame.
+        - close: Closes the buffer, and removes it if it was created here.
+
+    FrameCapture: Hands the rendered frames to consumers without copying them.
+        - frame: Exposes the pixels of the surface as a numpy view.
+        - packed: Exposes the packed pixels of the surface as a numpy view.
+        - on_tick: Game observer hook, hands the frame to the consumers and the shared buffer.
+        - close: Closes the shared buffer.
+
+Functions:
+    tile_raster: Draws the game state as a grayscale image with one pixel per tile.
+    benchmark_capture: Measures the time per frame of every way to capture a frame.
+"""
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from time import perf_counter
+import numpy as np
+import pygame
+
+SHADES = {
+    'floor': 0,
+    'coin': 60,
+    'powerup': 120,
+    'door': 150,
+    'wall': 255,
+    'frightened': 90,
+    'ghost': 200,
+    'pacman': 230,
+}
+TILE_SHADES = np.full(256, SHADES['wall'], dtype=np.uint8)
+TILE_SHADES[[0, 1, 2, 9]] = [SHADES['floor'], SHADES['coin'], SHADES['powerup'], SHADES['door']]
+HEADER_SIZE = 16
+
+def tile_raster(game, out=None):
+    """
+    Draws the game state as a grayscale image with one pixel per tile, indexed (x, y) like the boards.
+    Actors are drawn on the tile of their center, Pacman last.
+
+    Parameters:
+        - game (Game): The game to draw.
+        - out (numpy.ndarray): A uint8 array shaped like game.map.tile_types to draw into, or None for a new one.
+
+    Returns:
+        - numpy.ndarray: The raster.
+    """
+    raster = np.take(TILE_SHADES, game.map.tile_types, out=out)
+    width, height = raster.shape
+    for ghost in game.ghosts:
+        x, y = ghost.rect.centerx // 27 % width, ghost.rect.centery // 27
+        if 0 <= y < height:
+            raster[x, y] = SHADES['frightened'] if ghost.freightened else SHADES['ghost']
+    x, y = game.player.rect.centerx // 27 % width, game.player.rect.centery // 27
+    if 0 <= y < height:
+        raster[x, y] = SHADES['pacman']
+    return raster
+
+class SharedFrameBuffer():
+    """
+    A frame in shared memory, with the tick it was captured at, for analysis tools in other processes.
+    Pixels are kept packed as in the surface, one row after the other, so capturing a frame is a
+    plain copy of the surface's memory.
+
+    Attributes:
+        - memory (multiprocessing.shared_memory.SharedMemory): The shared memory block.
+        - tick (numpy.ndarray): One int64, the tick of the frame, -1 before the first one.
+        - shifts (numpy.ndarray): The bit shifts of the red, green and blue channels in a pixel.
+        - pixels (numpy.ndarray): The frame, shaped (height, width) of uint32 pixels.
+    """
+    def __init__(self, shape, name=None, shifts=None):
+        """
+        Creates a shared frame buffer, or opens an existing one.
+
+        Parameters:
+            - shape (tuple): The (height, width) of the frames.
+            - name (str): The name of the shared memory block. None to create a new one.
+            - shifts (tuple): The red, green and blue shifts of the surface's pixel format, when creating.
+        """
+        create = shifts is not None
+        self.memory = shared_memory.SharedMemory(name=name, create=create, size=HEADER_SIZE + 4 * shape[0] * shape[1] if create else 0)
+        self.owner = create
+        self.tick = np.ndarray((1,), dtype=np.int64, buffer=self.memory.buf)
+        self.shifts = np.ndarray((3,), dtype=np.uint8, buffer=self.memory.buf, offset=8)
+        self.pixels = np.ndarray(shape, dtype=np.uint32, buffer=self.memory.buf, offset=HEADER_SIZE)
+        if create:
+            self.tick[0] = -1
+            self.shifts[:] = shifts
+
+    @classmethod
+    def attach(cls, name, shape):
+        """
+        Opens the buffer created by another process.
+
+        Parameters:
+            - name (str): The name of the shared memory block.
+            - shape (tuple): The (height, width) of the frames.
+
+        Returns:
+            - SharedFrameBuffer: The buffer.
+        """
+        return cls(shape, name)
+
+    def rgb(self):
+        """
+        Unpacks the frame.
+
+        Returns:
+            - numpy.ndarray: A (height, width, 3) copy of the frame in RGB.
+        """
+        return np.stack([(self.pixels >> shift).astype(np.uint8) for shift in self.shifts], axis=-1)
+
+    def close(self):
+        """
+        Closes the buffer, and removes it if it was created here.
+        """
+        del self.tick, self.shifts, self.pixels
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+class FrameCapture():
+    """
+    Hands the rendered frames to consumers without copying them. Add it to Game.observers.
+
+    Attributes:
+        - surface (pygame.Surface): The surface to capture. None for the display surface.
+        - downscale (int): Keep every n-th pixel in both directions.
+        - consumers (list): Functions called as consumer(pixels, tick) with every frame.
+        - shared (SharedFrameBuffer): The buffer every frame is copied to, or None.
+        - frames (int): The number of frames captured.
+    """
+    def __init__(self, surface=None, downscale=1, consumers=(), shared=False):
+        """
+        Initializes a new instance of the FrameCapture class.
+
+        Parameters:
+            - surface (pygame.Surface): The surface to capture. None for the display surface.
+            - downscale (int): Keep every n-th pixel in both directions.
+            - consumers (list): Functions called as consumer(pixels, tick) with every frame.
+            - shared (bool): Also copy every frame to a new SharedFrameBuffer.
+        """
+        self.surface = surface
+        self.downscale = downscale
+        self.consumers = list(consumers)
+        self.shared = None
+        self.frames = 0
+        if shared:
+            packed = self.packed()
+            self.shared = SharedFrameBuffer(packed.shape, shifts=self.target().get_shifts()[:3])
+            del packed
+
+    def target(self):
+        """
+        Returns the surface to capture.
+
+        Returns:
+            - pygame.Surface: The surface, or the display surface if none was given.
+        """
+        return self.surface or pygame.display.get_surface()
+
+    def packed(self):
+        """
+        Exposes the packed pixels of the surface, downscaled by striding. Locks the surface like frame().
+
+        Returns:
+            - numpy.ndarray: The (height, width) view of the uint32 pixels, row by row like in memory.
+        """
+        return pygame.surfarray.pixels2d(self.target()).T[::self.downscale, ::self.downscale]
+
+    @contextmanager
+    def frame(self):
+        """
+        Exposes the pixels of the surface as a numpy view, downscaled by striding. The surface is
+        locked while the view exists, so it can't be drawn on or shown until the block ends.
+
+        Yields:
+            - numpy.ndarray: The (width, height, 3) view of the pixels.
+        """
+        pixels = pygame.surfarray.pixels3d(self.target())
+        try:
+            yield pixels[::self.downscale, ::self.downscale]
+        finally:
+            del pixels
+
+    def on_tick(self, game, tick): # pylint: disable=unused-argument
+        """
+        Game observer hook, called once the frame is rendered. Hands the frame to the consumers
+        and copies it to the shared buffer.
+
+        Parameters:
+            - game (Game): The game.
+            - tick (int): The number of the tick.
+        """
+        with self.frame() as pixels:
+            for consumer in self.consumers:
+                consumer(pixels, tick)
+        if self.shared is not None:
+            packed = self.packed()
+            np.copyto(self.shared.pixels, packed)
+            self.shared.tick[0] = tick
+            del packed
+        self.frames += 1
+
+    def close(self):
+        """
+        Closes the shared buffer.
+        """
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
+
+def benchmark_capture(game, surface, frames=100):
+    """
+    Measures the time per frame of every way to capture a frame, with copying the screen into a
+    new array as the baseline.
+
+    Parameters:
+        - game (Game): The game, for the tile raster.
+        - surface (pygame.Surface): The rendered surface.
+        - frames (int): The number of frames to time each way.
+
+    Returns:
+        - dict: The microseconds per frame of each way.
+    """
+    capture = FrameCapture(surface)
+    downscaled = FrameCapture(surface, downscale=4)
+    shared = FrameCapture(surface, shared=True)
+    raster = np.empty(game.map.tile_types.shape, dtype=np.uint8)
+    ways = {
+        'array3d copy': lambda: pygame.surfarray.array3d(surface),
+        'pixels3d view': lambda: capture.on_tick(game, 0),
+        'pixels3d view, 1/4 scale': lambda: downscaled.on_tick(game, 0),
+        'shared memory': lambda: shared.on_tick(game, 0),
+        'tile raster': lambda: tile_raster(game, raster),
+    }
+    timings = {}
+    for name, capture_frame in ways.items():
+        start = perf_counter()
+        for _ in range(frames):
+            capture_frame()
+        timings[name] = (perf_counter() - start) * 1e6 / frames
+    shared.close()
+    return timings
+
+if __name__ == "__main__":
+    from game import Game
+    pygame.init()
+    screen = pygame.display.set_mode((795, 900))
+    benchmark_game = Game()
+    benchmark_game.draw_elements(screen, pygame.sprite.GroupSingle(benchmark_game.player), pygame.sprite.Group(benchmark_game.ghosts))
+    for way, microseconds in benchmark_capture(benchmark_game, screen).items():
+        print(f"{way}: {microseconds:.1f} us per frame")
+    benchmark_game.path_worker.shutdown()
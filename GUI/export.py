@@ -0,0 +1,258 @@
+"""
+Pacman Video Export Module
+
+This module renders recorded games, as written by Telemetry.statestream, to video frames without a
+window. The frames are drawn by the game's own code: Map.draw_board draws the board once, the
+sprites are drawn where the recording has them and Game.render_text draws the HUD. Only the tiles
+whose coin was eaten since the previous frame are drawn again on the kept board, which makes a
+frame several times cheaper to draw than in the game.
+
+The recording is cut into ranges of ticks that a pool of worker processes renders in parallel.
+Each range is written either as PNG files named after the tick, or piped as raw RGB frames to an
+encoder command, one output segment per range, listed in order in a concat file for ffmpeg.
+
+Export a recording with:
+    python -m GUI.export recording.stream frames/ [--ffmpeg]
+
+Attributes:
+    SCREEN_SIZE (tuple): The size of the rendered frames, the size of the game window.
+    FPS (int): The frame rate of the recordings.
+    DEFAULT_CHUNK_FRAMES (int): The number of frames a worker renders at once.
+    FFMPEG_COMMAND (list): An encoder command for ffmpeg, with {width}, {height}, {fps} and {output} placeholders.
+
+Classes:
+    FrameRenderer: Draws the frames of a recording like the game does.
+        - render: Draws one frame of a recording.
+        - save_png: Writes the drawn frame to a PNG file.
+
+Functions:
+    write_png: Writes a surface to a PNG file, compressed for speed.
+    init_worker: Prepares a headless display in a worker process.
+    export_chunk: Renders a range of frames in a worker process.
+    export_frames: Renders frames across a pool of worker processes.
+    export_recording: Renders the frames of a recording file.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+import multiprocessing
+import os
+import struct
+import subprocess
+import sys
+import zlib
+import numpy as np
+import pygame
+from Players.pacman import Pacman
+from Players.ghost import Pinky, Blinky, Inky, Clyde
+from Tiles.map import Map
+from Tiles.tilestore import TileView
+from Telemetry.statestream import read_frames
+from game import Game
+
+SCREEN_SIZE = (795, 900)
+FPS = 60
+DEFAULT_CHUNK_FRAMES = 240
+FFMPEG_COMMAND = ['ffmpeg', '-loglevel', 'error', '-y', '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', '{width}x{height}',
+                  '-r', '{fps}', '-i', '-', '-pix_fmt', 'yuv420p', '{output}']
+
+# The renderer of a worker process, created by the first chunk it renders
+_worker = {}
+
+def write_png(surface, path, level=1):
+    """
+    Writes a surface to a PNG file. pygame.image.save always compresses hard, which takes longer
+    than drawing the frame, so the rows are compressed here with a fast zlib level instead.
+
+    Parameters:
+        - surface (pygame.Surface): The surface to write.
+        - path (str): The path of the PNG file.
+        - level (int): The zlib compression level.
+    """
+    width, height = surface.get_size()
+    rows = np.zeros((height, 1 + 3 * width), dtype=np.uint8)
+    rows[:, 1:] = np.frombuffer(pygame.image.tobytes(surface, 'RGB'), dtype=np.uint8).reshape(height, 3 * width)
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    with open(path, 'wb') as file:
+        file.write(b'\x89PNG\r\n\x1a\n')
+        file.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        file.write(chunk(b'IDAT', zlib.compress(rows.tobytes(), level)))
+        file.write(chunk(b'IEND', b''))
+
+class FrameRenderer(): # pylint: disable=too-many-instance-attributes
+    """
+    Draws the frames of a recording like the game does. The board is drawn once by Map.draw_board
+    and kept; the HUD is drawn by Game.render_text, for which the renderer has the attributes it reads.
+
+    Attributes:
+        - surface (pygame.Surface): The surface the frames are drawn on.
+        - map: Instance of the Map class, whose tiles follow the coins of the recording.
+        - player: Instance of the Pacman class, placed like the recorded Pacman.
+        - ghosts (list): The ghosts, placed like the recorded ghosts.
+        - remaining_coins, vulnerable_timer (int): The recorded HUD counters.
+        - board (pygame.Surface): The drawn board, with the coins of the last frame.
+        - coins (numpy.ndarray): The coins drawn on the board, indexed by (x, y).
+        - pacman_group (pygame.sprite.GroupSingle): The group Pacman is drawn with.
+    """
+    def __init__(self, surface):
+        """
+        Initializes a new instance of the FrameRenderer class and draws the board once.
+        Needs a display mode, which the sprites' images are converted for.
+
+        Parameters:
+            - surface (pygame.Surface): The surface to draw the frames on.
+        """
+        self.surface = surface
+        self.map = Map()
+        self.player = Pacman()
+        self.ghosts = [Pinky(), Blinky(), Inky(), Clyde()]
+        self.remaining_coins = 0
+        self.vulnerable_timer = 0
+        self.coins = np.isin(self.map.tile_types, (1, 2))
+        self.board = pygame.Surface(surface.get_size())
+        Map.draw_board(self.map, self.board)
+        self.pacman_group = pygame.sprite.GroupSingle(self.player)
+
+    def update_tiles(self, coins):
+        """
+        Draws the tiles whose coin or power-up appeared or disappeared again on the cached board.
+
+        Parameters:
+            - coins (numpy.ndarray): The recorded coins, a boolean array indexed by (x, y).
+        """
+        for x, y in np.argwhere(coins != self.coins):
+            tile = TileView(self.map.store, x, y)
+            tile.tile_type = self.map.store.start[x, y] if coins[x, y] else 0
+            self.board.fill('black', tile.rect)
+            self.board.blit(tile.image, tile.rect)
+        self.coins = coins.copy()
+
+    def render(self, frame):
+        """
+        Draws one frame of a recording.
+
+        Parameters:
+            - frame (dict): The frame, in the format of capture_frame.
+
+        Returns:
+            - pygame.Surface: The surface with the frame.
+        """
+        self.update_tiles(frame['coins'])
+        x, y, direction = frame['pacman']
+        self.player.rect.center = (x, y)
+        self.player.direction = direction
+        self.player.image_state(frame['tick'] % 20)
+        ghosts = self.ghosts[:len(frame['ghosts'])]
+        for ghost, (x, y, frightened) in zip(ghosts, frame['ghosts']):
+            ghost.rect.center = (x, y)
+            ghost.freightened = frightened
+            ghost.image = ghost.FREIGHTENED_IMAGE if frightened else ghost.BASIC_IMAGE
+        self.player.score, self.player.lives, self.remaining_coins, self.vulnerable_timer = frame['counters']
+        # The board is drawn like Game.draw_elements does, then the sprites and the game's HUD
+        self.surface.blit(self.board, (0, 0))
+        self.pacman_group.draw(self.surface)
+        pygame.sprite.Group(ghosts).draw(self.surface)
+        Game.render_text(self, self.surface)
+        return self.surface
+
+    def save_png(self, path):
+        """
+        Writes the drawn frame to a PNG file.
+
+        Parameters:
+            - path (str): The path of the PNG file.
+        """
+        write_png(self.surface, path)
+
+def init_worker():
+    """
+    Prepares a headless display in a worker process, without a window or sound.
+    """
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    pygame.display.init()
+    pygame.font.init()
+    pygame.display.set_mode(SCREEN_SIZE)
+
+def export_chunk(frames, out_dir, encoder=None):
+    """
+    Renders a range of frames in a worker process. The first chunk creates the worker's renderer;
+    the next ones reuse it, as the coins drawn on its board follow the frames in any order.
+
+    Parameters:
+        - frames (list): The frames to render, in order.
+        - out_dir (str): The directory to write to.
+        - encoder (list): An encoder command like FFMPEG_COMMAND reading raw RGB frames, or None for PNG files.
+
+    Returns:
+        - str: The name of the segment written by the encoder, or None for PNG files.
+    """
+    if 'renderer' not in _worker:
+        _worker['renderer'] = FrameRenderer(pygame.Surface(SCREEN_SIZE))
+    renderer = _worker['renderer']
+    if encoder is None:
+        for frame in frames:
+            renderer.render(frame)
+            renderer.save_png(os.path.join(out_dir, f"frame_{frame['tick']:06d}.png"))
+        return None
+    segment = f"segment_{frames[0]['tick']:06d}.mp4"
+    width, height = SCREEN_SIZE
+    fields = {'width': width, 'height': height, 'fps': FPS, 'output': os.path.join(out_dir, segment)}
+    with subprocess.Popen([part.format(**fields) for part in encoder], stdin=subprocess.PIPE) as process:
+        for frame in frames:
+            process.stdin.write(pygame.image.tobytes(renderer.render(frame), 'RGB'))
+        process.stdin.close()
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, encoder[0])
+    return segment
+
+def export_frames(frames, out_dir, workers=None, chunk_frames=DEFAULT_CHUNK_FRAMES, encoder=None):
+    """
+    Renders frames across a pool of worker processes, in ranges of chunk_frames ticks. With an
+    encoder, the segments are listed in order in segments.txt, for ffmpeg's concat demuxer.
+
+    Parameters:
+        - frames (iterable): The frames to render, in order.
+        - out_dir (str): The directory to write to. Created if missing.
+        - workers (int): The number of worker processes. None for one per CPU.
+        - chunk_frames (int): The number of frames in a range.
+        - encoder (list): An encoder command like FFMPEG_COMMAND, or None for PNG files.
+
+    Returns:
+        - dict: The number of frames, the seconds the export took and how many times faster than real time it ran.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    frames = list(frames)
+    chunks = [frames[start:start + chunk_frames] for start in range(0, len(frames), chunk_frames)]
+    start = perf_counter()
+    # Spawned workers start with a fresh pygame, never the parent's display
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'), initializer=init_worker) as pool:
+        segments = list(pool.map(export_chunk, chunks, [out_dir] * len(chunks), [encoder] * len(chunks)))
+    seconds = perf_counter() - start
+    if encoder is not None:
+        with open(os.path.join(out_dir, 'segments.txt'), 'w', encoding='utf-8') as file:
+            file.writelines(f"file '{segment}'\n" for segment in segments)
+    return {'frames': len(frames), 'seconds': seconds, 'realtime': len(frames) / FPS / seconds if seconds else 0.0}
+
+def export_recording(path, out_dir, first=0, last=None, **options):
+    """
+    Renders the frames of a recording file, optionally only the ticks from first to last.
+
+    Parameters:
+        - path (str): The path of the recording.
+        - out_dir (str): The directory to write to.
+        - first (int): The first tick to render.
+        - last (int): The last tick to render, or None for the end of the recording.
+        - options: The options of export_frames.
+
+    Returns:
+        - dict: The report of export_frames.
+    """
+    frames = (frame for frame in read_frames(path) if frame['tick'] >= first and (last is None or frame['tick'] <= last))
+    return export_frames(frames, out_dir, **options)
+
+if __name__ == "__main__":
+    report = export_recording(sys.argv[1], sys.argv[2], encoder=FFMPEG_COMMAND if '--ffmpeg' in sys.argv else None)
+    print(f"{report['frames']} frames in {report['seconds']:.1f} s, {report['realtime']:.1f}x real time")
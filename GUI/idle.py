@@ -0,0 +1,90 @@
+"""
+Pacman Idle Scheduler Module
+
+This module defines the IdleScheduler class, used by the screens that mostly wait for the user:
+the menu and the win and lose screens. Instead of polling pygame.event.get() in a loop, it blocks
+in pygame.event.wait until an event arrives or a timeout passes, and tells the screen whether
+anything it shows has changed, so it only redraws when needed. It also measures the CPU time the
+process used while idling.
+
+Attributes:
+    DEFAULT_TIMEOUT_MS (int): The longest time a wait blocks without any event, in milliseconds.
+
+Classes:
+    IdleScheduler: Waits for events and decides when to redraw.
+        - wait: Blocks until the next events arrive or the timeout passes.
+        - changed: Checks whether the visible state changed since the last redraw.
+        - report: Returns the wakeups, redraws and CPU use so far.
+"""
+from time import perf_counter, process_time
+import pygame
+
+DEFAULT_TIMEOUT_MS = 1000
+
+class IdleScheduler():
+    """
+    Waits for events and decides when to redraw.
+
+    Attributes:
+        - timeout_ms (int): The longest time a wait blocks without any event, in milliseconds.
+        - wakeups (int): The number of times a wait returned.
+        - redraws (int): The number of times changed() asked for a redraw.
+    """
+    def __init__(self, timeout_ms=DEFAULT_TIMEOUT_MS):
+        """
+        Initializes a new instance of the IdleScheduler class.
+
+        Parameters:
+            - timeout_ms (int): The longest time a wait blocks without any event, in milliseconds.
+        """
+        self.timeout_ms = timeout_ms
+        self.wakeups = 0
+        self.redraws = 0
+        self.state = object()
+        self.started = (perf_counter(), process_time())
+
+    def wait(self):
+        """
+        Blocks until the next events arrive or the timeout passes.
+
+        Returns:
+            - list: The pygame events, empty if the timeout passed.
+        """
+        event = pygame.event.wait(self.timeout_ms)
+        self.wakeups += 1
+        if event.type == pygame.NOEVENT:
+            return []
+        return [event] + pygame.event.get()
+
+    def changed(self, state, force=False):
+        """
+        Checks whether the visible state changed since the last redraw.
+
+        Parameters:
+            - state: Any comparable value describing what the screen shows, e.g. the button images.
+            - force (bool): Ask for a redraw anyway, e.g. when the window was uncovered.
+
+        Returns:
+            - bool: True if the screen has to be redrawn.
+        """
+        if state == self.state and not force:
+            return False
+        self.state = state
+        self.redraws += 1
+        return True
+
+    def report(self):
+        """
+        Returns the wakeups, redraws and CPU use since the scheduler was created.
+
+        Returns:
+            - dict: Seconds passed, wakeups, redraws and the CPU use of the process in percent of one core.
+        """
+        wall = perf_counter() - self.started[0]
+        cpu = process_time() - self.started[1]
+        return {
+            'seconds': wall,
+            'wakeups': self.wakeups,
+            'redraws': self.redraws,
+            'cpu_percent': 100 * cpu / wall if wall else 0.0,
+        }
@@ -0,0 +1,108 @@
+"""
+Pacman Leaderboard Module
+
+This module defines the Leaderboard class, the high-score panel of the menu. The scores are read
+from a ResultStore on its reader thread, so the menu never waits on the database: a refresh only
+submits the query, and once it is answered a LEADERBOARD_READY event wakes the menu to redraw.
+
+Attributes:
+    LEADERBOARD_READY (int): The pygame event type posted when new scores are read.
+    DEFAULT_COUNT (int): The number of scores shown.
+
+Classes:
+    Leaderboard: The high-score panel of the menu.
+        - refresh: Starts reading the best scores.
+        - record: Stores the result of a game and reads the scores again.
+        - update: Takes the scores once they are read.
+        - draw: Draws the panel.
+        - close: Closes the store.
+
+Functions:
+    announce: Posts LEADERBOARD_READY once a query is answered.
+"""
+import pygame
+
+LEADERBOARD_READY = pygame.event.custom_type()
+DEFAULT_COUNT = 5
+
+def announce(_):
+    """
+    Wakes the menu once a query is answered. Called on the reader thread, where posting is safe.
+    """
+    if pygame.display.get_init():
+        pygame.event.post(pygame.event.Event(LEADERBOARD_READY))
+
+class Leaderboard():
+    """
+    The high-score panel of the menu.
+
+    Attributes:
+        - store (ResultStore): The store the scores are read from.
+        - count (int): The number of scores shown.
+        - rows (tuple): The results shown, best first, as returned by ResultStore.top.
+        - query (concurrent.futures.Future): The query being answered, or None.
+    """
+    def __init__(self, store, count=DEFAULT_COUNT):
+        """
+        Initializes an empty panel.
+
+        Parameters:
+            - store (ResultStore): The store the scores are read from.
+            - count (int): The number of scores shown.
+        """
+        self.store = store
+        self.count = count
+        self.rows = ()
+        self.query = None
+
+    def refresh(self):
+        """
+        Starts reading the best scores on the reader thread of the store, e.g. after a game ended.
+        """
+        self.query = self.store.submit('top', self.count)
+        self.query.add_done_callback(announce)
+
+    def record(self, game, won):
+        """
+        Stores the result of a game and starts reading the best scores again.
+
+        Parameters:
+            - game (Game): The game, after run_game returned.
+            - won (bool): What run_game returned.
+        """
+        self.store.add_game(game, won)
+        self.refresh()
+
+    def update(self):
+        """
+        Takes the scores once they are read, without waiting for them.
+
+        Returns:
+            - tuple: The results shown, to tell the menu whether it has to redraw.
+        """
+        if self.query is not None and self.query.done():
+            self.rows = tuple(self.query.result())
+            self.query = None
+        return self.rows
+
+    def draw(self, screen, midtop):
+        """
+        Draws the panel.
+
+        Parameters:
+            - screen (pygame.Surface): The surface to draw on.
+            - midtop (tuple): Where the middle of the top of the panel goes.
+        """
+        font = pygame.font.Font(None, 36)
+        x, y = midtop
+        title = font.render('HIGH SCORES', True, (255, 255, 0))
+        screen.blit(title, title.get_rect(midtop=(x, y)))
+        for rank, row in enumerate(self.rows, 1):
+            text = font.render(f'{rank}.  {row[0]:>6}   level {row[3]}', True, (255, 255, 255))
+            screen.blit(text, text.get_rect(midtop=(x, y + rank * 28)))
+
+    def close(self):
+        """
+        Closes the store, once the menu quits.
+        """
+        self.store.close()
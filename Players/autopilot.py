@@ -0,0 +1,271 @@
+"""
+Autopilot Module
+
+This module defines the Autopilot class, a controller that plays Pacman without a human, for soak
+tests, demo mode and headless batch runs. On every tile center it weighs the directions Pacman
+can take by two fields over the tiles of the board:
+
+    - the danger field: the distance every tile is from the nearest ghost that isn't frightened,
+      through the corridors and the ghost door, as a multi-source breadth-first search from the
+      ghosts would find it;
+    - the attraction: the distance from the tile to the nearest coin or power-up, or to a
+      frightened ghost while there is time to catch it.
+
+A direction leading closer to a coin is worth more, and one leading within SAFE_DISTANCE of a
+ghost costs DANGER_WEIGHT per tile closer. Between tile centers Pacman can only go on or turn
+back, which he does when a ghost gets near.
+
+The breadth-first searches from every tile are run once per board, all of them at once, into
+tables of the distance between every two tiles, one through the corridors Pacman can walk and one
+through those the ghosts can. A field is then the minimum of the rows of its sources in a table,
+so a decision is a few numpy operations, for one game or for every game of a BatchEngine at once.
+
+Attributes:
+    SAFE_DISTANCE (int): The distance to a ghost, in tiles, under which Pacman flees.
+    DANGER_WEIGHT (float): The cost of every tile closer than SAFE_DISTANCE to a ghost.
+    PREY_BONUS (int): How much closer, in tiles, a frightened ghost seems than a coin.
+    PREY_SECONDS (int): The frightened seconds left under which Pacman stops chasing ghosts.
+    KEEP_BONUS (float): The bonus of keeping the current direction, which breaks ties.
+    TIMING_WINDOW (int): The number of the latest decisions whose time is kept.
+
+Classes:
+    Autopilot (Controller): Drives Pacman by a danger field and a coin attraction.
+        - decide: Returns the direction Pacman should take in a Game.
+        - prepare: Computes the distance tables of a board.
+        - steer: Returns the directions of every game of a BatchEngine.
+        - weighing: Tells in which games the directions are weighed.
+        - choose: Weighs the directions of many games at once.
+        - danger_field: Returns the distance of every tile from the nearest dangerous ghost.
+        - report: Returns the timing statistics of the latest decisions.
+
+Functions:
+    distance_table: Computes the distance between every two tiles of a board.
+"""
+from collections import deque
+from time import perf_counter
+import numpy as np
+from Players.controller import Controller
+from Players.inputbuffer import DIRECTION_STEPS, TILE_SIZE
+from Engine.batch import shortest_distances, PACMAN_SIZE
+from Tiles.map import BOARD
+
+SAFE_DISTANCE = 6
+DANGER_WEIGHT = 20.0
+PREY_BONUS = 8
+PREY_SECONDS = 3
+KEEP_BONUS = 0.5
+TIMING_WINDOW = 10000
+DOOR = 9
+# Farther than any tile of the board, and still safe to add to
+FAR = 10000
+
+def distance_table(walkable):
+    """
+    Computes the distance between every two tiles of a board, teleport included.
+
+    Parameters:
+        - walkable (numpy.ndarray): 2D boolean array indexed by (x, y), True for the tiles walked on.
+
+    Returns:
+        - numpy.ndarray: distance[a, b] for the cells a and b, cell = x * height + y, FAR when not connected.
+    """
+    cells = walkable.size
+    return np.minimum(shortest_distances(walkable), FAR).reshape(cells, cells)
+
+class Autopilot(Controller):
+    """
+    Drives Pacman by a danger field and a coin attraction, in a Game or in every game of a
+    BatchEngine.
+
+    Attributes:
+        - walls (bytes): The walls of the board the tables were computed for.
+        - walkable (numpy.ndarray): The tiles Pacman can walk on, indexed by (x, y).
+        - pacman_distances (numpy.ndarray): The distances between tiles through Pacman's corridors, see distance_table.
+        - ghost_distances (numpy.ndarray): The distances between tiles through the ghosts' corridors and door.
+        - timings (collections.deque): The time the last TIMING_WINDOW decisions of decide took, in seconds.
+    """
+    def __init__(self, board=None):
+        """
+        Initializes an autopilot and computes the distance tables of a board, so the first decision
+        isn't slower than the others. A game on another board has them computed again.
+
+        Parameters:
+            - board (list): The tile types of the board, one list per row. None for Map's BOARD.
+        """
+        self.walls = None
+        self.walkable = None
+        self.pacman_distances = None
+        self.ghost_distances = None
+        self.timings = deque(maxlen=TIMING_WINDOW)
+        self.prepare(np.transpose(np.array(BOARD if board is None else board)))
+
+    def prepare(self, tiles):
+        """
+        Computes the distance tables of a board, unless they are those of its walls already.
+
+        Parameters:
+            - tiles (numpy.ndarray): The tile types, indexed by (x, y).
+        """
+        walls = (tiles >= 3).tobytes()
+        if walls == self.walls:
+            return
+        self.walls = walls
+        self.walkable = tiles < 3
+        self.pacman_distances = distance_table(self.walkable)
+        self.ghost_distances = distance_table(self.walkable | (tiles == DOOR))
+
+    def decide(self, view):
+        """
+        Returns the direction Pacman should take.
+
+        Parameters:
+            - view (GameView): The read-only state of the game.
+
+        Returns:
+            - int or None: The new direction, or None to keep the current one.
+        """
+        start = perf_counter()
+        self.prepare(view.tiles)
+        width, height = view.tiles.shape
+        centers = view.pacman[None, :2]
+        ghost_cells = self.cells(view.ghosts, width, height)[None]
+        frightened = view.frightened[None]
+        direction = -1
+        if self.weighing(centers, ghost_cells, ~frightened)[0]:
+            coins = ((view.tiles == 1) | (view.tiles == 2)).reshape(1, -1)
+            chase = view.vulnerable_timer >= PREY_SECONDS
+            direction = self.choose(centers, view.pacman[None, 2], ghost_cells, ~frightened, frightened & chase, coins)[0]
+        self.timings.append(perf_counter() - start)
+        return None if direction < 0 else int(direction)
+
+    def steer(self, engine):
+        """
+        Returns the directions of every game of a BatchEngine, e.g. as the controller of BatchEngine.run.
+        Only the games on a tile center, or with a ghost near, are weighed.
+
+        Parameters:
+            - engine (BatchEngine): The engine.
+
+        Returns:
+            - numpy.ndarray: The new direction of every game, -1 to keep the current one.
+        """
+        centers = engine.pacman + PACMAN_SIZE // 2
+        directions = np.full(engine.games, -1)
+        ghost_cells = self.cells(engine.ghosts, engine.width, engine.height)
+        dangerous = ~engine.frightened
+        games = np.flatnonzero(self.weighing(centers, ghost_cells, dangerous) & ~engine.done)
+        if games.size:
+            chase = (engine.timer[games] >= PREY_SECONDS)[:, None]
+            directions[games] = self.choose(centers[games], engine.direction[games], ghost_cells[games], dangerous[games],
+                                            engine.frightened[games] & chase, engine.coins[games, :-1] > 0)
+        return directions
+
+    @staticmethod
+    def cells(centers, width, height):
+        """
+        Returns the tiles of centers in pixels, as cells x * height + y.
+
+        Parameters:
+            - centers (numpy.ndarray): The centers, shaped (..., 2).
+            - width (int): The number of columns of the board.
+            - height (int): The number of rows of the board.
+
+        Returns:
+            - numpy.ndarray: The cells, shaped like centers without its last axis.
+        """
+        tiles = (np.asarray(centers) + TILE_SIZE // 2) // TILE_SIZE
+        return np.minimum(np.maximum(tiles[..., 0], 0), width - 1) * height + np.minimum(np.maximum(tiles[..., 1], 0), height - 1)
+
+    def weighing(self, centers, ghost_cells, dangerous):
+        """
+        Tells in which games the directions are weighed: on a tile center, where Pacman may turn, or
+        with a dangerous ghost within SAFE_DISTANCE, when he may have to turn back. Elsewhere he goes on.
+
+        Parameters:
+            - centers (numpy.ndarray): Pacman's center in every game, in pixels, shaped (games, 2).
+            - ghost_cells (numpy.ndarray): The cells of the ghosts, shaped (games, ghosts).
+            - dangerous (numpy.ndarray): Whether every ghost is dangerous, shaped (games, ghosts).
+
+        Returns:
+            - numpy.ndarray: Whether every game is weighed.
+        """
+        width, height = self.walkable.shape
+        weighed = (centers % TILE_SIZE == 0).all(axis=1)
+        if ghost_cells.size:
+            near = self.ghost_distances[ghost_cells, self.cells(centers, width, height)[:, None]]
+            weighed |= (np.where(dangerous, near, FAR) < SAFE_DISTANCE).any(axis=1)
+        return weighed
+
+    def danger_field(self, ghost_cells, dangerous):
+        """
+        Returns the distance of every tile from the nearest dangerous ghost, in many games at once.
+
+        Parameters:
+            - ghost_cells (numpy.ndarray): The cells of the ghosts, shaped (games, ghosts).
+            - dangerous (numpy.ndarray): Whether every ghost is dangerous, shaped (games, ghosts).
+
+        Returns:
+            - numpy.ndarray: The distances, shaped (games, cells), FAR without dangerous ghosts.
+        """
+        fields = np.where(dangerous[..., None], self.ghost_distances[ghost_cells], FAR)
+        return np.min(fields, axis=1, initial=FAR)
+
+    def choose(self, centers, current, ghost_cells, dangerous, prey, coins): # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+        """
+        Weighs the directions Pacman can take in many games at once, and returns the best of each.
+        On a tile center he can take any open direction, between centers only his own or its reverse.
+
+        Parameters:
+            - centers (numpy.ndarray): Pacman's center in every game, in pixels, shaped (games, 2).
+            - current (numpy.ndarray): Pacman's direction in every game.
+            - ghost_cells (numpy.ndarray): The cells of the ghosts, shaped (games, ghosts).
+            - dangerous (numpy.ndarray): Whether every ghost is dangerous, shaped (games, ghosts).
+            - prey (numpy.ndarray): Whether every ghost is worth chasing, shaped (games, ghosts).
+            - coins (numpy.ndarray): Whether every cell has a coin or power-up, shaped (games, cells).
+
+        Returns:
+            - numpy.ndarray: The direction of every game, -1 to keep the current one.
+        """
+        width, height = self.walkable.shape
+        centers = np.asarray(centers)
+        lower = centers // TILE_SIZE
+        centered = centers % TILE_SIZE == 0
+        candidates = np.zeros((len(centers), len(DIRECTION_STEPS)), dtype=np.int64)
+        legal = np.zeros(candidates.shape, dtype=bool)
+        for direction, (dx, dy) in enumerate(DIRECTION_STEPS):
+            axis = 0 if dx else 1
+            # The center Pacman reaches next that way, past the one he stands on
+            ahead = np.where((dx or dy) > 0, lower[:, axis] + 1, np.where(centered[:, axis], lower[:, axis] - 1, lower[:, axis]))
+            x = (ahead if dx else lower[:, 0]) % width
+            y = ahead if dy else lower[:, 1]
+            inside = (y >= 0) & (y < height)
+            y = np.clip(y, 0, height - 1)
+            legal[:, direction] = centered[:, 1 - axis] & inside & self.walkable[x, y]
+            candidates[:, direction] = x * height + y
+        danger = np.take_along_axis(self.danger_field(ghost_cells, dangerous), candidates, axis=1)
+        distances = self.pacman_distances[candidates]
+        attraction = np.where(coins[:, None, :], distances, FAR).min(axis=2)
+        if prey.any():
+            prey_distances = np.take_along_axis(distances, np.broadcast_to(ghost_cells[:, None, :], candidates.shape + ghost_cells.shape[1:]), axis=2)
+            attraction = np.minimum(attraction, np.min(np.where(prey[:, None, :], prey_distances - PREY_BONUS, FAR), axis=2, initial=FAR))
+        values = -attraction - DANGER_WEIGHT * np.maximum(SAFE_DISTANCE - danger, 0)
+        values = values + KEEP_BONUS * (np.arange(len(DIRECTION_STEPS)) == np.asarray(current)[:, None])
+        best = np.where(legal, values, -np.inf).argmax(axis=1)
+        return np.where(legal.any(axis=1) & (best != current), best, -1)
+
+    def report(self):
+        """
+        Returns the timing statistics of the last TIMING_WINDOW decisions of decide.
+
+        Returns:
+            - dict: The number of decisions, and their mean, 99th percentile and max time in milliseconds.
+        """
+        if not self.timings:
+            return {'decisions': 0, 'mean_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+        timings = np.array(self.timings) * 1000
+        return {
+            'decisions': len(timings),
+            'mean_ms': float(timings.mean()),
+            'p99_ms': float(np.percentile(timings, 99)),
+            'max_ms': float(timings.max()),
+        }
@@ -0,0 +1,370 @@
+"""
+Controller Module
+
+This module defines the controller interface that drives Pacman, and the harness that runs it.
+Every tick a controller receives a read-only GameView and returns one of Pacman's directions
+(0: right, 1: left, 2: up, 3: down), or None to keep the current one. Keyboard control is one
+implementation; bots implement the same interface.
+
+Attributes:
+    DEFAULT_BUDGET_MS (float): The default time budget for a single decision, in milliseconds.
+
+Classes:
+    GameView: A read-only, array-based snapshot of the game state.
+
+    Controller (ABC): The interface implemented by everything that drives Pacman.
+        - handle_event: Receives the pygame events of the tick.
+        - decide: Returns the direction Pacman should take.
+
+    KeyboardController (Controller): Drives Pacman with the arrow and WASD keys.
+
+    ControllerHarness: Runs a controller within a time budget and measures its decisions.
+        - handle_event: Forwards a pygame event to an in-process controller.
+        - decide: Asks the controller for a decision, giving up once the budget is spent.
+        - record: Adds the time a decision took to the statistics.
+        - report: Returns the timing statistics of the decisions so far.
+        - close: Stops the controller process.
+"""
+from abc import ABC, abstractmethod
+from time import perf_counter
+import multiprocessing
+import numpy as np
+import pygame
+from Players.pacman import KEY_DIRECTIONS
+
+DEFAULT_BUDGET_MS = 2.0
+
+def read_only(values, dtype):
+    """
+    Creates a numpy array that can't be written to.
+
+    Parameters:
+        - values: The values of the array.
+        - dtype: The numpy type of the array.
+
+    Returns:
+        - numpy.ndarray: The read-only array.
+    """
+    array = np.array(values, dtype=dtype)
+    array.flags.writeable = False
+    return array
+
+class GameView():
+    """
+    A read-only, array-based snapshot of the game state given to controllers.
+
+    Attributes:
+        - tick (int): The number of the tick the view was taken on.
+        - tiles (numpy.ndarray): The current tile types, indexed by (x, y). Eaten coins are 0.
+        - walkable (numpy.ndarray): 1 for tiles Pacman and the ghosts can walk on, indexed by (x, y).
+        - pacman (numpy.ndarray): Pacman's center in pixels and his direction, [x, y, direction].
+        - ghosts (numpy.ndarray): The ghosts' centers in pixels, one [x, y] row per ghost.
+        - frightened (numpy.ndarray): Whether each ghost is frightened.
+        - counters (numpy.ndarray): The score, lives, remaining coins and frightened timer, in this order.
+    """
+    def __init__(self, game, tick):
+        """
+        Takes a view of the given game.
+
+        Parameters:
+            - game (Game): The game to take the view of.
+            - tick (int): The number of the current tick.
+        """
+        player = game.player
+        self.tick = tick
+        self.tiles = read_only(game.map.tile_types, np.uint8)
+        self.walkable = read_only(game.map.simple_board, np.uint8)
+        self.pacman = read_only((player.rect.centerx, player.rect.centery, player.direction), np.int32)
+        self.ghosts = read_only([ghost.rect.center for ghost in game.ghosts], np.int32).reshape(-1, 2)
+        self.frightened = read_only([ghost.freightened for ghost in game.ghosts], np.bool_)
+        self.counters = read_only((player.score, player.lives, game.remaining_coins, game.vulnerable_timer), np.int32)
+
+    def __setstate__(self, state):
+        """
+        Restores a pickled view, e.g. one sent to a controller process. Pickling doesn't keep the
+        read-only flag of the arrays, so it is set again here.
+
+        Parameters:
+            - state (dict): The attributes of the pickled view.
+        """
+        self.__dict__.update(state)
+        for value in state.values():
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+
+    @property
+    def score(self):
+        """
+        The player's score.
+        """
+        return int(self.counters[0])
+
+    @property
+    def lives(self):
+        """
+        The player's remaining lives.
+        """
+        return int(self.counters[1])
+
+    @property
+    def remaining_coins(self):
+        """
+        The number of coins left on the board.
+        """
+        return int(self.counters[2])
+
+    @property
+    def vulnerable_timer(self):
+        """
+        Seconds left in frightened mode.
+        """
+        return int(self.counters[3])
+
+class Controller(ABC):
+    """
+    Controller Class
+
+    The interface implemented by everything that drives Pacman.
+
+    Methods:
+        - handle_event: Receives the pygame events of the tick.
+        - decide: Returns the direction Pacman should take.
+    """
+    def handle_event(self, event):
+        """
+        Receives a pygame event. Controllers that don't read input ignore it.
+
+        Parameters:
+            - event (pygame.event.Event): The pygame event object.
+        """
+
+    @abstractmethod
+    def decide(self, view):
+        """
+        Returns the direction Pacman should take.
+
+        Parameters:
+            - view (GameView): The read-only state of the game.
+
+        Returns:
+            - int or None: The new direction, or None to keep the current one.
+        """
+        raise NotImplementedError("decide method must be implemented in derived classes.")
+
+class KeyboardController(Controller):
+    """
+    Drives Pacman with the arrow and WASD keys.
+
+    Attributes:
+        - requested (int): The direction of the last key pressed and not yet applied, or None.
+    """
+    def __init__(self):
+        self.requested = None
+
+    def handle_event(self, event):
+        """
+        Remembers the direction of a pressed arrow or WASD key.
+
+        Parameters:
+            - event (pygame.event.Event): The pygame event object.
+        """
+        if event.type == pygame.KEYDOWN and event.key in KEY_DIRECTIONS:
+            self.requested = KEY_DIRECTIONS[event.key]
+
+    def decide(self, view):
+        """
+        Returns the direction of the last key pressed since the previous decision.
+
+        Parameters:
+            - view (GameView): The read-only state of the game.
+
+        Returns:
+            - int or None: The requested direction, or None if no key was pressed.
+        """
+        requested, self.requested = self.requested, None
+        return requested
+
+def run_controller_process(controller, connection, game_connection):
+    """
+    Answers decision requests in a separate process until it is told to stop or the connection is closed.
+
+    Parameters:
+        - controller (Controller): The controller making the decisions.
+        - connection (multiprocessing.connection.Connection): The end of the pipe to the game.
+        - game_connection (multiprocessing.connection.Connection): The game's end of the pipe, inherited when forking.
+    """
+    # Otherwise the pipe stays open in this process and closing it in the game never reaches recv()
+    game_connection.close()
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        sequence, view = request
+        start = perf_counter()
+        direction = controller.decide(view)
+        connection.send((sequence, direction, perf_counter() - start))
+
+class ControllerHarness(): # pylint: disable=too-many-instance-attributes
+    """
+    Runs a controller within a time budget and measures how long its decisions take.
+
+    In-process decisions can't be interrupted, so one that runs over the budget is measured and,
+    unless drop_late is off, thrown away. A controller in a separate process is given the budget
+    to answer; after that the game moves on and the late answer is dropped when it arrives.
+
+    Attributes:
+        - controller (Controller): The controller being run.
+        - budget (float): The time budget for a single decision, in seconds.
+        - decisions (int): The number of decisions asked for.
+        - overruns (int): The number of decisions that missed the budget.
+        - total_time (float): The time spent on all decisions, in seconds.
+        - max_time (float): The time spent on the slowest decision, in seconds.
+        - drop_late (bool): Whether in-process decisions over the budget are thrown away or only reported.
+    """
+    def __init__(self, controller, budget_ms=DEFAULT_BUDGET_MS, use_process=False, drop_late=True):
+        """
+        Initializes a new instance of the ControllerHarness class.
+
+        Parameters:
+            - controller (Controller): The controller to run.
+            - budget_ms (float): The time budget for a single decision, in milliseconds.
+            - use_process (bool): Run the controller in a separate process. It won't receive pygame events there.
+            - drop_late (bool): Throw away in-process decisions over the budget. Turn it off for human input,
+              where a hitch must not eat a key press.
+        """
+        self.controller = controller
+        self.budget = budget_ms / 1000
+        self.decisions = 0
+        self.overruns = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.drop_late = drop_late
+        self.sequence = 0
+        self.sent_at = None
+        self.process = None
+        if use_process:
+            self.connection, child_connection = multiprocessing.Pipe()
+            self.process = multiprocessing.Process(target=run_controller_process, args=(controller, child_connection, self.connection), daemon=True)
+            self.process.start()
+            child_connection.close()
+
+    def handle_event(self, event):
+        """
+        Forwards a pygame event to an in-process controller.
+
+        Parameters:
+            - event (pygame.event.Event): The pygame event object.
+        """
+        if self.process is None:
+            self.controller.handle_event(event)
+
+    def decide(self, view):
+        """
+        Asks the controller for a decision, giving up once the budget is spent.
+
+        Parameters:
+            - view (GameView): The read-only state of the game.
+
+        Returns:
+            - int or None: The direction decided within the budget, or None.
+        """
+        self.decisions += 1
+        if self.process is None:
+            start = perf_counter()
+            direction = self.controller.decide(view)
+            return self.measure(perf_counter() - start, direction)
+        return self.decide_remote(view)
+
+    def decide_remote(self, view):
+        """
+        Sends the view to the controller process and waits at most the budget for the answer.
+
+        Parameters:
+            - view (GameView): The read-only state of the game.
+
+        Returns:
+            - int or None: The direction decided within the budget, or None.
+        """
+        # The answer to a request that already missed its budget is only measured, then dropped
+        if self.sent_at is not None and self.connection.poll():
+            self.connection.recv()
+            self.record(perf_counter() - self.sent_at)
+            self.sent_at = None
+        if self.sent_at is not None:
+            # The controller is still busy with an older view, don't queue up another one
+            self.overruns += 1
+            return None
+        self.sequence += 1
+        self.sent_at = perf_counter()
+        self.connection.send((self.sequence, view))
+        if not self.connection.poll(self.budget):
+            self.overruns += 1
+            return None
+        direction = self.connection.recv()[1]
+        # Include the cost of sending the view and receiving the answer
+        elapsed = perf_counter() - self.sent_at
+        self.sent_at = None
+        return self.measure(elapsed, direction)
+
+    def record(self, elapsed):
+        """
+        Adds the time a decision took to the statistics.
+
+        Parameters:
+            - elapsed (float): The time the decision took, in seconds.
+        """
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+
+    def measure(self, elapsed, direction):
+        """
+        Records the time a decision took and drops it if it missed the budget.
+
+        Parameters:
+            - elapsed (float): The time the decision took, in seconds.
+            - direction (int or None): The decided direction.
+
+        Returns:
+            - int or None: The direction, or None if the budget was missed and late decisions are dropped.
+        """
+        self.record(elapsed)
+        if elapsed > self.budget:
+            self.overruns += 1
+            if self.drop_late:
+                return None
+        return direction
+
+    def report(self):
+        """
+        Returns the timing statistics of the decisions so far.
+
+        Returns:
+            - dict: Decision count, overruns, budget, mean and max decision time in milliseconds.
+        """
+        return {
+            'decisions': self.decisions,
+            'overruns': self.overruns,
+            'budget_ms': self.budget * 1000,
+            'mean_ms': self.total_time * 1000 / self.decisions if self.decisions else 0.0,
+            'max_ms': self.max_time * 1000,
+        }
+
+    def close(self):
+        """
+        Stops the controller process, if there is one.
+        """
+        if self.process is not None:
+            try:
+                self.connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self.connection.close()
+            self.process.join(timeout=1)
+            if self.process.is_alive():
+                # SDL turns SIGTERM into a QUIT event once pygame is initialised, so it may be ignored
+                self.process.kill()
+                self.process.join()
+            self.process = None
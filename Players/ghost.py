@@ -3,6 +3,8 @@ Ghost Module
 
 This module defines the Ghost class hierarchy for the Pacman game.
 The module also includes a Breadth-First Search (BFS) algorithm for pathfinding.
+The chasing ghosts search over the junction graph from Tiles.navgraph, which knows the teleport.
+Ghosts move through a FixedMover from Players.movement, so fractional speeds like the frightened 0.8 are kept exactly.
 
 Attributes:
     tile_height (int): The height of a game tile.
@@ -13,6 +15,14 @@ Classes:
         - __init__: Initializes a new instance of the Ghost class.
         - move_base: The base movement logic for ghosts, overridden by specific ghost classes.
         - move_freightened: The movement logic for frightened ghosts.
+        - check_outside: Marks the ghost as outside once it has left the ghost house.
+        - legal_directions: Returns the directions the ghost can take from its current tile.
+        - at_tile_center: Tells whether the ghost stands exactly on a tile center.
+        - advance: Moves the ghost one step along a direction, at its speed.
+        - request_path: Submits a path search to the background path worker.
+        - cancel_path: Cancels the pending path search.
+        - collect_path: Picks up a finished path search.
+        - follow_path: Moves the ghost towards the next tile of its path.
         - update: Updates the ghost's position and behavior for the current frame.
 
     Pinky (Ghost): A class representing the Pinky ghost in the game.
@@ -61,6 +71,11 @@ from queue import SimpleQueue
 from abc import ABC, abstractmethod
 import random
 import pygame
+from GUI.assets import load_image
+from Tiles.map import MOVE_DIRECTIONS, DOOR_SHIFT, LEGAL_MOVES
+from Tiles.navgraph import find_path
+from Tiles.tilestore import collide_any
+from Players.movement import FixedMover
 
 tile_height = 27
 tile_width = 27
@@ -74,26 +89,47 @@ class Ghost(ABC, pygame.sprite.Sprite):
 
     Attributes:
         - speed (float): The movement speed of the ghost.
+        - base_speed (float): The speed of the ghost when it isn't frightened, set by the level.
+        - frightened_speed (float): The speed of the ghost when it is frightened, set by the level.
         - freightened (bool): Flag indicating whether the ghost is in a frightened state.
         - target_tile (tuple): The target tile position for the ghost.
         - direction (tuple): The current movement direction (x, y).
         - outside (bool): Flag indicating whether the ghost had set foot outside the ghost house.
+        - path_worker (PathWorker): Background worker for path searches, or None to search synchronously.
+        - pending_path (PathRequest): The path search waiting for its result, if any.
+        - move_table (numpy.ndarray): The map's legal-move table, or None to probe the walls instead.
+        - mover (FixedMover): The fixed-point position of the ghost, created with its first step.
 
     Methods:
         - __init__: Initializes a new instance of the Ghost class.
         - move_base: The base movement logic for ghosts, overridden by specific ghost classes.
         - move_freightened: The movement logic for frightened ghosts.
+        - check_outside: Marks the ghost as outside once it has left the ghost house.
+        - legal_directions: Returns the directions the ghost can take from its current tile.
+        - at_tile_center: Tells whether the ghost stands exactly on a tile center.
+        - advance: Moves the ghost one step along a direction, at its speed.
+        - request_path: Submits a path search to the background path worker.
+        - cancel_path: Cancels the pending path search.
+        - collect_path: Picks up a finished path search.
+        - follow_path: Moves the ghost towards the next tile of its path.
         - update: Updates the ghost's position and behavior for the current frame.
     """
-    FREIGHTENED_IMAGE = pygame.image.load("Graphics/Ghosts/Vulnerable.png")
-    FREIGHTENED_IMAGE = pygame.transform.scale(FREIGHTENED_IMAGE, (27,27))
+    FREIGHTENED_IMAGE = load_image("Graphics/Ghosts/Vulnerable.png", (27,27))
+    # Set by the game on each ghost; ghosts created outside a Game fall back to these.
+    path_worker = None
+    move_table = None
+    base_speed = 1
+    frightened_speed = 0.8
+
     def __init__(self):
         super().__init__()
-        self.speed = 1
+        self.speed = self.base_speed
         self.freightened = False
         self.target_tile = (15, 12)
         self.direction = (0, 0)
         self.outside = False
+        self.pending_path = None
+        self.mover = None
 
     @abstractmethod
     def move_base(self, wall_group=None, ghost_door=None, simple_board=None, pac_pos=None):
@@ -115,27 +151,140 @@ class Ghost(ABC, pygame.sprite.Sprite):
 
         This method defines the movement logic for frightened ghosts.
         Ghost subclasses (Pinky, Blinky, Inky, Clyde) inherit it.
+        On the center of every tile, a new direction is drawn from the legal ones.
 
         Parameters:
             - wall_group (pygame.sprite.Group): The group of wall sprites.
             - ghost_door (pygame.sprite.Sprite): The sprite representing the ghost door.
         """
+        self.speed = self.frightened_speed
+        if self.at_tile_center():
+            self.check_outside()
+            legal = self.legal_directions(wall_group, ghost_door)
+            if legal:
+                self.direction = random.choice(legal)
+            else:
+                self.direction = (0, 0)
+        self.advance(self.direction)
+
+    def check_outside(self):
+        """
+        Marks the ghost as outside once it stands on one of the tiles right above the ghost door.
+        """
+        if self.rect.center in ((14 * tile_height, 12 * tile_width), (15 * tile_height, 12 * tile_width)):
+            self.outside = True
+
+    def legal_directions(self, wall_group, ghost_door, door_open=None):
+        """
+        Returns the directions the ghost can take from the center of its current tile.
+
+        With a move table, this is a single lookup. Without one, each direction is probed once
+        against the wall and ghost door groups.
+
+        Parameters:
+            - wall_group (pygame.sprite.Group): The group of wall sprites.
+            - ghost_door (pygame.sprite.Group): The group of ghost door sprites.
+            - door_open (bool): Whether the ghost door can be crossed. Defaults to not outside.
+
+        Returns:
+            - tuple: The legal directions (x, y).
+        """
+        if door_open is None:
+            door_open = not self.outside
+        if self.move_table is not None:
+            mask = self.move_table[self.rect.centerx // tile_width % self.move_table.shape[0], self.rect.centery // tile_height]
+            if door_open:
+                mask |= mask >> DOOR_SHIFT
+            return LEGAL_MOVES[mask & 0xF]
         original_pos = self.rect.x, self.rect.y
-        self.speed = 0.8
-        directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
-        while True:
-            if(self.rect.centerx % tile_width == 0 and self.rect.centery % tile_height == 0):
-                self.direction = random.choice(directions)
-                if self.rect.center in ((14 * tile_height, 12 * tile_width), (15 * tile_height, 12 * tile_width)):
-                    self.outside = True
-            self.rect.x += self.direction[0] * self.speed
-            self.rect.y += self.direction[1] * self.speed
-
-            if pygame.sprite.spritecollideany(self, wall_group):
-                self.rect.x, self.rect.y = original_pos
-            if self.outside and pygame.sprite.spritecollideany(self, ghost_door):
-                self.rect.x, self.rect.y = original_pos
-            else: break
+        legal = []
+        for direction in MOVE_DIRECTIONS:
+            self.rect.x += direction[0]
+            self.rect.y += direction[1]
+            blocked = collide_any(self, wall_group) or (not door_open and collide_any(self, ghost_door))
+            self.rect.x, self.rect.y = original_pos
+            if not blocked:
+                legal.append(direction)
+        return tuple(legal)
+
+    def at_tile_center(self):
+        """
+        Tells whether the ghost stands exactly on a tile center, where it chooses its direction.
+        At a fractional speed, its rectangle can be rounded to a center it hasn't reached yet.
+
+        Returns:
+            - bool: True on a tile center.
+        """
+        if self.mover is None:
+            self.mover = FixedMover(self.rect)
+        return self.mover.at_tile_center(self.rect)
+
+    def advance(self, direction):
+        """
+        Moves the ghost one step along a direction, at its speed. The position is kept in fixed
+        point, so fractional speeds are not rounded away, and the step stops on the next tile center.
+
+        Parameters:
+            - direction (tuple): The (x, y) unit step.
+        """
+        if self.mover is None:
+            self.mover = FixedMover(self.rect)
+        self.mover.advance(self.rect, direction, self.speed)
+
+    def request_path(self, simple_board, start, target):
+        """
+        Submits a path search to the background path worker.
+
+        A pending search for the same tiles is kept. A pending search for a different target
+        is stale, so it is cancelled and replaced.
+
+        Parameters:
+            - simple_board (numpy.ndarray): A 2D numpy array representing the game board.
+            - start (tuple): The tile the path should start from.
+            - target (tuple): The tile the path should lead to.
+        """
+        if self.pending_path is not None:
+            if (self.pending_path.start, self.pending_path.target) == (start, target):
+                return
+            self.pending_path.cancel()
+        self.pending_path = self.path_worker.submit(simple_board, start, target)
+
+    def cancel_path(self):
+        """
+        Cancels the pending path search, if any, so it doesn't hold up the path worker.
+        """
+        if self.pending_path is not None:
+            self.pending_path.cancel()
+            self.pending_path = None
+
+    def collect_path(self, start):
+        """
+        Picks up a finished path search. Never waits for a search that is still running.
+
+        Parameters:
+            - start (tuple): The tile the ghost is standing on.
+
+        Returns:
+            - list or None: The found path if a search from start has finished, otherwise None.
+        """
+        request = self.pending_path
+        if request is None or request.start != start or not request.done():
+            return None
+        self.pending_path = None
+        self.target_tile = request.target
+        return request.path()
+
+    def follow_path(self):
+        """
+        Moves the ghost towards the first tile of its path.
+
+        A step of more than one column means the next tile is on the other side of the teleport,
+        so the ghost keeps walking out of the board instead of crossing it.
+        """
+        dx = self.path[0][0] - self.prev_centerx
+        if abs(dx) > 1:
+            dx = -1 if dx > 0 else 1
+        self.advance((dx, self.path[0][1] - self.prev_centery))
 
     def update(self, wall_group=None, ghost_door=None, simple_board=None, pac_pos=None):
         """
@@ -165,8 +314,7 @@ class Pinky(Ghost):
         - move_base: Overrides the base movement logic for Pinky.
         - update: Updates Pinky's position and behavior for the current frame.
     """
-    BASIC_IMAGE = pygame.image.load("Graphics/Ghosts/Pinky.png")
-    BASIC_IMAGE = pygame.transform.scale(BASIC_IMAGE, (27,27))
+    BASIC_IMAGE = load_image("Graphics/Ghosts/Pinky.png", (27,27))
 
     def __init__(self):
         super().__init__()
@@ -181,6 +329,7 @@ class Pinky(Ghost):
         """
         Respawns Pinky at the Starting Position.
         """
+        self.cancel_path()
         self.__init__()
 
     def move_base(self, wall_group=None, ghost_door=None, simple_board=None, pac_pos=None):
@@ -188,32 +337,40 @@ class Pinky(Ghost):
         Overrides the Base Movement Logic for Pinky.
 
         This method implements Pinky's unique movement behavior.
-        Pinky finds the shortest path to Pacman with BFS and travels it. When path is empty,
+        Pinky finds the shortest path to Pacman and travels it. When path is empty,
         it recalculates path based on Pacman's new position.
+        With a path worker, the next path is requested from the last tile of the current one,
+        so it is usually ready when Pinky gets there. Otherwise Pinky waits for it.
 
         Parameters:
             - simple_board (numpy.ndarray): A 2D numpy array representing the game board.
             - pac_pos (tuple): The current position of Pacman.
         """
-        if(self.rect.centerx % tile_width == 0 and self.rect.centery % tile_height == 0): # If Pinky is in the middle of a tile
+        if self.at_tile_center(): # If Pinky is in the middle of a tile
             self.prev_centerx = self.rect.centerx//27
             self.prev_centery = self.rect.centery//27
+            current = (self.rect.centerx // tile_width, self.rect.centery // tile_height)
             # If there's nowhere to go anymore, calculate new path
-            if self.path == []:
+            if self.path == [] and self.path_worker is None:
                 self.target_tile = pac_pos
-                self.path = bfs(simple_board, (self.rect.centerx // tile_width, self.rect.centery // tile_height), pac_pos)
+                self.path = find_path(simple_board, current, pac_pos)
+            elif self.path == []:
+                self.path = self.collect_path(current) or []
             ## If we reached another tile from the path, delete it from the path
-            elif (self.rect.centerx//27, self.rect.centery//27) == self.path[0]:
+            elif current == self.path[0]:
                 self.path.pop(0)
+            if self.path_worker is not None and len(self.path) <= 1:
+                self.request_path(simple_board, self.path[-1] if self.path else current, pac_pos)
+        elif self.pending_path is not None and self.pending_path.target != pac_pos:
+            self.request_path(simple_board, self.pending_path.start, pac_pos)
         if self.path!=[]:
-            self.rect.centerx += (self.path[0][0] - self.prev_centerx) * self.speed
-            self.rect.centery += (self.path[0][1] - self.prev_centery) * self.speed
+            self.follow_path()
 
     def update(self, wall_group=None, ghost_door=None, simple_board=None, pac_pos=None):
         super().update()
         if self.freightened:
             self.image = self.FREIGHTENED_IMAGE
-            self.speed = 0.8
+            self.speed = self.frightened_speed
             self.move_base(wall_group, ghost_door, simple_board, pac_pos)
         else:
             self.image = self.BASIC_IMAGE
@@ -232,8 +389,7 @@ class Blinky(Ghost):
         - move_base: Overrides the base movement logic for Blinky.
         - update: Updates Blinky's position and behavior for the current frame.
     """
-    BASIC_IMAGE = pygame.image.load("Graphics/Ghosts/Blinky.png")
-    BASIC_IMAGE = pygame.transform.scale(BASIC_IMAGE, (27,27))
+    BASIC_IMAGE = load_image("Graphics/Ghosts/Blinky.png", (27,27))
 
     def __init__(self):
         super().__init__()
@@ -264,19 +420,13 @@ class Blinky(Ghost):
             - simple_board (numpy.ndarray): A 2D numpy array representing the game board.
             - pac_pos (tuple): The current position of Pacman.
         """
-        original_pos = self.rect.x, self.rect.y
-        self.speed = 1
-        directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
-        self.rect.x += self.direction[0] * self.speed
-        self.rect.y += self.direction[1] * self.speed
-
-        # When wall is hit, decide on a new direction
-        while (pygame.sprite.spritecollideany(self, wall_group) or pygame.sprite.spritecollideany(self, ghost_door)):
-            self.rect.x, self.rect.y = original_pos
-            if(self.rect.centerx % tile_width == 0 and self.rect.centery % tile_height == 0):
-                self.direction = random.choice(directions)
-            self.rect.x += self.direction[0] * self.speed
-            self.rect.y += self.direction[1] * self.speed
+        self.speed = self.base_speed
+        # When a wall is ahead, decide on a new direction
+        if self.at_tile_center():
+            legal = self.legal_directions(wall_group, ghost_door, door_open=False)
+            if self.direction not in legal:
+                self.direction = random.choice(legal) if legal else (0, 0)
+        self.advance(self.direction)
 
     def update(self, wall_group=None, ghost_door=None, simple_board=None, pac_pos=None):
         """
@@ -315,8 +465,7 @@ class Inky(Ghost):
         - move_base: Overrides the base movement logic for Inky.
         - update: Updates Inky's position and behavior for the current frame.
     """
-    BASIC_IMAGE = pygame.image.load("Graphics/Ghosts/Inky.png")
-    BASIC_IMAGE = pygame.transform.scale(BASIC_IMAGE, (27,27))
+    BASIC_IMAGE = load_image("Graphics/Ghosts/Inky.png", (27,27))
 
     def __init__(self):
         super().__init__()
@@ -332,6 +481,7 @@ class Inky(Ghost):
         """
         Respawns Inky at the Starting Position.
         """
+        self.cancel_path()
         self.__init__()
 
     def move_base(self, wall_group=None, ghost_door=None, simple_board=None, pac_pos=None):
@@ -339,8 +489,10 @@ class Inky(Ghost):
         Overrides the Base Movement Logic for Inky.
 
         This method implements Inky's unique movement behavior.
-        Inky uses BFS to find the shortest path to Pacman and travels it. On every center of a tile,
+        Inky finds the shortest path to Pacman and travels it. On every center of a tile,
         it recalculates the path based on Pacman's new position.
+        With a path worker, the path is requested one tile ahead and picked up on arrival.
+        Until it arrives, Inky keeps following the rest of its previous path.
 
         Parameters:
             - wall_group (pygame.sprite.Group): A sprite group containing wall sprites.
@@ -348,14 +500,24 @@ class Inky(Ghost):
             - simple_board (numpy.ndarray): A 2D numpy array representing the game board.
             - pac_pos (tuple): The current position of Pacman.
         """
-        if(self.rect.centerx % tile_width == 0 and self.rect.centery % tile_height == 0):
+        if self.at_tile_center():
             self.prev_centerx = self.rect.centerx//27
             self.prev_centery = self.rect.centery//27
-            self.target_tile = pac_pos
-            self.path = bfs(simple_board, (self.rect.centerx // tile_width, self.rect.centery // tile_height), pac_pos)
+            current = (self.rect.centerx // tile_width, self.rect.centery // tile_height)
+            if self.path_worker is None:
+                self.target_tile = pac_pos
+                self.path = find_path(simple_board, current, pac_pos)
+            else:
+                if self.path and self.path[0] == current:
+                    self.path.pop(0)
+                found = self.collect_path(current)
+                if found is not None:
+                    self.path = found
+                self.request_path(simple_board, self.path[0] if self.path else current, pac_pos)
+        elif self.pending_path is not None and self.pending_path.target != pac_pos:
+            self.request_path(simple_board, self.pending_path.start, pac_pos)
         if self.path!=[]:
-            self.rect.centerx += (self.path[0][0] - self.prev_centerx) * self.speed
-            self.rect.centery += (self.path[0][1] - self.prev_centery) * self.speed
+            self.follow_path()
         if self.path is None:
             raise Exception("Uh oh")
 
@@ -373,11 +535,15 @@ class Inky(Ghost):
         """
         if self.freightened:
             self.image = self.FREIGHTENED_IMAGE
-            self.speed = 0.8
+            self.speed = self.frightened_speed
             self.move_base(wall_group, ghost_door, simple_board, pac_pos)
         else:
             self.image = self.BASIC_IMAGE
             self.move_base(wall_group, ghost_door, simple_board, pac_pos)
+        if self.rect.centerx > 800:
+            self.rect.centerx = 0
+        if self.rect.centerx < 0:
+            self.rect.centerx = 800
 
 class Clyde(Ghost):
     """
@@ -392,8 +558,7 @@ class Clyde(Ghost):
         - move_base: Overrides the base movement logic for Clyde.
         - update: Updates Clyde's position and behavior for the current frame.
     """
-    BASIC_IMAGE = pygame.image.load("Graphics/Ghosts/Clyde.png")
-    BASIC_IMAGE = pygame.transform.scale(BASIC_IMAGE, (27,27))
+    BASIC_IMAGE = load_image("Graphics/Ghosts/Clyde.png", (27,27))
 
     def __init__(self):
         super().__init__()
@@ -422,21 +587,13 @@ class Clyde(Ghost):
             - simple_board (numpy.ndarray): A 2D numpy array representing the game board.
             - pac_pos (tuple): The current position of Pacman.
         """
-        original_pos = self.rect.x, self.rect.y
-        directions = [(0, 1), (0, -1), (1, 0), (-1, 0), self.direction, self.direction, self.direction]
-        while True:
-            if(self.rect.centerx % tile_width == 0 and self.rect.centery % tile_height == 0):
-                self.direction = random.choice(directions)
-                if self.rect.center in {(14*tile_height, 12*tile_width), self.rect.center == (15*tile_height, 12*tile_width)}:
-                    self.outside = True
-            self.rect.centerx += self.direction[0] * self.speed
-            self.rect.centery += self.direction[1] * self.speed
-
-            if pygame.sprite.spritecollideany(self, wall_group):
-                self.rect.x, self.rect.y = original_pos
-            elif pygame.sprite.spritecollideany(self, ghost_door) and self.outside:
-                self.rect.x, self.rect.y = original_pos
-            else: break
+        if self.at_tile_center():
+            self.check_outside()
+            legal = self.legal_directions(wall_group, ghost_door)
+            # The current direction is listed three more times to make it more likely
+            choices = [direction for direction in MOVE_DIRECTIONS + [self.direction] * 3 if direction in legal]
+            self.direction = random.choice(choices) if choices else (0, 0)
+        self.advance(self.direction)
 
     def update(self, wall_group=None, ghost_door=None, simple_board=None, pac_pos=None):
         """
@@ -494,7 +651,7 @@ def bfs(simple_board, start, target):
 
 def get_neighbors(current, simple_board):
     """
-    Get Valid Neighbors for a Given Position on the Game Board.
+    Get Valid Neighbors for a Given Position on the Game Board, including the ones across the teleport.
 
     Parameters:
         - current (tuple): The current position.
@@ -505,7 +662,8 @@ def get_neighbors(current, simple_board):
     """
     neighbors = []
     for direction in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
-        neighbor = (current[0] + direction[0], current[1] + direction[1])
-        if 0 <= neighbor[0] < simple_board.shape[0] and 0 <= neighbor[1] < simple_board.shape[1] and simple_board[neighbor] == 1:
+        # The left and right edges are connected by the teleport
+        neighbor = ((current[0] + direction[0]) % simple_board.shape[0], current[1] + direction[1])
+        if 0 <= neighbor[1] < simple_board.shape[1] and simple_board[neighbor] == 1:
             neighbors.append(neighbor)
     return neighbors
@@ -0,0 +1,187 @@
+"""
+Input Buffer Module
+
+This module defines the InputBuffer class, the keyboard controller the game uses by default. A key
+press is timestamped when the game loop receives it and kept as a requested turn until Pacman can
+actually move that way, which for a turn into a side corridor is when he reaches the tile center.
+A turn pressed a few pixels early is no longer lost to the wall, nor does it stop Pacman.
+
+The buffer also measures the input-to-motion latency of every turn: the time from the key press to
+the first frame that shows Pacman moving in the new direction. Each turn is recorded on the game's
+EventBus as a TURN event whose value is the latency in milliseconds, and summarized by report().
+
+Attributes:
+    PACMAN_SIZE (int): The size of Pacman's collision rectangle, in pixels.
+    TILE_SIZE (int): The size of a tile, in pixels.
+    DIRECTION_STEPS (tuple): The (dx, dy) step of each of Pacman's directions.
+
+Classes:
+    InputBuffer (Controller): Buffers turns until they are legal and measures their latency.
+        - handle_event: Timestamps and buffers the turn of a pressed arrow or WASD key.
+        - decide: Applies the buffered turn once it is legal.
+        - on_tick: Game observer hook, measures the latency once the turn shows.
+        - report: Returns the latency statistics of the turns so far.
+
+Functions:
+    can_move: Tells whether Pacman can take a step in a direction, like Pacman.move decides it.
+    can_turn: Tells whether a turn leads Pacman into the next tile and may be taken now.
+"""
+from time import perf_counter
+import numpy as np
+import pygame
+from Players.pacman import KEY_DIRECTIONS
+from Players.controller import Controller
+from Telemetry.events import TURN
+
+PACMAN_SIZE = 20
+TILE_SIZE = 27
+DIRECTION_STEPS = ((1, 0), (-1, 0), (0, -1), (0, 1))
+
+def can_move(tiles, x, y, direction):
+    """
+    Tells whether Pacman can take a step in a direction. Mirrors Pacman.move: the step is taken,
+    wrapped around the sides of the board, and refused if Pacman's rectangle then overlaps a wall
+    or the ghost door.
+
+    Parameters:
+        - tiles (numpy.ndarray): The tile types, indexed by (x, y), e.g. GameView.tiles.
+        - x (int): The x coordinate of Pacman's center, in pixels.
+        - y (int): The y coordinate of Pacman's center, in pixels.
+        - direction (int): The direction of the step.
+
+    Returns:
+        - bool: True if Pacman would move.
+    """
+    dx, dy = DIRECTION_STEPS[direction]
+    x, y = x + dx, y + dy
+    if x > 800:
+        x = 0
+    if x < 0:
+        x = 800
+    # Tiles span [27 * i - 13, 27 * i + 14) around their centers, Pacman [center - 10, center + 10)
+    left, top = x - PACMAN_SIZE // 2, y - PACMAN_SIZE // 2
+    first_x, last_x = -((13 - left) // TILE_SIZE), (left + PACMAN_SIZE + 12) // TILE_SIZE
+    first_y, last_y = -((13 - top) // TILE_SIZE), (top + PACMAN_SIZE + 12) // TILE_SIZE
+    covered = tiles[max(first_x, 0):last_x + 1, max(first_y, 0):last_y + 1]
+    return not np.any(covered >= 3)
+
+def can_turn(tiles, x, y, current, direction):
+    """
+    Tells whether a turn may be taken now. Pacman's rectangle is smaller than a corridor, so he
+    can always take a few pixels towards a wall; a turn is only legal when the next tile that way
+    is open. A turn into a side corridor waits for the tile center, unless Pacman is stopped.
+
+    Parameters:
+        - tiles (numpy.ndarray): The tile types, indexed by (x, y), e.g. GameView.tiles.
+        - x (int): The x coordinate of Pacman's center, in pixels.
+        - y (int): The y coordinate of Pacman's center, in pixels.
+        - current (int): Pacman's current direction.
+        - direction (int): The direction of the turn.
+
+    Returns:
+        - bool: True if Pacman may turn.
+    """
+    dx, dy = DIRECTION_STEPS[direction]
+    tile_x, tile_y = (x + 13) // TILE_SIZE, (y + 13) // TILE_SIZE
+    width, height = tiles.shape
+    if not 0 <= tile_y + dy < height or tiles[(tile_x + dx) % width, tile_y + dy] >= 3:
+        return False
+    if not can_move(tiles, x, y, direction):
+        return False
+    if current // 2 == direction // 2:
+        # Reversing is legal anywhere
+        return True
+    position = x if current < 2 else y
+    return position % TILE_SIZE == 0 or not can_move(tiles, x, y, current)
+
+class InputBuffer(Controller):
+    """
+    Buffers the turn of the last key pressed until Pacman can move that way, and measures how long
+    each turn took to show on screen. Add it to Game.observers for the measurement.
+
+    Attributes:
+        - requested (int): The direction of the buffered turn, or None.
+        - requested_at (float): When the key of the buffered turn was received, from perf_counter.
+        - turning (tuple): The direction, key time and Pacman's center of a turn applied but not yet shown, or None.
+        - latencies (list): The input-to-motion latency of every turn, in milliseconds.
+    """
+    def __init__(self):
+        """
+        Initializes a new instance of the InputBuffer class.
+        """
+        self.requested = None
+        self.requested_at = 0.0
+        self.turning = None
+        self.latencies = []
+
+    def handle_event(self, event):
+        """
+        Timestamps and buffers the turn of a pressed arrow or WASD key. A newer key replaces it.
+
+        Parameters:
+            - event (pygame.event.Event): The pygame event object.
+        """
+        if event.type == pygame.KEYDOWN and event.key in KEY_DIRECTIONS:
+            self.requested = KEY_DIRECTIONS[event.key]
+            self.requested_at = perf_counter()
+
+    def decide(self, view):
+        """
+        Applies the buffered turn once it is legal, and keeps it buffered until then.
+
+        Parameters:
+            - view (GameView): The read-only state of the game.
+
+        Returns:
+            - int or None: The direction of the turn, or None to keep the current one.
+        """
+        x, y, direction = (int(value) for value in view.pacman)
+        if self.requested is None:
+            return None
+        if self.requested == direction:
+            self.requested = None
+            return None
+        if not can_turn(view.tiles, x, y, direction, self.requested):
+            return None
+        self.turning = (self.requested, self.requested_at, (x, y))
+        self.requested = None
+        return self.turning[0]
+
+    def on_tick(self, game, tick): # pylint: disable=unused-argument
+        """
+        Game observer hook, called once the frame is rendered. Records the latency of the applied
+        turn when the frame shows Pacman moving in its direction.
+
+        Parameters:
+            - game (Game): The game.
+            - tick (int): The number of the tick.
+        """
+        if self.turning is None:
+            return
+        direction, requested_at, start = self.turning
+        player = game.player
+        if player.direction != direction:
+            # Something else, e.g. a respawn, changed the direction first
+            self.turning = None
+        elif player.rect.center != start:
+            latency = (perf_counter() - requested_at) * 1000
+            self.latencies.append(latency)
+            game.events.emit(TURN, player.rect.centerx // TILE_SIZE, player.rect.centery // TILE_SIZE, round(latency))
+            self.turning = None
+
+    def report(self):
+        """
+        Returns the latency statistics of the turns so far.
+
+        Returns:
+            - dict: The number of turns, and their mean, 95th percentile and max latency in milliseconds.
+        """
+        if not self.latencies:
+            return {'turns': 0, 'mean_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+        latencies = np.array(self.latencies)
+        return {
+            'turns': len(latencies),
+            'mean_ms': float(latencies.mean()),
+            'p95_ms': float(np.percentile(latencies, 95)),
+            'max_ms': float(latencies.max()),
+        }
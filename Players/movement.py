@@ -0,0 +1,215 @@
+"""
+Movement Module
+
+This module defines the fixed-point movement core of Pacman and the ghosts. A pygame.Rect only
+holds whole pixels and rounds what is added to it, so a ghost moving 0.8 pixels a tick used to
+move a full pixel to the right and none to the left. A FixedMover keeps the center of an entity
+in fixed point, with FIXED_SHIFT fractional bits, and only rounds it when placing the rectangle.
+
+A step is swept against the obstacles instead of tested at its end: every obstacle in the area
+the rectangle covers on its way is found at once, and the rectangle stops flush against the
+nearest one. A step of many pixels can't jump through a wall. The tile centers
+are where the entities choose their direction, so none is skipped: a step either asks a turn
+callback for the direction on every center it passes, or ends on the first one and carries the
+rest into the next step.
+
+Attributes:
+    FIXED_SHIFT (int): The number of fractional bits of a fixed-point coordinate.
+    FIXED_ONE (int): One pixel in fixed point.
+    TILE_SIZE (int): The size of a tile, in pixels.
+    FIXED_TILE (int): The size of a tile in fixed point.
+
+Classes:
+    FixedMover: The fixed-point center of an entity, kept in step with its rectangle.
+        - sync: Takes the position of the rectangle if something else moved it.
+        - place: Moves the rectangle to the rounded fixed-point center.
+        - at_tile_center: Tells whether the entity stands exactly on a tile center.
+        - advance: Moves the entity along a direction, swept against obstacles.
+
+Functions:
+    to_fixed: Converts pixels to fixed point.
+    to_pixels: Rounds a fixed-point coordinate to whole pixels.
+    obstacle_rects: Returns the rectangles of the obstacles overlapping an area.
+    sweep: Returns how far a rectangle can move along a direction before it hits an obstacle.
+"""
+import pygame
+from Tiles.tilestore import TileLayer
+
+FIXED_SHIFT = 16
+FIXED_ONE = 1 << FIXED_SHIFT
+TILE_SIZE = 27
+FIXED_TILE = TILE_SIZE * FIXED_ONE
+
+def to_fixed(pixels):
+    """
+    Converts pixels to fixed point.
+
+    Parameters:
+        - pixels (float): The value in pixels.
+
+    Returns:
+        - int: The value in fixed point.
+    """
+    return round(pixels * FIXED_ONE)
+
+def to_pixels(value):
+    """
+    Rounds a fixed-point coordinate to whole pixels, halves up.
+
+    Parameters:
+        - value (int): The value in fixed point.
+
+    Returns:
+        - int: The value in pixels.
+    """
+    return (value + FIXED_ONE // 2) >> FIXED_SHIFT
+
+def obstacle_rects(area, obstacles):
+    """
+    Returns the rectangles of the obstacles overlapping an area.
+
+    Parameters:
+        - area (pygame.Rect): The area.
+        - obstacles (list): TileLayer objects or sprite groups.
+
+    Returns:
+        - list: The pygame.Rect of every overlapping obstacle.
+    """
+    rects = []
+    for group in obstacles:
+        if isinstance(group, TileLayer):
+            rects += [pygame.Rect(x * TILE_SIZE - 13, y * TILE_SIZE - 13, TILE_SIZE, TILE_SIZE) for x, y in group.covered(area).tolist()]
+        else:
+            rects += [sprite.rect for sprite in group if area.colliderect(sprite.rect)]
+    return rects
+
+def sweep(rect, direction, distance, obstacles):
+    """
+    Returns how far a rectangle can move along a direction before it overlaps an obstacle. The
+    obstacles in the area the move covers are found at once, and the rectangle stops one pixel
+    before the nearest of them. A rectangle already overlapping an obstacle doesn't move.
+
+    Parameters:
+        - rect (pygame.Rect): The rectangle.
+        - direction (tuple): The (dx, dy) unit step.
+        - distance (int): The length of the move, in pixels.
+        - obstacles (list): TileLayer objects or sprite groups.
+
+    Returns:
+        - int: The number of pixels the rectangle can move, at most distance.
+    """
+    dx, dy = direction
+    free = distance
+    for other in obstacle_rects(rect.union(rect.move(dx * distance, dy * distance)), obstacles):
+        # The gap between the leading edge of the rectangle and the obstacle
+        if dx:
+            gap = other.left - rect.right if dx > 0 else rect.left - other.right
+        else:
+            gap = other.top - rect.bottom if dy > 0 else rect.top - other.bottom
+        free = min(free, max(gap, 0))
+    return free
+
+class FixedMover():
+    """
+    The fixed-point center of an entity, kept in step with its rectangle. The rectangle stays the
+    position the rest of the game reads; the mover notices when something else, like a respawn or
+    the teleport, moves it and starts again from there.
+
+    Attributes:
+        - x, y (int): The center of the entity in fixed point.
+        - pixels (tuple): The center last given to the rectangle, in pixels.
+        - carry (int): The rest of the last step, cut short by a tile center, in fixed point.
+    """
+    def __init__(self, rect):
+        """
+        Initializes a mover at the center of a rectangle.
+
+        Parameters:
+            - rect (pygame.Rect): The rectangle of the entity.
+        """
+        self.x, self.y = to_fixed(rect.centerx), to_fixed(rect.centery)
+        self.pixels = rect.center
+        self.carry = 0
+
+    def sync(self, rect):
+        """
+        Takes the position of the rectangle if something else moved it since the last step.
+
+        Parameters:
+            - rect (pygame.Rect): The rectangle of the entity.
+        """
+        if rect.center != self.pixels:
+            self.x, self.y = to_fixed(rect.centerx), to_fixed(rect.centery)
+            self.pixels = rect.center
+            self.carry = 0
+
+    def place(self, rect):
+        """
+        Moves the rectangle to the rounded fixed-point center.
+
+        Parameters:
+            - rect (pygame.Rect): The rectangle of the entity.
+        """
+        rect.center = (to_pixels(self.x), to_pixels(self.y))
+        self.pixels = rect.center
+
+    def at_tile_center(self, rect):
+        """
+        Tells whether the entity stands exactly on a tile center, not just rounded to one.
+
+        Parameters:
+            - rect (pygame.Rect): The rectangle of the entity.
+
+        Returns:
+            - bool: True on a tile center.
+        """
+        self.sync(rect)
+        return self.x % FIXED_TILE == 0 and self.y % FIXED_TILE == 0
+
+    def advance(self, rect, direction, speed, obstacles=(), turn=None):
+        """
+        Moves the entity along a direction and stops flush against the first obstacle on the way.
+        On a tile center reached with some of the step left, turn chooses the direction to go on
+        with. Without it the step ends on the center and the rest, up to a full step, is added to
+        the next one, so the entity always gets to choose its direction there.
+
+        Parameters:
+            - rect (pygame.Rect): The rectangle of the entity, placed at the new position.
+            - direction (tuple): The (dx, dy) unit step, or (0, 0) to stay.
+            - speed (float): The length of the step, in pixels.
+            - obstacles (list): TileLayer objects or sprite groups to sweep against.
+            - turn (callable): Called as turn(direction) on the tile centers passed, returns the new direction.
+
+        Returns:
+            - float: The distance moved, in pixels.
+        """
+        self.sync(rect)
+        distance = to_fixed(speed) + self.carry
+        self.carry = 0
+        moved = 0
+        while distance > 0 and direction != (0, 0):
+            dx, dy = direction
+            sign = dx or dy
+            position = self.x if dx else self.y
+            # The distance to the next tile center ahead, a whole tile when standing on one
+            step = min(distance, -sign * position % FIXED_TILE or FIXED_TILE)
+            target = to_pixels(position + sign * step)
+            if obstacles:
+                free = sweep(rect, direction, abs(target - to_pixels(position)), obstacles)
+                if to_pixels(position) + sign * free != target:
+                    # Flush against the obstacle, on whole pixels
+                    step = abs((to_pixels(position) + sign * free << FIXED_SHIFT) - position)
+                    distance = step
+            if dx:
+                self.x += sign * step
+            else:
+                self.y += sign * step
+            self.place(rect)
+            moved += step
+            distance -= step
+            if distance > 0 and turn is None:
+                self.carry = min(distance, to_fixed(speed))
+                break
+            if distance > 0:
+                direction = turn(direction)
+        return moved / FIXED_ONE
@@ -7,6 +7,8 @@ Pacman is controlled by the player and must navigate the maze, collect coins, an
 Attributes:
     tile_height (int): The height of a game tile.
     tile_width (int): The width of a game tile.
+    KEY_DIRECTIONS (dict): Maps the arrow and WASD keys to Pacman's directions.
+    DIRECTION_STEPS (dict): The (x, y) unit step of each of Pacman's directions.
 
 Classes:
     Pacman (pygame.sprite.Sprite): A class representing the Pacman character in the game.
@@ -14,15 +16,26 @@ Classes:
         - image_state: Sets the image of Pacman based on its direction and animation index.
         - move: Moves Pacman in the current direction, considering collisions with walls and ghost doors.
         - respawn: Respawns Pacman at the starting position with a decreased life count.
+        - reset: Resets Pacman for a new game, keeping the loaded images.
         - change_direction: Changes Pacman's direction based on the user input.
         - update: Updates Pacman's position and image for the current frame.
 """
 import pygame
+from GUI.assets import load_image
+from Players.movement import FixedMover
 
 tile_height = 27
 tile_width = 27
 
-class Pacman(pygame.sprite.Sprite):
+KEY_DIRECTIONS = {
+    pygame.K_UP: 2, ord('w'): 2,
+    pygame.K_DOWN: 3, ord('s'): 3,
+    pygame.K_LEFT: 1, ord('a'): 1,
+    pygame.K_RIGHT: 0, ord('d'): 0,
+}
+DIRECTION_STEPS = {0: (1, 0), 1: (-1, 0), 2: (0, -1), 3: (0, 1)}
+
+class Pacman(pygame.sprite.Sprite): # pylint: disable=too-many-instance-attributes
     """
     A class representing the Pacman character in the game.
 
@@ -33,25 +46,29 @@ class Pacman(pygame.sprite.Sprite):
         score (int): The score accumulated by Pacman.
         lives (int): The number of lives remaining for Pacman.
         direction (int): The current direction of Pacman (0: right, 1: left, 2: up, 3: down).
-        speed (int): The speed at which Pacman moves.
+        speed (float): The speed at which Pacman moves, in pixels per tick.
+        mover (FixedMover): The fixed-point position of Pacman.
     """
     def __init__(self):
         super().__init__()
-        pcmn1_surf = pygame.image.load("Graphics/Pacman/1.png").convert_alpha()
-        pcmn1_surf = pygame.transform.scale(pcmn1_surf, (20, 20))
-        pcmn2_surf = pygame.image.load("Graphics/Pacman/2.png").convert_alpha()
-        pcmn2_surf = pygame.transform.scale(pcmn2_surf, (20, 20))
-        pcmn3_surf = pygame.image.load("Graphics/Pacman/3.png").convert_alpha()
-        pcmn3_surf = pygame.transform.scale(pcmn3_surf, (20, 20))
-        pcmn4_surf = pygame.image.load("Graphics/Pacman/4.png").convert_alpha()
-        pcmn4_surf = pygame.transform.scale(pcmn4_surf, (20, 20))
+        pcmn1_surf = load_image("Graphics/Pacman/1.png", (20, 20)).convert_alpha()
+        pcmn2_surf = load_image("Graphics/Pacman/2.png", (20, 20)).convert_alpha()
+        pcmn3_surf = load_image("Graphics/Pacman/3.png", (20, 20)).convert_alpha()
+        pcmn4_surf = load_image("Graphics/Pacman/4.png", (20, 20)).convert_alpha()
         self.pacman_image = [pcmn1_surf, pcmn2_surf, pcmn3_surf, pcmn4_surf]
+        self.reset()
+
+    def reset(self):
+        """
+        Resets Pacman for a new game, keeping the loaded images.
+        """
         self.image = self.pacman_image[0]
         self.rect = self.image.get_rect(center = (15*tile_height,24*tile_width))
         self.score = 0
         self.lives = 3
         self.direction = 0
         self.speed = 1
+        self.mover = FixedMover(self.rect)
 
     def image_state(self, index):
         """
@@ -72,34 +89,20 @@ class Pacman(pygame.sprite.Sprite):
     def move(self, wall_group, ghost_door):
         """
         Moves Pacman in the current direction, considering collisions with walls and ghost doors.
+        The step is swept, so Pacman stops flush against a wall at any speed, and it stops on the
+        next tile center, where a turn can be taken.
 
         Parameters:
-            wall_group (pygame.sprite.Group): A group containing wall sprites.
-            ghost_door (pygame.sprite.Group): A group containing ghost door sprites.
+            wall_group (pygame.sprite.Group or TileLayer): A group containing wall sprites.
+            ghost_door (pygame.sprite.Group or TileLayer): A group containing ghost door sprites.
         """
-        original_pos = (self.rect.x, self.rect.y)
-
-        dx = dy = 0
-        if self.direction == 0:
-            dx = self.speed
-        elif self.direction == 1:
-            dx = -self.speed
-        elif self.direction == 2:
-            dy = -self.speed
-        elif self.direction == 3:
-            dy = self.speed
-
-        self.rect.x += dx
-        self.rect.y += dy
+        self.mover.advance(self.rect, DIRECTION_STEPS.get(self.direction, (0, 0)), self.speed, (wall_group, ghost_door))
 
         if self.rect.centerx > 800:
             self.rect.centerx = 0
         if self.rect.centerx < 0:
             self.rect.centerx = 800
 
-        if pygame.sprite.spritecollideany(self, wall_group) or pygame.sprite.spritecollideany(self, ghost_door):
-            self.rect.x, self.rect.y = original_pos
-
     def respawn(self):
         """
         Respawns Pacman at the starting position with a decreased life count.
@@ -115,15 +118,8 @@ class Pacman(pygame.sprite.Sprite):
         Parameters:
             event (pygame.event.Event): The pygame event object.
         """
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_UP or event.key == ord('w'):
-                self.direction = 2
-            elif event.key == pygame.K_DOWN or event.key == ord('s'):
-                self.direction = 3
-            elif event.key == pygame.K_LEFT or event.key == ord('a'):
-                self.direction = 1
-            elif event.key == pygame.K_RIGHT or event.key == ord('d'):
-                self.direction = 0
+        if event.type == pygame.KEYDOWN and event.key in KEY_DIRECTIONS:
+            self.direction = KEY_DIRECTIONS[event.key]
 
     def update(self, index, wall_group, ghost_door):
         """
@@ -131,8 +127,8 @@ class Pacman(pygame.sprite.Sprite):
 
         Parameters:
             index (int): The animation index to determine Pacman's sprite image.
-            wall_group (pygame.sprite.Group): A group containing wall sprites.
-            ghost_door (pygame.sprite.Group): A group containing ghost door sprites.
+            wall_group (pygame.sprite.Group or TileLayer): A group containing wall sprites.
+            ghost_door (pygame.sprite.Group or TileLayer): A group containing ghost door sprites.
         """
         self.move(wall_group, ghost_door)
         self.image_state(index)
@@ -0,0 +1,167 @@
+"""
+Path Worker Module
+
+This module defines the PathWorker class, which runs ghost pathfinding in the background
+so the game loop never waits on a search. Ghosts submit a request carrying the board,
+the start tile and the target tile, and pick the finished path up on a later tick.
+
+Attributes:
+    LARGE_MAP_CELLS (int): Number of board cells above which a process is used instead of a thread.
+
+Classes:
+    PathRequest: A pending path search and the tiles it was submitted for.
+        - done: Checks whether the search has finished.
+        - path: Returns the found path.
+        - cancel: Cancels the search if it has not started yet.
+
+    PathWorker: Runs path searches on a background thread or process.
+        - for_board: Creates a worker suited to the size of the given board.
+        - submit: Submits a path search and returns its PathRequest.
+        - shutdown: Stops the worker and drops the searches that have not started.
+
+Functions:
+    set_process_board: Remembers the board of a worker process.
+    search_path: Runs a single path search, used as the job executed by the worker.
+"""
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from Tiles.navgraph import find_path
+
+LARGE_MAP_CELLS = 4096
+
+# The board a worker process was started with, so it isn't pickled again for every search
+_process_state = {}
+
+def set_process_board(simple_board):
+    """
+    Remembers the board of a worker process. Used as the initializer of the process pool.
+
+    Parameters:
+        - simple_board (numpy.ndarray): A 2D numpy array representing the game board.
+    """
+    _process_state['board'] = simple_board
+
+def search_path(simple_board, start, target):
+    """
+    Runs a single path search.
+
+    Parameters:
+        - simple_board (numpy.ndarray): A 2D numpy array representing the game board,
+          or None for the board the worker process was started with.
+        - start (tuple): The starting position.
+        - target (tuple): The target position.
+
+    Returns:
+        - list: The path from start to target, or an empty list if no path is found.
+    """
+    if simple_board is None:
+        simple_board = _process_state['board']
+    return find_path(simple_board, start, target) or []
+
+class PathRequest():
+    """
+    A pending path search submitted to the PathWorker.
+
+    Attributes:
+        - start (tuple): The tile the path starts from.
+        - target (tuple): The tile the path leads to.
+        - future (concurrent.futures.Future): The future holding the result of the search.
+
+    Methods:
+        - done: Checks whether the search has finished.
+        - path: Returns the found path.
+        - cancel: Cancels the search if it has not started yet.
+    """
+    def __init__(self, start, target, future):
+        self.start = start
+        self.target = target
+        self.future = future
+
+    def done(self):
+        """
+        Checks whether the search has finished, without waiting for it.
+
+        Returns:
+            - bool: True if the result is available.
+        """
+        return self.future.done() and not self.future.cancelled()
+
+    def path(self):
+        """
+        Returns the found path. Must only be called once done() returns True.
+
+        Returns:
+            - list: The path from start to target, excluding the start tile.
+        """
+        return list(self.future.result())
+
+    def cancel(self):
+        """
+        Cancels the search. A search that is already running finishes, but its result is ignored.
+        """
+        self.future.cancel()
+
+class PathWorker():
+    """
+    Runs path searches on a background thread, or on a separate process for large maps.
+
+    Attributes:
+        - use_processes (bool): Whether the searches run in a separate process.
+        - board (numpy.ndarray): The board worker processes were started with, if any.
+
+    Methods:
+        - for_board: Creates a worker suited to the size of the given board.
+        - submit: Submits a path search and returns its PathRequest.
+        - shutdown: Stops the worker and drops the searches that have not started.
+    """
+    def __init__(self, use_processes=False, max_workers=1, simple_board=None):
+        """
+        Initializes a new instance of the PathWorker class.
+
+        Parameters:
+            - use_processes (bool): Run the searches in a process instead of a thread.
+            - max_workers (int): Number of threads or processes running the searches.
+            - simple_board (numpy.ndarray): The board handed to worker processes once, at start.
+        """
+        self.use_processes = use_processes
+        self.board = simple_board
+        if use_processes:
+            self.executor = ProcessPoolExecutor(max_workers=max_workers, initializer=set_process_board, initargs=(simple_board,))
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='path-worker')
+
+    @classmethod
+    def for_board(cls, simple_board):
+        """
+        Creates a worker suited to the size of the given board.
+
+        Parameters:
+            - simple_board (numpy.ndarray): A 2D numpy array representing the game board.
+
+        Returns:
+            - PathWorker: A thread worker for small boards, a process worker for large ones.
+        """
+        return cls(use_processes=simple_board.size > LARGE_MAP_CELLS, simple_board=simple_board)
+
+    def submit(self, simple_board, start, target):
+        """
+        Submits a path search. The call returns immediately.
+
+        Parameters:
+            - simple_board (numpy.ndarray): A 2D numpy array representing the game board.
+            - start (tuple): The starting position.
+            - target (tuple): The target position.
+
+        Returns:
+            - PathRequest: The pending search.
+        """
+        if self.use_processes and simple_board is self.board:
+            # The process already holds this board and its cached graph
+            simple_board = None
+        future = self.executor.submit(search_path, simple_board, start, target)
+        return PathRequest(start, target, future)
+
+    def shutdown(self):
+        """
+        Stops the worker without waiting for the running search.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,222 @@
+"""
+Gameplay Events Module
+
+This module defines the EventBus class, which records gameplay events as typed, fixed-size rows
+in an in-memory ring buffer, and the EventWriter class, which flushes them in batches to a JSON
+Lines or binary log on a background thread. Recording an event only writes one row of a numpy
+array, so the game loop never waits on disk I/O.
+
+Attributes:
+    EVENT_TYPES (tuple): The names of the event types, indexed by their id.
+    COIN, POWERUP, GHOST_EATEN, PACMAN_DEATH, MODE_CHANGE, TURN, LEVEL (int): The ids of the event types.
+    EVENT_DTYPE (numpy.dtype): The layout of one event row, also used by binary logs.
+    DEFAULT_CAPACITY (int): Number of events the ring buffer holds before the oldest are overwritten.
+
+Classes:
+    EventBus: Records gameplay events in a ring buffer.
+        - emit: Records an event of the current tick.
+        - drain: Takes the events recorded since the last drain.
+        - since: Returns the events recorded since a count, without draining them.
+        - report: Returns the number of events and the time spent recording them.
+
+    EventWriter: Flushes the events of a bus to a file on a background thread.
+        - start: Starts the writer thread.
+        - flush: Writes the pending events.
+        - stop: Writes the remaining events and stops the thread.
+
+Functions:
+    read_binary_log: Reads the events of a binary log.
+    event_to_dict: Converts an event row to a dictionary.
+"""
+from time import perf_counter
+import json
+import threading
+import numpy as np
+
+EVENT_TYPES = ('coin', 'powerup', 'ghost_eaten', 'pacman_death', 'mode_change', 'turn', 'level')
+COIN, POWERUP, GHOST_EATEN, PACMAN_DEATH, MODE_CHANGE, TURN, LEVEL = range(len(EVENT_TYPES))
+EVENT_DTYPE = np.dtype([('tick', '<u4'), ('type', 'u1'), ('x', '<i2'), ('y', '<i2'), ('value', '<i4')])
+DEFAULT_CAPACITY = 4096
+
+def event_to_dict(row):
+    """
+    Converts an event row to a dictionary.
+
+    Parameters:
+        - row (numpy.void): A row of EVENT_DTYPE.
+
+    Returns:
+        - dict: The tick, the type name, the tile (x, y) and the value of the event.
+    """
+    return {'tick': int(row['tick']), 'type': EVENT_TYPES[row['type']], 'x': int(row['x']), 'y': int(row['y']), 'value': int(row['value'])}
+
+def read_binary_log(path):
+    """
+    Reads the events of a binary log.
+
+    Parameters:
+        - path (str): The path of the log.
+
+    Returns:
+        - numpy.ndarray: The events, as rows of EVENT_DTYPE.
+    """
+    return np.fromfile(path, dtype=EVENT_DTYPE)
+
+class EventBus():
+    """
+    Records gameplay events in a ring buffer. Events that the writer doesn't take in time are
+    overwritten and counted as lost.
+
+    Attributes:
+        - tick (int): The tick new events are recorded for, set by the game loop.
+        - emitted (int): The number of events recorded.
+        - lost (int): The number of events overwritten before they were drained.
+        - emit_time (float): The time spent recording events, in seconds.
+    """
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """
+        Initializes a new instance of the EventBus class.
+
+        Parameters:
+            - capacity (int): Number of events the ring buffer holds.
+        """
+        self.buffer = np.zeros(capacity, dtype=EVENT_DTYPE)
+        self.tick = 0
+        self.emitted = 0
+        self.drained = 0
+        self.lost = 0
+        self.emit_time = 0.0
+        self.lock = threading.Lock()
+
+    def emit(self, event_type, x=0, y=0, value=0):
+        """
+        Records an event of the current tick.
+
+        Parameters:
+            - event_type (int): The id of the event type, e.g. COIN.
+            - x (int): The x coordinate of the tile the event happened on.
+            - y (int): The y coordinate of the tile the event happened on.
+            - value (int): A value depending on the type, e.g. the score after a coin.
+        """
+        start = perf_counter()
+        with self.lock:
+            self.buffer[self.emitted % len(self.buffer)] = (self.tick, event_type, x, y, value)
+            self.emitted += 1
+        self.emit_time += perf_counter() - start
+
+    def drain(self):
+        """
+        Takes the events recorded since the last drain.
+
+        Returns:
+            - numpy.ndarray: A copy of the events, oldest first.
+        """
+        with self.lock:
+            capacity = len(self.buffer)
+            if self.emitted - self.drained > capacity:
+                self.lost += self.emitted - self.drained - capacity
+                self.drained = self.emitted - capacity
+            indices = np.arange(self.drained, self.emitted) % capacity
+            self.drained = self.emitted
+            return self.buffer[indices]
+
+    def since(self, start):
+        """
+        Returns the events recorded since a count, without draining them, so an observer can
+        follow the events while a writer drains them.
+
+        Parameters:
+            - start (int): The number of events emitted when the caller last looked.
+
+        Returns:
+            - tuple: A copy of the events still in the buffer, oldest first, and the number emitted now.
+        """
+        with self.lock:
+            first = max(start, self.emitted - len(self.buffer))
+            return self.buffer[np.arange(first, self.emitted) % len(self.buffer)], self.emitted
+
+    def report(self):
+        """
+        Returns the number of events and the time spent recording them.
+
+        Returns:
+            - dict: Emitted and lost events, ticks, and the recording time per tick in microseconds.
+        """
+        ticks = max(self.tick, 1)
+        return {
+            'emitted': self.emitted,
+            'lost': self.lost,
+            'ticks': self.tick,
+            'us_per_tick': self.emit_time * 1e6 / ticks,
+        }
+
+class EventWriter():
+    """
+    Flushes the events of a bus to a file in batches, on a background thread.
+
+    Attributes:
+        - bus (EventBus): The bus the events are taken from.
+        - file: The file object the events are written to. Binary logs need a binary file.
+        - binary (bool): Whether rows are written as raw EVENT_DTYPE records instead of JSON Lines.
+        - interval (float): Seconds between two batches.
+        - written (int): The number of events written.
+    """
+    def __init__(self, bus, file, binary=False, interval=0.25):
+        """
+        Initializes a new instance of the EventWriter class.
+
+        Parameters:
+            - bus (EventBus): The bus to take the events from.
+            - file: A file object opened for writing, in binary mode for binary logs.
+            - binary (bool): Write raw EVENT_DTYPE records instead of JSON Lines.
+            - interval (float): Seconds between two batches.
+        """
+        self.bus = bus
+        self.file = file
+        self.binary = binary
+        self.interval = interval
+        self.written = 0
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """
+        Starts the writer thread.
+
+        Returns:
+            - EventWriter: The writer itself.
+        """
+        self.thread = threading.Thread(target=self.run, name='event-writer', daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        """
+        Writes a batch every interval until stopped. Called on the writer thread.
+        """
+        while not self.stopping.wait(self.interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """
+        Writes the pending events.
+        """
+        events = self.bus.drain()
+        if events.size == 0:
+            return
+        if self.binary:
+            self.file.write(events.tobytes())
+        else:
+            self.file.write(''.join(json.dumps(event_to_dict(row)) + '\n' for row in events))
+        self.file.flush()
+        self.written += len(events)
+
+    def stop(self):
+        """
+        Writes the remaining events and stops the thread. The file itself is left open.
+        """
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
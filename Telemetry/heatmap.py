@@ -0,0 +1,328 @@
+"""
+Heatmap Module
+
+This module defines the Heatmap class, which counts per tile where Pacman and every ghost spend
+their ticks, where Pacman dies and where the ghosts are eaten, to tune the ghosts' AI. The counts
+are numpy arrays indexed by (x, y) like Map.tile_types, and a tick of thousands of batched games
+is added with one bincount over their tiles, never a loop over the games.
+
+A heatmap follows the games of a BatchEngine, stepped through it, or a sprite-based Game as one of
+its observers, which reads the deaths and kills from the game's events. Heatmaps only hold
+counts, so the heatmaps of many worker processes are merged by adding them, and saved to and loaded
+from .npz files. A layer of counts is drawn as a heatmap over the board of a Map.
+
+Attributes:
+    LAYERS (tuple): The names of the layers a heatmap counts.
+    MIN_ALPHA, MAX_ALPHA (int): The opacity of the least and of the most visited tiles drawn.
+
+Classes:
+    Heatmap: Counts per tile the occupancy, deaths and kills of many games.
+        - record: Counts the tiles Pacman and the ghosts are on during a tick.
+        - step_engine: Steps a BatchEngine and counts its games' tick.
+        - on_tick: Counts the tick of a Game, as one of its observers.
+        - merge: Adds the counts of another heatmap.
+        - layer: Returns a layer of counts.
+        - save: Writes the counts to a .npz file.
+        - load: Reads a heatmap from a .npz file.
+        - render: Draws a layer as a heatmap over the board of a Map.
+
+Functions:
+    tile_cells: Returns the tiles of centers in pixels, as flat cell indices.
+    heat_colors: Maps counts to RGBA colors.
+    wander: Creates a controller for a BatchEngine that turns at random when blocked.
+    simulate: Plays headless batched games and returns their heatmap.
+    collect: Plays batched games across worker processes and merges their heatmaps.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import numpy as np
+import pygame
+from Engine.batch import BatchEngine, PACMAN_SIZE
+from Telemetry.events import GHOST_EATEN, PACMAN_DEATH
+
+LAYERS = ('pacman', 'ghosts', 'deaths', 'kills')
+MIN_ALPHA = 60
+MAX_ALPHA = 220
+TILE = 27
+
+def tile_cells(centers, width, height):
+    """
+    Returns the tiles of centers in pixels, as flat cell indices x * height + y. Centers past the
+    edges, like Pacman's in the teleport, count for the edge tile.
+
+    Parameters:
+        - centers (numpy.ndarray): The centers, in pixels, shaped (..., 2).
+        - width (int): The number of columns of the board.
+        - height (int): The number of rows of the board.
+
+    Returns:
+        - numpy.ndarray: The cell of every center, shaped like centers without its last axis.
+    """
+    # Tile x spans the pixels from 27x - 13 to 27x + 13
+    tiles = (np.asarray(centers) + TILE // 2) // TILE
+    # np.clip costs more than both bounds on arrays this small
+    x = np.minimum(np.maximum(tiles[..., 0], 0), width - 1)
+    y = np.minimum(np.maximum(tiles[..., 1], 0), height - 1)
+    return x * height + y
+
+def heat_colors(counts):
+    """
+    Maps counts to RGBA colors, from dark red through yellow to white on a logarithmic scale. Tiles
+    never counted are transparent.
+
+    Parameters:
+        - counts (numpy.ndarray): The counts.
+
+    Returns:
+        - numpy.ndarray: uint8 colors shaped like counts with a last axis of 4.
+    """
+    peak = counts.max() if counts.size else 0
+    heat = np.log1p(counts) / np.log1p(peak) if peak else np.zeros(counts.shape)
+    colors = np.empty(counts.shape + (4,), dtype=np.uint8)
+    colors[..., 0] = np.clip(3 * heat, 0, 1) * 255
+    colors[..., 1] = np.clip(3 * heat - 1, 0, 1) * 255
+    colors[..., 2] = np.clip(3 * heat - 2, 0, 1) * 255
+    colors[..., 3] = np.where(counts > 0, MIN_ALPHA + (MAX_ALPHA - MIN_ALPHA) * heat, 0)
+    return colors
+
+class Heatmap(): # pylint: disable=too-many-instance-attributes
+    """
+    Counts per tile the occupancy, deaths and kills of many games.
+
+    Attributes:
+        - width, height (int): The size of the board, in tiles.
+        - pacman (numpy.ndarray): The ticks Pacman spent on every tile, indexed by (x, y).
+        - ghosts (numpy.ndarray): The ticks every ghost spent on every tile, indexed by (ghost, x, y) in Game's order.
+        - deaths (numpy.ndarray): The lives Pacman lost on every tile.
+        - kills (numpy.ndarray): The ghosts eaten on every tile.
+        - ticks (int): The ticks counted, summed over the games.
+        - games (int): The games counted.
+        - bus (EventBus): The events of the Game observed last, or None.
+        - seen (int): The number of events of that game already counted.
+    """
+    def __init__(self, width=30, height=33, ghosts=4):
+        """
+        Initializes a heatmap with no counts.
+
+        Parameters:
+            - width (int): The number of columns of the board.
+            - height (int): The number of rows of the board.
+            - ghosts (int): The number of ghosts of the games.
+        """
+        self.width = width
+        self.height = height
+        self.pacman = np.zeros((width, height), dtype=np.int64)
+        self.ghosts = np.zeros((ghosts, width, height), dtype=np.int64)
+        self.deaths = np.zeros((width, height), dtype=np.int64)
+        self.kills = np.zeros((width, height), dtype=np.int64)
+        self.ticks = 0
+        self.games = 0
+        self.bus = None
+        self.seen = 0
+
+    def record(self, pacman, ghosts=None):
+        """
+        Counts the tiles Pacman and the ghosts are on during a tick of many games.
+
+        Parameters:
+            - pacman (numpy.ndarray): Pacman's center in every game, in pixels, shaped (games, 2).
+            - ghosts (numpy.ndarray): The centers of the ghosts, shaped (games, ghosts, 2), or None.
+        """
+        cells = self.width * self.height
+        pacman = np.asarray(pacman).reshape(-1, 2)
+        self.pacman.reshape(cells)[:] += np.bincount(tile_cells(pacman, self.width, self.height), minlength=cells)
+        self.ticks += len(pacman)
+        if ghosts is not None and np.size(ghosts):
+            ghosts = np.asarray(ghosts)
+            count = ghosts.shape[1]
+            # Every ghost counts in its own range of cells
+            ghost_cells = tile_cells(ghosts, self.width, self.height) + np.arange(count) * cells
+            self.ghosts[:count].reshape(count * cells)[:] += np.bincount(ghost_cells.ravel(), minlength=count * cells)
+
+    def step_engine(self, engine, directions=None):
+        """
+        Steps a BatchEngine and counts the tick of its games that were running: the tiles of
+        Pacman and the ghosts after the tick, and where Pacman died or a ghost was eaten. Those
+        happen where Pacman and the ghost stood before being sent back to their starts.
+
+        Parameters:
+            - engine (BatchEngine): The engine.
+            - directions (numpy.ndarray): The directions for BatchEngine.step, or None.
+        """
+        running = ~engine.done
+        if engine.tick == 0:
+            self.games += engine.games
+        pacman = engine.pacman + PACMAN_SIZE // 2
+        ghosts = engine.ghosts.copy()
+        engine.step(directions)
+        if engine.ghost_count:
+            cells = self.width * self.height
+            self.deaths.reshape(cells)[:] += np.bincount(tile_cells(pacman, self.width, self.height), engine.died, cells).astype(np.int64)
+            self.kills.reshape(cells)[:] += np.bincount(tile_cells(ghosts, self.width, self.height).ravel(), engine.eaten.ravel(), cells).astype(np.int64)
+        self.record(engine.pacman[running] + PACMAN_SIZE // 2, engine.ghosts[running])
+
+    def on_tick(self, game, tick): # pylint: disable=unused-argument
+        """
+        Counts the tick of a Game, as one of its observers. The deaths and kills are read from the
+        events of the game without draining them.
+
+        Parameters:
+            - game (Game): The game.
+            - tick (int): The tick that ended.
+        """
+        if game.events is not self.bus:
+            self.bus = game.events
+            self.seen = 0
+            self.games += 1
+        self.record([game.player.rect.center], [[ghost.rect.center for ghost in game.ghosts]])
+        events, self.seen = self.bus.since(self.seen)
+        for kind, counts in ((PACMAN_DEATH, self.deaths), (GHOST_EATEN, self.kills)):
+            chosen = events[events['type'] == kind]
+            np.add.at(counts, (np.clip(chosen['x'], 0, self.width - 1), np.clip(chosen['y'], 0, self.height - 1)), 1)
+
+    def merge(self, other):
+        """
+        Adds the counts of another heatmap, e.g. the partial heatmap of a worker process.
+
+        Parameters:
+            - other (Heatmap): The heatmap to add, of the same board.
+
+        Returns:
+            - Heatmap: The heatmap itself.
+        """
+        self.pacman += other.pacman
+        self.ghosts += other.ghosts
+        self.deaths += other.deaths
+        self.kills += other.kills
+        self.ticks += other.ticks
+        self.games += other.games
+        return self
+
+    def layer(self, name):
+        """
+        Returns a layer of counts.
+
+        Parameters:
+            - name (str): One of LAYERS; 'ghosts' sums the ghosts. 'ghost0' to 'ghost3' give a single ghost.
+
+        Returns:
+            - numpy.ndarray: The counts, indexed by (x, y).
+        """
+        if name == 'ghosts':
+            return self.ghosts.sum(axis=0)
+        if name.startswith('ghost'):
+            return self.ghosts[int(name[5:])]
+        return getattr(self, name)
+
+    def save(self, path):
+        """
+        Writes the counts to a .npz file.
+
+        Parameters:
+            - path (str): The path of the file.
+        """
+        np.savez_compressed(path, pacman=self.pacman, ghosts=self.ghosts, deaths=self.deaths, kills=self.kills,
+                            totals=np.array([self.ticks, self.games]))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a heatmap from a .npz file written by save.
+
+        Parameters:
+            - path (str): The path of the file.
+
+        Returns:
+            - Heatmap: The heatmap.
+        """
+        with np.load(path) as data:
+            ghosts = data['ghosts']
+            heatmap = cls(*data['pacman'].shape, ghosts=len(ghosts))
+            heatmap.pacman[:] = data['pacman']
+            heatmap.ghosts[:] = ghosts
+            heatmap.deaths[:] = data['deaths']
+            heatmap.kills[:] = data['kills']
+            heatmap.ticks, heatmap.games = data['totals'].tolist()
+        return heatmap
+
+    def render(self, game_map, name='pacman'):
+        """
+        Draws a layer as a heatmap over the board of a Map, one colored square per tile.
+
+        Parameters:
+            - game_map (Map): The map whose board is drawn below the heatmap.
+            - name (str): The layer, see layer.
+
+        Returns:
+            - pygame.Surface: The board with the heatmap, the size of the board layer.
+        """
+        board = game_map.board_layer.bake().copy()
+        # Every tile is a TILE x TILE square of its color, shifted by the half tile left of tile 0
+        colors = heat_colors(self.layer(name)).transpose(1, 0, 2)
+        pixels = colors.repeat(TILE, axis=0).repeat(TILE, axis=1)[TILE // 2:, TILE // 2:]
+        pixels = np.ascontiguousarray(pixels[:board.get_height(), :board.get_width()])
+        overlay = pygame.image.frombuffer(pixels.tobytes(), (pixels.shape[1], pixels.shape[0]), 'RGBA')
+        board.blit(overlay, (0, 0))
+        return board
+
+def wander(seed=None):
+    """
+    Creates a controller for a BatchEngine under which Pacman keeps his direction and turns to a
+    random one when a wall stops him.
+
+    Parameters:
+        - seed (int): The seed of the random turns.
+
+    Returns:
+        - callable: The controller, called with the engine, returns the directions.
+    """
+    rng = np.random.default_rng(seed)
+    previous = None
+    def controller(engine):
+        nonlocal previous
+        stuck = np.ones(engine.games, dtype=bool) if previous is None else (engine.pacman == previous).all(axis=1)
+        previous = engine.pacman.copy()
+        return np.where(stuck, rng.integers(0, 4, engine.games), -1)
+    return controller
+
+def simulate(seed, games=256, ticks=3600):
+    """
+    Plays headless batched games and returns their heatmap. Run by the worker processes of collect.
+
+    Parameters:
+        - seed (int): The seed of the ghosts and of Pacman's turns.
+        - games (int): The number of games played at once.
+        - ticks (int): The longest number of ticks to play.
+
+    Returns:
+        - Heatmap: The counts of the games.
+    """
+    engine = BatchEngine(games, seed=seed)
+    heatmap = Heatmap(engine.width, engine.height, engine.ghost_count)
+    controller = wander(seed)
+    for _ in range(ticks):
+        if engine.done.all():
+            break
+        heatmap.step_engine(engine, controller(engine))
+    return heatmap
+
+def collect(seeds, games=256, ticks=3600, workers=None):
+    """
+    Plays batched games across worker processes, one run per seed, and merges their heatmaps.
+
+    Parameters:
+        - seeds (list): The seed of every run.
+        - games (int): The number of games of a run.
+        - ticks (int): The longest number of ticks of a run.
+        - workers (int): The number of worker processes. None for one per CPU.
+
+    Returns:
+        - Heatmap: The counts of all the runs.
+    """
+    seeds = list(seeds)
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        heatmaps = pool.map(simulate, seeds, [games] * len(seeds), [ticks] * len(seeds))
+        total = next(heatmaps)
+        for heatmap in heatmaps:
+            total.merge(heatmap)
+    return total
@@ -0,0 +1,248 @@
+"""
+Frame Profiler Module
+
+This module defines the FrameProfiler class, a sampling profiler hooked into Game.run_game. A
+background thread looks at the game thread's Python stack at a fixed interval and counts every
+distinct stack, keeping the counts of each frame apart. Nothing runs inside the game loop except
+marking where a frame begins and ends, so the profiler can stay armed while playing.
+
+A session is started and stopped with the F9 key, or runs for the whole game when the
+PACMAN_PROFILE environment variable is set. With a frame budget, the profiler also keeps the
+stacks of every frame that went over it, so a hitch can be inspected after it happened.
+
+The stacks are written in the collapsed format read by flamegraph.pl, speedscope and similar tools:
+one line per stack, the frames from the outermost to the innermost separated by semicolons, then
+the number of samples. The first frame of every stack is the game frame it was sampled in, e.g.
+    frame-120;game.py:run_game;game.py:update_players;ghost.py:update 3
+
+Attributes:
+    PROFILE_ENV (str): Environment variable that profiles the whole game. Its value is the output path, or 1 for DEFAULT_PATH.
+    BUDGET_ENV (str): Environment variable with the frame budget in milliseconds.
+    PROFILE_KEY (int): The key that starts and stops a session.
+    DEFAULT_PATH (str): Where the stacks are written by default.
+    DEFAULT_INTERVAL (float): Seconds between two samples.
+
+Classes:
+    FrameProfiler: Samples the game thread's stacks frame by frame.
+        - from_environment: Creates a profiler configured by the environment variables.
+        - start: Starts a session.
+        - stop: Stops the session and writes its stacks.
+        - handle_event: Starts or stops a session on the profile key.
+        - begin_frame: Marks the beginning of a frame.
+        - end_frame: Marks the end of a frame and keeps its stacks if wanted.
+        - write: Writes the kept stacks.
+        - close: Stops sampling and writes what is left.
+
+Functions:
+    collapse_stack: Names the functions of a Python stack, outermost first.
+    read_collapsed: Reads the stacks of a collapsed-stack file per frame.
+"""
+from collections import Counter
+from time import perf_counter
+import os
+import sys
+import threading
+import pygame
+
+PROFILE_ENV = 'PACMAN_PROFILE'
+BUDGET_ENV = 'PACMAN_PROFILE_BUDGET_MS'
+PROFILE_KEY = pygame.K_F9
+DEFAULT_PATH = 'profile.folded'
+DEFAULT_INTERVAL = 0.002
+
+def collapse_stack(frame):
+    """
+    Names the functions of a Python stack, outermost first.
+
+    Parameters:
+        - frame (frame): The innermost frame of the stack.
+
+    Returns:
+        - str: The "file:function" names joined by semicolons.
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+def read_collapsed(path):
+    """
+    Reads the stacks of a collapsed-stack file per frame.
+
+    Parameters:
+        - path (str): The path of the file.
+
+    Returns:
+        - dict: For every frame number, a Counter of the samples of every stack.
+    """
+    frames = {}
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            stack, count = line.rsplit(' ', 1)
+            frame, _, stack = stack.partition(';')
+            frames.setdefault(int(frame.removeprefix('frame-')), Counter())[stack] += int(count)
+    return frames
+
+class FrameProfiler(): # pylint: disable=too-many-instance-attributes
+    """
+    Samples the game thread's stacks frame by frame. The sampling thread only runs during a session
+    or while a budget is watched, otherwise the profiler costs nothing.
+
+    Attributes:
+        - path (str): Where the stacks are written. Sessions and hitches are appended to it.
+        - interval (float): Seconds between two samples.
+        - budget_ms (float): Frames taking longer are kept even outside of a session. None to keep none.
+        - active (bool): Whether a session is running.
+        - frame (int): The number of the current frame.
+        - samples (int): The number of samples taken.
+        - hitches (list): The (frame, milliseconds) of every frame that went over the budget.
+        - kept (list): The (frame, Counter of stacks) waiting to be written.
+    """
+    def __init__(self, path=DEFAULT_PATH, interval=DEFAULT_INTERVAL, budget_ms=None):
+        """
+        Initializes a new instance of the FrameProfiler class. Call it on the thread to profile.
+
+        Parameters:
+            - path (str): Where to write the stacks.
+            - interval (float): Seconds between two samples.
+            - budget_ms (float): Keep the stacks of every frame that takes longer. None to keep none.
+        """
+        self.path = path
+        self.interval = interval
+        self.budget_ms = budget_ms
+        self.active = False
+        self.frame = 0
+        self.samples = 0
+        self.hitches = []
+        self.kept = []
+        self.stacks = Counter()
+        self.frame_start = perf_counter()
+        self.target = threading.get_ident()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    @classmethod
+    def from_environment(cls, environ=None):
+        """
+        Creates a profiler configured by the PACMAN_PROFILE and PACMAN_PROFILE_BUDGET_MS variables.
+
+        Parameters:
+            - environ (dict): The environment. Defaults to os.environ.
+
+        Returns:
+            - FrameProfiler: The profiler, with a session running from the first frame if PACMAN_PROFILE is set.
+        """
+        environ = os.environ if environ is None else environ
+        path = environ.get(PROFILE_ENV, '')
+        budget = environ.get(BUDGET_ENV)
+        profiler = cls(path if path not in ('', '1') else DEFAULT_PATH, budget_ms=float(budget) if budget else None)
+        # Sampling begins with the first frame, on the thread that runs the game
+        profiler.active = bool(path)
+        return profiler
+
+    def sample(self):
+        """
+        Takes samples until sampling is no longer needed. Called on the sampling thread.
+        """
+        while not self.stopping.wait(self.interval):
+            frame = sys._current_frames().get(self.target) # pylint: disable=protected-access
+            if frame is not None:
+                stack = collapse_stack(frame)
+                self.stacks[stack] += 1
+                self.samples += 1
+            del frame
+
+    def sampling(self, wanted):
+        """
+        Starts or stops the sampling thread.
+
+        Parameters:
+            - wanted (bool): Whether samples are needed.
+        """
+        if wanted and self.thread is None:
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self.sample, name='frame-profiler', daemon=True)
+            self.thread.start()
+        elif not wanted and self.thread is not None:
+            self.stopping.set()
+            self.thread.join()
+            self.thread = None
+
+    def start(self):
+        """
+        Starts a session. The current frame is kept from its beginning.
+        """
+        self.active = True
+        self.sampling(True)
+
+    def stop(self):
+        """
+        Stops the session and writes its stacks.
+        """
+        self.active = False
+        self.sampling(self.budget_ms is not None)
+        self.write()
+
+    def handle_event(self, event):
+        """
+        Starts or stops a session when the profile key is pressed.
+
+        Parameters:
+            - event (pygame.event.Event): An event of the game loop.
+        """
+        if event.type == pygame.KEYDOWN and event.key == PROFILE_KEY:
+            if self.active:
+                self.stop()
+            else:
+                self.start()
+
+    def begin_frame(self, frame):
+        """
+        Marks the beginning of a frame.
+
+        Parameters:
+            - frame (int): The number of the frame, e.g. the game tick.
+        """
+        if self.thread is None and (self.active or self.budget_ms is not None):
+            self.target = threading.get_ident()
+            self.sampling(True)
+        self.frame = frame
+        self.stacks = Counter()
+        self.frame_start = perf_counter()
+
+    def end_frame(self):
+        """
+        Marks the end of a frame. Its stacks are kept during a session or if it went over the budget.
+
+        Returns:
+            - float: The time the frame took, in milliseconds.
+        """
+        elapsed = (perf_counter() - self.frame_start) * 1000
+        over = self.budget_ms is not None and elapsed > self.budget_ms
+        if over:
+            self.hitches.append((self.frame, elapsed))
+        if (self.active or over) and self.stacks:
+            self.kept.append((self.frame, self.stacks))
+        self.stacks = Counter()
+        return elapsed
+
+    def write(self):
+        """
+        Appends the kept stacks to the output file.
+        """
+        if not self.kept:
+            return
+        kept, self.kept = self.kept, []
+        with open(self.path, 'a', encoding='utf-8') as file:
+            for frame, stacks in kept:
+                file.writelines(f'frame-{frame};{stack} {count}\n' for stack, count in stacks.items())
+
+    def close(self):
+        """
+        Stops sampling and writes what is left. A running session ends with the game.
+        """
+        self.active = False
+        self.sampling(False)
+        self.write()
@@ -0,0 +1,333 @@
+"""
+Results Module
+
+This module defines the ResultStore class, which keeps the result of every game, played or
+simulated, in a local SQLite database. Results are buffered and inserted in batches, one
+transaction per batch and sorted by score, so storing millions of simulated games stays fast.
+Every insert also updates the indexes, which is what costs the most, so the batches are large and
+the ghost configurations are kept as small integer keys of their own table. The queries the
+leaderboard and the simulation reports need are backed by indexes: the best scores, overall or
+for a seed, a ghost configuration or a date range, and score percentiles.
+
+The database is in WAL mode, so a second connection can read while results are written. The
+queries can run on a reader thread with its own connection, which the menu uses to show the
+leaderboard without blocking its loop.
+
+Attributes:
+    RESULTS_ENV (str): Environment variable with the path of the database.
+    DEFAULT_PATH (str): Where the database is kept by default.
+    DEFAULT_BATCH (int): The number of buffered results that triggers an insert.
+    PAGE_SIZE (int): The page size of a new database, in bytes.
+    CACHE_KIB (int): The page cache of a connection, in KiB.
+    COLUMNS (tuple): The columns of a result, in the order add_many takes them.
+
+Classes:
+    ResultStore: Stores game results and answers the leaderboard queries.
+        - from_environment: Opens the store configured by the environment variable.
+        - add: Buffers the result of a game.
+        - add_game: Buffers the result of a finished Game.
+        - add_many: Inserts many results in one transaction.
+        - flush: Inserts the buffered results.
+        - count: Counts the results matching filters.
+        - top: Returns the best results matching filters.
+        - percentiles: Returns score percentiles of the results matching filters.
+        - submit: Runs a query on the reader thread.
+        - close: Flushes the buffer and closes the connections.
+
+Functions:
+    ghost_config: Names the ghost configuration of a game.
+    where: Builds the WHERE clause of the query filters.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from time import time
+import os
+import sqlite3
+import threading
+
+RESULTS_ENV = 'PACMAN_RESULTS'
+DEFAULT_PATH = 'results.sqlite3'
+DEFAULT_BATCH = 100000
+PAGE_SIZE = 16384
+CACHE_KIB = 131072
+COLUMNS = ('score', 'seed', 'ghosts', 'level', 'won', 'lives', 'ticks', 'played')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ghost_configs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    score INTEGER NOT NULL,
+    seed INTEGER,
+    ghosts INTEGER NOT NULL REFERENCES ghost_configs (id),
+    level INTEGER NOT NULL,
+    won INTEGER NOT NULL,
+    lives INTEGER NOT NULL,
+    ticks INTEGER NOT NULL,
+    played REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_score ON results (score);
+CREATE INDEX IF NOT EXISTS results_seed ON results (seed, score);
+CREATE INDEX IF NOT EXISTS results_ghosts ON results (ghosts, score);
+CREATE INDEX IF NOT EXISTS results_played ON results (played);
+"""
+
+def ghost_config(ghosts):
+    """
+    Names the ghost configuration of a game, e.g. 'Pinky,Blinky,Inky,Clyde'.
+
+    Parameters:
+        - ghosts (list): The ghosts of the game.
+
+    Returns:
+        - str: The class names of the ghosts joined by commas, empty without ghosts.
+    """
+    return ','.join(type(ghost).__name__ for ghost in ghosts)
+
+def where(seed=None, ghosts=None, since=None, until=None):
+    """
+    Builds the WHERE clause of the filters given.
+
+    Parameters:
+        - seed (int): Only the results of this seed.
+        - ghosts (str): Only the results of this ghost configuration.
+        - since (float): Only the results played at or after this Unix time.
+        - until (float): Only the results played before this Unix time.
+
+    Returns:
+        - tuple: The clause, empty without filters, and its parameters.
+    """
+    conditions = []
+    parameters = []
+    for condition, value in (('seed = ?', seed), ('ghosts = (SELECT id FROM ghost_configs WHERE name = ?)', ghosts), ('played >= ?', since), ('played < ?', until)):
+        if value is not None:
+            conditions.append(condition)
+            parameters.append(value)
+    return (' WHERE ' + ' AND '.join(conditions) if conditions else ''), parameters
+
+class ResultStore(): # pylint: disable=too-many-instance-attributes
+    """
+    Stores game results in a SQLite database and answers the leaderboard queries.
+
+    Attributes:
+        - path (str): The path of the database.
+        - batch (int): The number of buffered results that triggers an insert.
+        - pending (list): The results buffered since the last insert, as tuples in COLUMNS order.
+        - inserted (int): The number of results inserted by this store.
+        - configs (dict): The id of every ghost configuration known, by name.
+        - connection (sqlite3.Connection): The connection results are written with.
+    """
+    def __init__(self, path=DEFAULT_PATH, batch=DEFAULT_BATCH):
+        """
+        Opens a store, creating the database and its indexes if needed.
+
+        Parameters:
+            - path (str): The path of the database.
+            - batch (int): The number of buffered results that triggers an insert.
+        """
+        self.path = str(path)
+        self.batch = batch
+        self.pending = []
+        self.inserted = 0
+        self.connection = self.connect()
+        self.connection.executescript(SCHEMA)
+        self.configs = dict(self.connection.execute('SELECT name, id FROM ghost_configs'))
+        self.local = threading.local()
+        self.executor = None
+
+    @classmethod
+    def from_environment(cls):
+        """
+        Opens the store at the path of the PACMAN_RESULTS environment variable, or DEFAULT_PATH.
+
+        Returns:
+            - ResultStore: The store.
+        """
+        return cls(os.environ.get(RESULTS_ENV) or DEFAULT_PATH)
+
+    def connect(self):
+        """
+        Opens a connection to the database, in WAL mode so reads don't wait for writes.
+
+        Returns:
+            - sqlite3.Connection: The connection.
+        """
+        connection = sqlite3.connect(self.path, isolation_level=None)
+        # Only changes a new database, fewer larger pages split less often
+        connection.execute(f'PRAGMA page_size = {PAGE_SIZE}')
+        connection.execute(f'PRAGMA cache_size = -{CACHE_KIB}')
+        connection.execute('PRAGMA journal_mode = WAL')
+        # In WAL mode a commit only reaches the disk at checkpoints, a crash loses the last batches at most
+        connection.execute('PRAGMA synchronous = NORMAL')
+        return connection
+
+    def reader(self):
+        """
+        Returns the connection of the calling thread, opening it on the first call. The connection
+        results are written with is used on the thread that opened the store.
+
+        Returns:
+            - sqlite3.Connection: The connection.
+        """
+        if not hasattr(self.local, 'connection'):
+            self.local.connection = self.connect()
+        return self.local.connection
+
+    def add(self, score, seed=None, ghosts='', level=1, won=False, lives=0, ticks=0, played=None): # pylint: disable=too-many-arguments,too-many-positional-arguments
+        """
+        Buffers the result of a game, and inserts the buffer once it holds a batch.
+
+        Parameters:
+            - score (int): The final score.
+            - seed (int): The seed of a simulated game, None for a played one.
+            - ghosts (str): The ghost configuration, see ghost_config.
+            - level (int): The number of the last level reached.
+            - won (bool): Whether the game was won.
+            - lives (int): The lives left.
+            - ticks (int): The number of ticks the game lasted.
+            - played (float): When the game ended, as a Unix time. Defaults to now.
+        """
+        self.pending.append((int(score), seed, ghosts, int(level), int(won), int(lives), int(ticks), time() if played is None else played))
+        if len(self.pending) >= self.batch:
+            self.flush()
+
+    def add_game(self, game, won, seed=None):
+        """
+        Buffers the result of a finished Game and inserts it.
+
+        Parameters:
+            - game (Game): The game, after run_game returned.
+            - won (bool): What run_game returned.
+            - seed (int): The seed of the game, if it was simulated.
+        """
+        self.add(game.player.score, seed, ghost_config(game.ghosts), game.level.number, won, game.player.lives, game.events.tick + 1)
+        self.flush()
+
+    def add_many(self, rows):
+        """
+        Inserts many results in one transaction, e.g. the games of a simulation run. They are
+        inserted by score, so consecutive inserts mostly touch the same pages of the indexes.
+
+        Parameters:
+            - rows (iterable): The results, as tuples in COLUMNS order.
+
+        Returns:
+            - int: The number of results inserted.
+        """
+        rows = sorted(rows, key=itemgetter(0))
+        cursor = self.connection.cursor()
+        cursor.execute('BEGIN')
+        try:
+            configs = self.configs
+            for name in {row[2] for row in rows} - configs.keys():
+                cursor.execute('INSERT INTO ghost_configs (name) VALUES (?)', (name,))
+                configs[name] = cursor.lastrowid
+            cursor.executemany(f"INSERT INTO results ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                               [(score, seed, configs[ghosts], *rest) for score, seed, ghosts, *rest in rows])
+            inserted = cursor.rowcount
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            self.configs = dict(self.connection.execute('SELECT name, id FROM ghost_configs'))
+            raise
+        cursor.execute('COMMIT')
+        self.inserted += inserted
+        return inserted
+
+    def flush(self):
+        """
+        Inserts the buffered results.
+        """
+        if self.pending:
+            rows, self.pending = self.pending, []
+            self.add_many(rows)
+
+    def count(self, **filters):
+        """
+        Counts the results matching filters.
+
+        Parameters:
+            - filters: seed, ghosts, since and until, as taken by top.
+
+        Returns:
+            - int: The number of results.
+        """
+        clause, parameters = where(**filters)
+        return self.reader().execute(f'SELECT COUNT(*) FROM results{clause}', parameters).fetchone()[0]
+
+    def top(self, k=10, **filters):
+        """
+        Returns the best results matching filters, the earliest first among equal scores.
+
+        Parameters:
+            - k (int): The number of results.
+            - filters: seed (int), ghosts (str), since (float) and until (float), see where.
+
+        Returns:
+            - list: The results, as tuples in COLUMNS order.
+        """
+        clause, parameters = where(**filters)
+        # The name of the configuration is only looked up for the k results returned
+        columns = ', '.join('(SELECT name FROM ghost_configs WHERE id = ghosts)' if column == 'ghosts' else column for column in COLUMNS)
+        query = f'SELECT {columns} FROM results{clause} ORDER BY score DESC, id LIMIT ?'
+        return self.reader().execute(query, parameters + [k]).fetchall()
+
+    def percentiles(self, quantiles=(0.5, 0.9, 0.99), **filters):
+        """
+        Returns score percentiles of the results matching filters, by the nearest rank. Every
+        percentile is one step along the score index, no result is loaded.
+
+        Parameters:
+            - quantiles (tuple): The quantiles, between 0 and 1.
+            - filters: seed, ghosts, since and until, as taken by top.
+
+        Returns:
+            - dict: The score of every quantile, None without results.
+        """
+        total = self.count(**filters)
+        clause, parameters = where(**filters)
+        query = f'SELECT score FROM results{clause} ORDER BY score LIMIT 1 OFFSET ?'
+        scores = {}
+        for quantile in quantiles:
+            if total == 0:
+                scores[quantile] = None
+                continue
+            rank = min(max(round(quantile * total + 0.5) - 1, 0), total - 1)
+            scores[quantile] = self.reader().execute(query, parameters + [rank]).fetchone()[0]
+        return scores
+
+    def submit(self, query, *args, **kwargs):
+        """
+        Runs a query on the reader thread, which has its own connection, so the caller doesn't wait.
+
+        Parameters:
+            - query (str): The name of the query, e.g. 'top'.
+            - args, kwargs: The arguments of the query.
+
+        Returns:
+            - concurrent.futures.Future: The result of the query.
+        """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='results-reader')
+        return self.executor.submit(getattr(self, query), *args, **kwargs)
+
+    def close(self):
+        """
+        Flushes the buffer, stops the reader thread and closes the connections.
+        """
+        self.flush()
+        if self.executor is not None:
+            self.executor.submit(self.close_reader).result()
+            self.executor.shutdown()
+            self.executor = None
+        self.close_reader()
+        self.connection.close()
+
+    def close_reader(self):
+        """
+        Closes the connection of the calling thread, if it has one.
+        """
+        if hasattr(self.local, 'connection'):
+            self.local.connection.close()
+            del self.local.connection
@@ -0,0 +1,277 @@
+"""
+Soak Module
+
+This module defines the SoakHarness class, which drives the menu's cycle over and over the way a
+kiosk does for days: a new game from the GameFactory, played to its end by run_game, recorded on
+the leaderboard. Nobody is there, so the display is headless, an Autopilot plays and a key is
+pressed for the win or lose screen. The frames aren't paced, a soak plays as fast as the game runs.
+
+Every few cycles, after a warm-up, the harness samples what could pile up from one game to the
+next: the resident memory of the process, but for what tracemalloc takes, the number of Python objects, the mixer channels still
+playing and the pygame Surfaces alive. A resource that grows at every sample is reported as
+growing, with the source lines whose allocations grew the most since the first sample, as
+tracemalloc tells. The pixels of a Surface are allocated by SDL, out of tracemalloc's sight, which
+is why the Surfaces are counted.
+
+Run a soak with:
+    python -m Telemetry.soak [cycles]
+
+which exits with status 1 when something grows.
+
+Attributes:
+    DEFAULT_CYCLES (int): The number of games a soak plays by default.
+    DEFAULT_INTERVAL (int): The number of games between two samples.
+    DEFAULT_WARMUP (int): The number of games played before the first sample, while caches fill.
+    DEFAULT_MAX_TICKS (int): The ticks after which a game is given up as lost.
+    TOLERANCES (dict): How much every resource may grow over a soak before it is a leak.
+    TOP_SITES (int): The number of growing allocation sites reported.
+
+Classes:
+    SoakHarness: Plays games over and over and samples the resources they leave behind.
+        - run: Plays the soak and returns its report.
+        - play: Plays one cycle of the menu.
+        - sample: Samples the resources after a cycle.
+        - snapshot: Takes a tracemalloc snapshot of the allocations of the games.
+        - growing: Returns the resources that grew at every sample.
+        - report: Returns the samples, the growing resources and the growing allocation sites.
+
+Functions:
+    resident_memory: Returns the resident memory of the process.
+    live_surfaces: Counts the pygame Surfaces alive.
+    busy_channels: Counts the mixer channels playing.
+    grows: Tells whether a series of samples grows steadily.
+"""
+from tempfile import TemporaryDirectory
+import gc
+import os
+import sys
+import tracemalloc
+import pygame
+from GUI.leaderboard import Leaderboard
+from Players.autopilot import Autopilot
+from Telemetry.results import ResultStore
+from Engine.pacing import UnthrottledClock, GameOverKey
+from game import GameFactory
+
+DEFAULT_CYCLES = 200
+DEFAULT_INTERVAL = 10
+DEFAULT_WARMUP = 5
+DEFAULT_MAX_TICKS = 3600
+# sqlite keeps a weak reference to every cursor of a connection until it has made 200 more
+TOLERANCES = {'rss': 8 * 1024 * 1024, 'objects': 500, 'channels': 0, 'surfaces': 0}
+TOP_SITES = 10
+
+def resident_memory():
+    """
+    Returns the resident memory of the process, from /proc.
+
+    Returns:
+        - int: The resident memory in bytes, 0 where /proc isn't available.
+    """
+    try:
+        with open('/proc/self/statm', encoding='ascii') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+def live_surfaces():
+    """
+    Counts the pygame Surfaces alive. Surfaces aren't tracked by the garbage collector, so they are
+    found among what the tracked objects refer to: sprites, lists, dicts and frames. Tuples and
+    dicts holding only untracked objects, like Surfaces, are untracked too and looked into.
+
+    Returns:
+        - int: The number of distinct Surfaces.
+    """
+    surfaces = set()
+    pending = gc.get_objects()
+    while pending:
+        for referent in gc.get_referents(pending.pop()):
+            if isinstance(referent, pygame.Surface):
+                surfaces.add(id(referent))
+            elif isinstance(referent, (tuple, dict)) and not gc.is_tracked(referent):
+                pending.append(referent)
+    return len(surfaces)
+
+def busy_channels():
+    """
+    Counts the mixer channels playing a sound.
+
+    Returns:
+        - int: The number of busy channels, 0 without a mixer.
+    """
+    if not pygame.mixer.get_init():
+        return 0
+    return sum(pygame.mixer.Channel(channel).get_busy() for channel in range(pygame.mixer.get_num_channels()))
+
+def grows(values, tolerance=0):
+    """
+    Tells whether a series of samples grows steadily: never down from one sample to the next, and
+    up by more than the tolerance overall. A resource that is freed now and then doesn't leak.
+
+    Parameters:
+        - values (list): The samples, in order.
+        - tolerance (int): How much the series may grow overall.
+
+    Returns:
+        - bool: True if the series grows, False with fewer than three samples.
+    """
+    if len(values) < 3:
+        return False
+    steady = all(later >= earlier for earlier, later in zip(values, values[1:]))
+    return steady and values[-1] - values[0] > tolerance
+
+class SoakHarness(): # pylint: disable=too-many-instance-attributes
+    """
+    Plays the menu's cycle over and over with an automated player, and samples the resources the
+    games leave behind.
+
+    Attributes:
+        - cycles (int): The number of games played.
+        - interval (int): The number of games between two samples.
+        - warmup (int): The number of games played before the first sample.
+        - max_ticks (int): The ticks after which a game is given up as lost.
+        - controller (Controller): The controller playing every game.
+        - tolerances (dict): How much every resource may grow over the soak, see TOLERANCES.
+        - trace (bool): Whether allocations are traced to find the growing sites.
+        - samples (list): The samples, one dict per sample with the cycle and every resource.
+        - snapshots (list): The tracemalloc snapshots of the first and of the last sample, once sampled.
+    """
+    def __init__(self, cycles=DEFAULT_CYCLES, interval=DEFAULT_INTERVAL, warmup=DEFAULT_WARMUP, max_ticks=DEFAULT_MAX_TICKS, controller=None, trace=True): # pylint: disable=too-many-arguments,too-many-positional-arguments
+        """
+        Initializes a soak.
+
+        Parameters:
+            - cycles (int): The number of games played.
+            - interval (int): The number of games between two samples.
+            - warmup (int): The number of games played before the first sample.
+            - max_ticks (int): The ticks after which a game is given up as lost.
+            - controller (Controller): The controller playing every game. Defaults to an Autopilot.
+            - trace (bool): Trace allocations with tracemalloc, which slows the games down.
+        """
+        self.cycles = cycles
+        self.interval = interval
+        self.warmup = warmup
+        self.max_ticks = max_ticks
+        self.controller = Autopilot() if controller is None else controller
+        self.tolerances = dict(TOLERANCES)
+        self.trace = trace
+        self.samples = []
+        self.snapshots = []
+
+    def run(self):
+        """
+        Plays the soak on the display, or on a new one, and returns its report. The results are
+        stored in a temporary database, which is removed afterwards.
+
+        Returns:
+            - dict: The report, see report.
+        """
+        started = self.trace and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        screen = pygame.display.get_surface() or pygame.display.set_mode((795, 900))
+        factory = GameFactory()
+        with TemporaryDirectory() as directory:
+            leaderboard = Leaderboard(ResultStore(os.path.join(directory, 'results.sqlite3')))
+            try:
+                for cycle in range(1, self.cycles + 1):
+                    self.play(factory, leaderboard, screen)
+                    if cycle >= self.warmup and (cycle - self.warmup) % self.interval == 0:
+                        self.sample(cycle)
+            finally:
+                leaderboard.close()
+                if started:
+                    tracemalloc.stop()
+        return self.report()
+
+    def play(self, factory, leaderboard, screen):
+        """
+        Plays one cycle of the menu: a new game played to its end, then recorded on the leaderboard
+        and the panel drawn once the scores are read.
+
+        Parameters:
+            - factory (GameFactory): The factory of the games.
+            - leaderboard (Leaderboard): The leaderboard the games are recorded on.
+            - screen (pygame.Surface): The display surface.
+        """
+        game = factory.new_game(self.controller)
+        game.observers.append(GameOverKey(self.max_ticks))
+        leaderboard.record(game, game.run_game(screen, UnthrottledClock()))
+        leaderboard.query.result()
+        leaderboard.update()
+        leaderboard.draw(screen, (screen.get_width() // 2, 730))
+        pygame.event.get()
+
+    def sample(self, cycle):
+        """
+        Samples the resources after a cycle, once the garbage is collected.
+
+        Parameters:
+            - cycle (int): The number of games played so far.
+        """
+        # The traces of a snapshot are objects too: only the first snapshot, which never changes, is
+        # alive while the objects are counted
+        del self.snapshots[1:]
+        if tracemalloc.is_tracing() and not self.snapshots:
+            self.snapshots.append(self.snapshot())
+        gc.collect()
+        self.samples.append({
+            'cycle': cycle,
+            # Tracing takes memory of its own, more the more is allocated
+            'rss': resident_memory() - tracemalloc.get_tracemalloc_memory(),
+            'objects': len(gc.get_objects()),
+            'channels': busy_channels(),
+            'surfaces': live_surfaces(),
+        })
+        if tracemalloc.is_tracing():
+            self.snapshots.append(self.snapshot())
+
+    @staticmethod
+    def snapshot():
+        """
+        Takes a tracemalloc snapshot, without the allocations of tracemalloc and of the harness itself.
+
+        Returns:
+            - tracemalloc.Snapshot: The snapshot.
+        """
+        return tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)))
+
+    def growing(self):
+        """
+        Returns the resources that grew at every sample, by more than their tolerance.
+
+        Returns:
+            - list: The names of the growing resources.
+        """
+        return [name for name, tolerance in self.tolerances.items() if grows([sample[name] for sample in self.samples], tolerance)]
+
+    def report(self):
+        """
+        Returns the samples, the growing resources and, when allocations were traced, the source
+        lines whose allocations grew the most between the first and the last sample.
+
+        Returns:
+            - dict: The cycles played, the samples, the growing resources and the growing sites,
+              as strings like "game.py:120: +12.3 KiB (+40 blocks)".
+        """
+        sites = []
+        if len(self.snapshots) == 2:
+            for stat in self.snapshots[1].compare_to(self.snapshots[0], 'lineno')[:TOP_SITES]:
+                if stat.size_diff > 0:
+                    frame = stat.traceback[0]
+                    sites.append(f'{frame.filename}:{frame.lineno}: +{stat.size_diff / 1024:.1f} KiB (+{stat.count_diff} blocks)')
+        return {'cycles': self.cycles, 'samples': self.samples, 'growing': self.growing(), 'sites': sites}
+
+if __name__ == "__main__":
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    pygame.init()
+    soak = SoakHarness(cycles=int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CYCLES)
+    result = soak.run()
+    for row in result['samples']:
+        print(f"cycle {row['cycle']}: {row['rss'] / 2 ** 20:.1f} MiB, {row['objects']} objects, {row['channels']} channels, {row['surfaces']} surfaces")
+    print(f"growing: {', '.join(result['growing']) or 'nothing'}")
+    for site in result['sites']:
+        print(f"    {site}")
+    sys.exit(1 if result['growing'] else 0)
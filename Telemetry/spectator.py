@@ -0,0 +1,226 @@
+"""
+Spectator Server Module
+
+This module defines the SpectatorServer class, an optional asyncio server that lets any number of
+spectators on localhost watch a running game. The game hands the server a cheap snapshot every tick.
+Turning snapshots into deltas, serializing them and sending them out all happens on the server's own
+thread, so the simulation never waits on the network. Spectators that can't keep up are dropped.
+
+Every message is one line of JSON. A new spectator first receives a keyframe with the full state,
+then one delta per tick with only the fields that changed:
+    - tick (int): Always present.
+    - pacman (list): [x, y, direction] of Pacman's center.
+    - ghosts (list): [x, y, frightened] for each ghost.
+    - eaten (list): [x, y] tiles whose coin or power-up was eaten since the last message.
+    - score, lives, remaining (int): The HUD counters.
+    - mode (str): "frightened" or "normal".
+
+Attributes:
+    DEFAULT_QUEUE_SIZE (int): Number of messages a spectator may fall behind before it is dropped.
+
+Classes:
+    SpectatorServer: Broadcasts per-tick state deltas to connected spectators.
+        - start: Starts the server thread and waits until it listens.
+        - on_tick: Game observer hook, publishes the state of the game.
+        - publish: Hands a snapshot to the server thread.
+        - stop: Disconnects everyone and stops the server thread.
+
+Functions:
+    take_snapshot: Captures the state of a game that spectators see.
+    snapshot_delta: Computes the message between two snapshots.
+"""
+import asyncio
+import json
+import threading
+import numpy as np
+
+DEFAULT_QUEUE_SIZE = 120
+
+def take_snapshot(game, tick):
+    """
+    Captures the state of a game that spectators see. Only copies, no serialization.
+
+    Parameters:
+        - game (Game): The game to capture.
+        - tick (int): The number of the current tick.
+
+    Returns:
+        - dict: The snapshot.
+    """
+    player = game.player
+    return {
+        'tick': tick,
+        'pacman': [player.rect.centerx, player.rect.centery, player.direction],
+        'ghosts': [[ghost.rect.centerx, ghost.rect.centery, bool(ghost.freightened)] for ghost in game.ghosts],
+        'tiles': game.map.tile_types.copy(),
+        'score': player.score,
+        'lives': player.lives,
+        'remaining': game.remaining_coins,
+        'mode': 'frightened' if game.vulnerable_mode else 'normal',
+    }
+
+def snapshot_delta(previous, current):
+    """
+    Computes the message between two snapshots.
+
+    Parameters:
+        - previous (dict): The snapshot the spectators already have, or None for a keyframe.
+        - current (dict): The new snapshot.
+
+    Returns:
+        - dict: The fields that changed, always including the tick.
+    """
+    message = {'tick': current['tick']}
+    if previous is None:
+        message['eaten'] = []
+    else:
+        eaten = np.argwhere(previous['tiles'] != current['tiles'])
+        if len(eaten):
+            message['eaten'] = eaten.tolist()
+    for field in ('pacman', 'ghosts', 'score', 'lives', 'remaining', 'mode'):
+        if previous is None or previous[field] != current[field]:
+            message[field] = current[field]
+    return message
+
+class SpectatorServer(): # pylint: disable=too-many-instance-attributes
+    """
+    Broadcasts per-tick state deltas to any number of spectators over TCP on localhost.
+
+    The server runs its own asyncio loop on a daemon thread. Each spectator has a bounded queue;
+    one that falls more than queue_size messages behind is disconnected.
+
+    Attributes:
+        - host (str): The address the server listens on.
+        - port (int): The port the server listens on. 0 picks a free one, which is known after start().
+        - queue_size (int): Number of messages a spectator may fall behind before it is dropped.
+        - dropped (int): The number of spectators dropped for being too slow.
+    """
+    def __init__(self, host='127.0.0.1', port=0, queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        Initializes a new instance of the SpectatorServer class.
+
+        Parameters:
+            - host (str): The address to listen on. Keep it local.
+            - port (int): The port to listen on, 0 for any free port.
+            - queue_size (int): Number of messages a spectator may fall behind before it is dropped.
+        """
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.dropped = 0
+        self.loop = None
+        self.thread = None
+        self.clients = {}
+        self.last_snapshot = None
+        self.ready = threading.Event()
+
+    def start(self):
+        """
+        Starts the server thread and waits until it listens.
+
+        Returns:
+            - SpectatorServer: The server itself.
+        """
+        self.thread = threading.Thread(target=self.run, name='spectator-server', daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        return self
+
+    def run(self):
+        """
+        Runs the asyncio loop of the server. Called on the server thread.
+        """
+        self.loop = asyncio.new_event_loop()
+        server = self.loop.run_until_complete(asyncio.start_server(self.handle_client, self.host, self.port))
+        self.port = server.sockets[0].getsockname()[1]
+        self.ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            server.close()
+            for writer in list(self.clients):
+                writer.transport.abort()
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.close()
+
+    def on_tick(self, game, tick):
+        """
+        Game observer hook, publishes the state of the game.
+
+        Parameters:
+            - game (Game): The running game.
+            - tick (int): The number of the current tick.
+        """
+        self.publish(take_snapshot(game, tick))
+
+    def publish(self, snapshot):
+        """
+        Hands a snapshot to the server thread. Never waits for the network.
+
+        Parameters:
+            - snapshot (dict): The snapshot from take_snapshot.
+        """
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.broadcast, snapshot)
+
+    def broadcast(self, snapshot):
+        """
+        Sends the delta to the previous snapshot to every spectator. Called on the server thread.
+
+        Parameters:
+            - snapshot (dict): The new snapshot.
+        """
+        line = (json.dumps(snapshot_delta(self.last_snapshot, snapshot)) + '\n').encode()
+        self.last_snapshot = snapshot
+        for writer, queue in list(self.clients.items()):
+            try:
+                queue.put_nowait(line)
+            except asyncio.QueueFull:
+                self.drop(writer)
+
+    def drop(self, writer):
+        """
+        Disconnects a spectator that fell too far behind. Called on the server thread.
+
+        Parameters:
+            - writer (asyncio.StreamWriter): The stream of the spectator.
+        """
+        queue = self.clients.pop(writer, None)
+        if queue is not None:
+            self.dropped += 1
+            writer.transport.abort()
+
+    async def handle_client(self, reader, writer):
+        """
+        Sends the keyframe and then the queued deltas to one spectator.
+
+        Parameters:
+            - reader (asyncio.StreamReader): The incoming stream, unused.
+            - writer (asyncio.StreamWriter): The outgoing stream.
+        """
+        del reader
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        if self.last_snapshot is not None:
+            queue.put_nowait((json.dumps(snapshot_delta(None, self.last_snapshot)) + '\n').encode())
+        self.clients[writer] = queue
+        try:
+            while writer in self.clients:
+                writer.write(await queue.get())
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.clients.pop(writer, None)
+            writer.close()
+
+    def stop(self):
+        """
+        Disconnects everyone and stops the server thread.
+        """
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=5)
+        self.loop = None
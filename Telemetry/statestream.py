@@ -0,0 +1,502 @@
+"""
+State Stream Module
+
+This module defines a compact binary format for archiving the per-tick state of whole games,
+e.g. the traces of batch simulations, without pickling Game objects.
+
+A stream starts with a header describing the board and the number of ghosts, followed by blocks.
+Every block starts with a keyframe holding the full state; the frames after it only store the
+fields that changed since the previous frame. Frames are bit-packed and a block may be compressed
+on its own, so a reader decodes one block at a time and can skip blocks it doesn't need.
+
+Frame layout, in bits:
+    - keyframe: tick (32), Pacman x, y (POSITION_BITS each) and direction (2), per ghost x, y
+      (POSITION_BITS each) and frightened (1), the counters (COUNTER_BITS) and, byte aligned,
+      the coin bitmap packed with numpy.
+    - delta: the tick step (8), a change mask with one bit for Pacman, one per ghost, one for the
+      coins and one for the counters, then the changed fields as in a keyframe. Changed coins are
+      stored as the number of flipped cells followed by their indices.
+
+Attributes:
+    MAGIC (bytes): The first bytes of every state stream.
+    VERSION (int): The version of the format written by this module.
+    COMPRESSION (dict): The block compressions by name and the id stored in the header.
+    POSITION_BITS (int): Bits used for a coordinate in pixels.
+    POSITION_OFFSET (int): Added to coordinates so Pacman and the ghosts in the teleport stay positive.
+    COUNTER_BITS (tuple): Bits used for the score, lives, remaining coins and frightened timer.
+    DEFAULT_BLOCK_FRAMES (int): Number of frames per block, so also the distance between keyframes.
+
+Classes:
+    BitWriter: Packs unsigned integers into bytes, most significant bit first.
+    BitReader: Reads back what a BitWriter packed.
+    StateStreamWriter: Writes frames to a binary file object.
+        - for_game: Creates a writer for the board and ghosts of a game.
+        - write: Adds a frame to the stream.
+        - on_tick: Game observer hook, writes the state of the game.
+        - close: Writes the last block.
+    StateStreamReader: Reads frames from a binary file object, block by block.
+
+Functions:
+    capture_frame: Captures the state of a game that a stream stores.
+    index_width: Returns the number of bits needed for the index of a cell of the board.
+    compress: Compresses a block.
+    decompress: Decompresses a block.
+    read_frames: Reads the frames of a stream file one by one.
+"""
+import struct
+import zlib
+import numpy as np
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+MAGIC = b'PMSS'
+VERSION = 1
+COMPRESSION = {'none': 0, 'zlib': 1, 'lz4': 2}
+POSITION_BITS = 11
+POSITION_OFFSET = 128
+COUNTER_BITS = (24, 4, 12, 8)
+DEFAULT_BLOCK_FRAMES = 256
+
+HEADER = struct.Struct('<4sBBBBB')
+BLOCK_HEADER = struct.Struct('<II')
+
+def capture_frame(game, tick):
+    """
+    Captures the state of a game that a stream stores.
+
+    Parameters:
+        - game (Game): The game to capture.
+        - tick (int): The number of the current tick.
+
+    Returns:
+        - dict: The frame, with the tick, pacman (x, y, direction), ghosts ((x, y, frightened) each),
+          coins (a boolean array of the tiles still holding a coin or a power-up, indexed by (x, y))
+          and counters (score, lives, remaining coins, frightened timer).
+    """
+    player = game.player
+    tiles = game.map.tile_types
+    return {
+        'tick': tick,
+        'pacman': (player.rect.centerx, player.rect.centery, player.direction),
+        'ghosts': [(ghost.rect.centerx, ghost.rect.centery, bool(ghost.freightened)) for ghost in game.ghosts],
+        'coins': (tiles == 1) | (tiles == 2),
+        'counters': (player.score, player.lives, game.remaining_coins, game.vulnerable_timer),
+    }
+
+def index_width(shape):
+    """
+    Returns the number of bits needed for the index of a cell of the board.
+
+    Parameters:
+        - shape (tuple): The (width, height) of the board.
+
+    Returns:
+        - int: The number of bits.
+    """
+    return (shape[0] * shape[1]).bit_length()
+
+class BitWriter():
+    """
+    Packs unsigned integers into bytes, most significant bit first.
+
+    Attributes:
+        - data (bytearray): The bytes written so far.
+    """
+    def __init__(self):
+        self.data = bytearray()
+        self.buffer = 0
+        self.bits = 0
+
+    def write(self, value, bits):
+        """
+        Appends an unsigned integer.
+
+        Parameters:
+            - value (int): The value to write.
+            - bits (int): The number of bits the value is stored in.
+        """
+        if not 0 <= value < 1 << bits:
+            raise ValueError(f"{value} does not fit in {bits} bits")
+        self.buffer = self.buffer << bits | value
+        self.bits += bits
+        while self.bits >= 8:
+            self.bits -= 8
+            self.data.append(self.buffer >> self.bits & 0xFF)
+        self.buffer &= (1 << self.bits) - 1
+
+    def write_bytes(self, data):
+        """
+        Pads to the next byte and appends raw bytes.
+
+        Parameters:
+            - data (bytes): The bytes to append.
+        """
+        self.align()
+        self.data += data
+
+    def align(self):
+        """
+        Pads the last byte with zero bits.
+        """
+        if self.bits:
+            self.write(0, 8 - self.bits)
+
+class BitReader():
+    """
+    Reads back the values a BitWriter packed.
+
+    Attributes:
+        - data (bytes): The packed bytes.
+        - position (int): The number of bits read so far.
+    """
+    def __init__(self, data):
+        self.data = data
+        self.position = 0
+
+    def read(self, bits):
+        """
+        Reads an unsigned integer.
+
+        Parameters:
+            - bits (int): The number of bits the value is stored in.
+
+        Returns:
+            - int: The value.
+        """
+        start = self.position >> 3
+        end = (self.position + bits + 7) >> 3
+        chunk = int.from_bytes(self.data[start:end], 'big')
+        unused = (end << 3) - self.position - bits
+        self.position += bits
+        return chunk >> unused & ((1 << bits) - 1)
+
+    def read_bytes(self, size):
+        """
+        Skips to the next byte and reads raw bytes.
+
+        Parameters:
+            - size (int): The number of bytes to read.
+
+        Returns:
+            - bytes: The bytes.
+        """
+        start = (self.position + 7) >> 3
+        self.position = (start + size) << 3
+        return self.data[start:start + size]
+
+def compress(data, compression):
+    """
+    Compresses a block.
+
+    Parameters:
+        - data (bytes): The block.
+        - compression (int): The id of the compression from COMPRESSION.
+
+    Returns:
+        - bytes: The compressed block.
+    """
+    if compression == COMPRESSION['zlib']:
+        return zlib.compress(data)
+    if compression == COMPRESSION['lz4']:
+        return lz4_frame.compress(data)
+    return bytes(data)
+
+def decompress(data, compression):
+    """
+    Decompresses a block.
+
+    Parameters:
+        - data (bytes): The compressed block.
+        - compression (int): The id of the compression from COMPRESSION.
+
+    Returns:
+        - bytes: The block.
+    """
+    if compression == COMPRESSION['zlib']:
+        return zlib.decompress(data)
+    if compression == COMPRESSION['lz4']:
+        if lz4_frame is None:
+            raise ValueError("The stream is lz4 compressed, but the lz4 package is not installed")
+        return lz4_frame.decompress(data)
+    return data
+
+class StateStreamWriter(): # pylint: disable=too-many-instance-attributes
+    """
+    Writes frames to a binary file object as a state stream.
+
+    Attributes:
+        - file: The binary file object the stream is written to.
+        - shape (tuple): The (width, height) of the coin bitmap.
+        - ghost_count (int): The number of ghosts in every frame.
+        - compression (int): The id of the block compression.
+        - block_frames (int): The number of frames per block.
+        - frames (int): The number of frames written so far.
+    """
+    def __init__(self, file, shape, ghost_count, compression='zlib', block_frames=DEFAULT_BLOCK_FRAMES):
+        """
+        Initializes a new instance of the StateStreamWriter class and writes the header.
+
+        Parameters:
+            - file: A binary file object opened for writing.
+            - shape (tuple): The (width, height) of the board.
+            - ghost_count (int): The number of ghosts.
+            - compression (str): 'none', 'zlib' or 'lz4'. lz4 needs the lz4 package.
+            - block_frames (int): The number of frames per block, between 1 and 65535.
+        """
+        if compression not in COMPRESSION:
+            raise ValueError(f"Unknown compression {compression!r}")
+        if compression == 'lz4' and lz4_frame is None:
+            raise ValueError("lz4 compression needs the lz4 package")
+        self.file = file
+        self.shape = tuple(shape)
+        self.ghost_count = ghost_count
+        self.compression = COMPRESSION[compression]
+        self.block_frames = block_frames
+        self.frames = 0
+        self.block = BitWriter()
+        self.block_count = 0
+        self.previous = None
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.compression, self.shape[0], self.shape[1], ghost_count))
+
+    @classmethod
+    def for_game(cls, file, game, compression='zlib'):
+        """
+        Creates a writer for the board and ghosts of a game.
+
+        Parameters:
+            - file: A binary file object opened for writing.
+            - game (Game): The game that will be recorded.
+            - compression (str): 'none', 'zlib' or 'lz4'.
+
+        Returns:
+            - StateStreamWriter: The writer.
+        """
+        return cls(file, game.map.tile_types.shape, len(game.ghosts), compression)
+
+    def write(self, frame):
+        """
+        Adds a frame to the stream. A block is written to the file once it is full.
+
+        Parameters:
+            - frame (dict): The frame, as returned by capture_frame.
+        """
+        if self.block_count == self.block_frames:
+            self.flush()
+        if self.previous is None:
+            self.write_keyframe(frame)
+        else:
+            self.write_delta(frame)
+        self.previous = frame
+        self.block_count += 1
+        self.frames += 1
+
+    def on_tick(self, game, tick):
+        """
+        Game observer hook, writes the state of the game.
+
+        Parameters:
+            - game (Game): The running game.
+            - tick (int): The number of the current tick.
+        """
+        self.write(capture_frame(game, tick))
+
+    def write_actor(self, actor, flag_bits):
+        """
+        Writes the position and the direction or frightened flag of Pacman or a ghost.
+
+        Parameters:
+            - actor (tuple): (x, y, direction) for Pacman, (x, y, frightened) for a ghost.
+            - flag_bits (int): 2 for Pacman's direction, 1 for a ghost's frightened flag.
+        """
+        self.block.write(actor[0] + POSITION_OFFSET, POSITION_BITS)
+        self.block.write(actor[1] + POSITION_OFFSET, POSITION_BITS)
+        self.block.write(int(actor[2]), flag_bits)
+
+    def write_counters(self, counters):
+        """
+        Writes the score, lives, remaining coins and frightened timer.
+
+        Parameters:
+            - counters (tuple): The counters of the frame.
+        """
+        for value, bits in zip(counters, COUNTER_BITS):
+            self.block.write(value, bits)
+
+    def write_keyframe(self, frame):
+        """
+        Writes the full state of a frame.
+
+        Parameters:
+            - frame (dict): The frame.
+        """
+        self.block.write(frame['tick'], 32)
+        self.write_actor(frame['pacman'], 2)
+        for ghost in frame['ghosts']:
+            self.write_actor(ghost, 1)
+        self.write_counters(frame['counters'])
+        self.block.write_bytes(np.packbits(frame['coins'].ravel()).tobytes())
+
+    def write_delta(self, frame):
+        """
+        Writes the fields of a frame that changed since the previous one.
+
+        Parameters:
+            - frame (dict): The frame.
+        """
+        previous = self.previous
+        self.block.write(frame['tick'] - previous['tick'], 8)
+        changed_coins = np.flatnonzero(frame['coins'] != previous['coins'])
+        changes = [tuple(frame['pacman']) != tuple(previous['pacman'])]
+        changes += [tuple(ghost) != tuple(old) for ghost, old in zip(frame['ghosts'], previous['ghosts'])]
+        changes += [len(changed_coins) > 0, tuple(frame['counters']) != tuple(previous['counters'])]
+        for changed in changes:
+            self.block.write(int(changed), 1)
+        if changes[0]:
+            self.write_actor(frame['pacman'], 2)
+        for ghost, changed in zip(frame['ghosts'], changes[1:-2]):
+            if changed:
+                self.write_actor(ghost, 1)
+        if changes[-2]:
+            index_bits = index_width(self.shape)
+            self.block.write(len(changed_coins), index_bits)
+            for index in changed_coins:
+                self.block.write(int(index), index_bits)
+        if changes[-1]:
+            self.write_counters(frame['counters'])
+
+    def flush(self):
+        """
+        Writes the current block to the file and starts a new one with a keyframe.
+        """
+        if self.block_count == 0:
+            return
+        self.block.align()
+        data = compress(self.block.data, self.compression)
+        self.file.write(BLOCK_HEADER.pack(len(data), self.block_count))
+        self.file.write(data)
+        self.block = BitWriter()
+        self.block_count = 0
+        self.previous = None
+
+    def close(self):
+        """
+        Writes the last block. The file object itself is left open.
+        """
+        self.flush()
+
+class StateStreamReader():
+    """
+    Reads the frames of a state stream from a binary file object. Iterating over the reader
+    decodes one block at a time, so long traces are never loaded whole.
+
+    Attributes:
+        - file: The binary file object the stream is read from.
+        - shape (tuple): The (width, height) of the coin bitmap.
+        - ghost_count (int): The number of ghosts in every frame.
+        - compression (int): The id of the block compression.
+    """
+    def __init__(self, file):
+        """
+        Initializes a new instance of the StateStreamReader class and reads the header.
+
+        Parameters:
+            - file: A binary file object opened for reading.
+        """
+        magic, version, self.compression, width, height, self.ghost_count = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a state stream of a supported version")
+        self.file = file
+        self.shape = (width, height)
+
+    def __iter__(self):
+        """
+        Yields the frames of the stream in order.
+
+        Yields:
+            - dict: The frames, in the format of capture_frame.
+        """
+        while True:
+            header = self.file.read(BLOCK_HEADER.size)
+            if len(header) < BLOCK_HEADER.size:
+                return
+            size, count = BLOCK_HEADER.unpack(header)
+            reader = BitReader(decompress(self.file.read(size), self.compression))
+            frame = self.read_keyframe(reader)
+            yield frame
+            for _ in range(count - 1):
+                frame = self.read_delta(reader, frame)
+                yield frame
+
+    def read_actor(self, reader, flag_bits):
+        """
+        Reads the position and the direction or frightened flag of Pacman or a ghost.
+
+        Parameters:
+            - reader (BitReader): The block being read.
+            - flag_bits (int): 2 for Pacman's direction, 1 for a ghost's frightened flag.
+
+        Returns:
+            - tuple: (x, y, direction) or (x, y, frightened).
+        """
+        x = reader.read(POSITION_BITS) - POSITION_OFFSET
+        y = reader.read(POSITION_BITS) - POSITION_OFFSET
+        flag = reader.read(flag_bits)
+        return (x, y, flag if flag_bits == 2 else bool(flag))
+
+    def read_keyframe(self, reader):
+        """
+        Reads a frame holding the full state.
+
+        Parameters:
+            - reader (BitReader): The block being read.
+
+        Returns:
+            - dict: The frame.
+        """
+        tick = reader.read(32)
+        pacman = self.read_actor(reader, 2)
+        ghosts = [self.read_actor(reader, 1) for _ in range(self.ghost_count)]
+        counters = tuple(reader.read(bits) for bits in COUNTER_BITS)
+        cells = self.shape[0] * self.shape[1]
+        packed = np.frombuffer(reader.read_bytes((cells + 7) // 8), dtype=np.uint8)
+        coins = np.unpackbits(packed, count=cells).astype(bool).reshape(self.shape)
+        return {'tick': tick, 'pacman': pacman, 'ghosts': ghosts, 'coins': coins, 'counters': counters}
+
+    def read_delta(self, reader, previous):
+        """
+        Reads a frame holding the fields that changed since the previous one.
+
+        Parameters:
+            - reader (BitReader): The block being read.
+            - previous (dict): The previous frame.
+
+        Returns:
+            - dict: The frame.
+        """
+        tick = previous['tick'] + reader.read(8)
+        changes = [reader.read(1) for _ in range(self.ghost_count + 3)]
+        pacman = self.read_actor(reader, 2) if changes[0] else previous['pacman']
+        ghosts = [self.read_actor(reader, 1) if changed else ghost for ghost, changed in zip(previous['ghosts'], changes[1:-2])]
+        coins = previous['coins']
+        if changes[-2]:
+            index_bits = index_width(self.shape)
+            flipped = [reader.read(index_bits) for _ in range(reader.read(index_bits))]
+            coins = coins.copy()
+            coins.flat[flipped] ^= True
+        counters = tuple(reader.read(bits) for bits in COUNTER_BITS) if changes[-1] else previous['counters']
+        return {'tick': tick, 'pacman': pacman, 'ghosts': ghosts, 'coins': coins, 'counters': counters}
+
+def read_frames(path):
+    """
+    Reads the frames of a stream file one by one.
+
+    Parameters:
+        - path (str): The path of the stream file.
+
+    Yields:
+        - dict: The frames, in the format of capture_frame.
+    """
+    with open(path, 'rb') as file:
+        yield from StateStreamReader(file)
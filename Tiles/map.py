@@ -4,29 +4,31 @@ Pacman Game Map Module
 This module defines the Map class, which represents the game map. It includes methods to create
 and draw the game board, and there is also a function for applying effects to tiles based on player interactions.
 
+It also builds the legal-move table, a bitmask of open directions for every tile, used by the
+ghosts to pick a direction without probing the walls.
+
+Attributes:
+- MOVE_DIRECTIONS (list): The four directions (x, y) in the order of their bits in the move table.
+- DOOR_SHIFT (int): Shift of the bits marking directions that lead through the ghost door.
+- LEGAL_MOVES (list): Tuple of directions for every 4-bit mask of the move table.
+- BOARD (list): The tile types of the board, one list per row.
+
 Dependencies:
 - NumPy: A library for multi-dimensional arrays and matrices, which is used for storing the boards.
 
 Usage:
 Import this module and create an instance of the Map class to represent the game map.
 Use the methods and functions provided to draw the map on the screen and apply effects to tiles.
+Run it to compare the memory per cell of the tile store with one MapTile sprite per cell:
+python -m Tiles.map
 """
 import numpy as np
-import pygame
-from Tiles.maptile import MapTile
-
-class Map():
-    """
-    A class representing the game map for the Pacman game.
+from Tiles.tilestore import TileStore, BoardLayer, FLOOR, WALL, DOOR, memory_report
+from Telemetry.events import COIN, POWERUP, MODE_CHANGE
 
-    Attributes:
-    - simple_board (numpy.ndarray): A 2D array representing a simplified version of the game board.
-    - tiles_board (pygame.sprite.Group): A sprite group containing all non-wall tiles.
-    - wall_group (pygame.sprite.Group): A sprite group containing all wall tiles.
-    - ghostdoor_group (pygame.sprite.Group): A sprite group containing all ghost door tiles.
-    """
-    def __init__(self):
-        board = np.array([
+MOVE_DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+DOOR_SHIFT = 4
+BOARD = [
 [6, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 0],
 [3, 6, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 0, 0, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 11, 3, 0],
 [3, 3, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 10, 3, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 12, 3],
@@ -60,13 +62,35 @@ class Map():
 [3, 3, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 10, 10],
 [3, 0, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 0, 10],
 [0, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 0]
-])
+]
+LEGAL_MOVES = [tuple(direction for bit, direction in enumerate(MOVE_DIRECTIONS) if mask & (1 << bit)) for mask in range(16)]
+
+class Map(): # pylint: disable=too-many-instance-attributes
+    """
+    A class representing the game map for the Pacman game.
+
+    Attributes:
+    - simple_board (numpy.ndarray): A 2D array representing a simplified version of the game board.
+    - store (TileStore): The tile types of the board in a typed array.
+    - tiles_board (TileLayer): The non-wall tiles, used like a sprite group.
+    - wall_group (TileLayer): The wall tiles, used like a sprite group.
+    - ghostdoor_group (TileLayer): The ghost door tiles, used like a sprite group.
+    - move_table (numpy.ndarray): A 2D array of legal-move bitmasks, indexed like simple_board.
+    - tile_types (numpy.ndarray): A 2D array of the current tile types, indexed like simple_board. It is the store's array.
+    - board_layer (BoardLayer): The drawn board, patched where coins were eaten.
+    """
+    def __init__(self, board=None):
+        """
+        Initializes a map.
+
+        Parameters:
+        - board (list): The tile types, one list per row. Defaults to BOARD.
+        """
+        board = np.array(BOARD if board is None else board)
         self.simple_board = np.vectorize(lambda x: 1 if x < 3 or x==9 else 0)(board)
         self.simple_board = np.transpose(self.simple_board)
-        self.tiles_board = pygame.sprite.Group()
-        self.wall_group = pygame.sprite.Group()
-        self.ghostdoor_group = pygame.sprite.Group()
         self.create_board(board)
+        self.move_table = self.create_move_table(board)
 
     def create_board(self, board):
         """
@@ -78,20 +102,56 @@ class Map():
         Returns:
         None
         """
-        for i, row in enumerate(board):
-            for j, tile_type in enumerate(row):
-                x = j * 27
-                y = i * 27
-                tile = MapTile(x, y, tile_type)
-                if tile_type < 3:
-                    self.tiles_board.add(tile)
-                elif tile_type == 9:
-                    self.ghostdoor_group.add(tile)
-                else: self.wall_group.add(tile)
+        self.store = TileStore(board)
+        self.tile_types = self.store.types
+        self.tiles_board = self.store.layer(FLOOR)
+        self.wall_group = self.store.layer(WALL)
+        self.ghostdoor_group = self.store.layer(DOOR)
+        self.board_layer = BoardLayer(self.store)
+
+    @staticmethod
+    def create_move_table(board):
+        """
+        Create the legal-move table based on the provided 2D array.
+
+        Bit i of a cell is set when the neighbor in MOVE_DIRECTIONS[i] is walkable. Bit i + DOOR_SHIFT
+        is set when that neighbor is the ghost door, which only ghosts still inside the house may cross.
+        The left and right edges are connected, matching the teleport at the sides of the board.
+
+        Parameters:
+        - board (numpy.ndarray): 2D array representing the game board.
+
+        Returns:
+        - numpy.ndarray: 2D array of bitmasks, indexed by (x, y) like simple_board.
+        """
+        board = np.transpose(board)
+        walkable = board < 3
+        door = board == 9
+        move_table = np.zeros(board.shape, dtype=np.uint8)
+        for bit, (dx, dy) in enumerate(MOVE_DIRECTIONS):
+            # Rolling wraps around horizontally; vertically there's no teleport, so the edge rows are closed.
+            neighbor_walkable = np.roll(walkable, (-dx, -dy), axis=(0, 1))
+            neighbor_door = np.roll(door, (-dx, -dy), axis=(0, 1))
+            if dy:
+                edge = -1 if dy > 0 else 0
+                neighbor_walkable[:, edge] = False
+                neighbor_door[:, edge] = False
+            move_table |= (neighbor_walkable << bit).astype(np.uint8)
+            move_table |= (neighbor_door << (bit + DOOR_SHIFT)).astype(np.uint8)
+        return move_table
+
+    def reset(self):
+        """
+        Put back every eaten coin and power-up, so the map can be reused by a new game.
+
+        Returns:
+        None
+        """
+        self.store.reset()
 
     def draw_board(self, screen):
         """
-        Draw the game board on the screen.
+        Draw the game board on the screen, from the baked board layer.
 
         Parameters:
         - screen (pygame.Surface): The surface to draw the game board on.
@@ -99,16 +159,14 @@ class Map():
         Returns:
         None
         """
-        self.tiles_board.draw(screen)
-        self.wall_group.draw(screen)
-        self.ghostdoor_group.draw(screen)
+        self.board_layer.draw(screen)
 
 def apply_effect_to_tile(tile, player, game, ghosts):
     """
     Apply effects to a specific tile based on player interaction.
 
     Parameters:
-    - tile (MapTile): The tile to apply effects to.
+    - tile (TileView): The tile to apply effects to.
     - player (Pacman): The player object.
     - game (Game): The game object.
     - ghosts (list): A list of ghost objects.
@@ -117,14 +175,31 @@ def apply_effect_to_tile(tile, player, game, ghosts):
     None
     """
     tile_type = tile.tile_type
+    x, y = tile.rect.centerx // 27, tile.rect.centery // 27
+    if tile_type in (1, 2):
+        game.map.tile_types[x, y] = 0
     if tile_type == 1:
         player.score += 10
         tile.tile_type = 0
         game.remaining_coins-=1
+        game.events.emit(COIN, x, y, player.score)
     elif tile_type == 2:
         player.score += 50
+        game.events.emit(POWERUP, x, y, player.score)
+        if not game.vulnerable_mode:
+            game.events.emit(MODE_CHANGE, x, y, 1)
         game.vulnerable_mode = True
-        game.vulnerable_timer = 16
+        game.vulnerable_timer = game.frightened_time
+        game.start_countdown()
         tile.tile_type = 0
         for ghost in ghosts:
             ghost.freightened = True
+
+if __name__ == "__main__":
+    import pygame
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    report = memory_report(BOARD)
+    print(f"{report['cells']} cells")
+    print(f"MapTile sprites: {report['sprite_bytes_per_cell']:.0f} bytes per cell")
+    print(f"Tile store: {report['store_bytes_per_cell']:.1f} bytes per cell, {report['array_bytes_per_cell']:.0f} for the array")
@@ -13,6 +13,7 @@ Usage:
     Import the MapTile class into your game module and use it to represent tiles on the map.
 """
 import pygame
+from GUI import assets
 
 class MapTile(pygame.sprite.Sprite):
     """
@@ -25,21 +26,22 @@ class MapTile(pygame.sprite.Sprite):
 
     Methods:
         load_image: Loads the appropriate image based on the tile type.
+        scaled_image: Loads the image of the tile type, scaled to the size of a tile.
         update: Updates the image of the MapTile.
     """
 
-    COIN_IMAGE = pygame.image.load("Graphics/coin.png")
-    POWERUP_IMAGE = pygame.image.load("Graphics/powerup.png")
-    WALL_IMAGE_3 = pygame.image.load("Graphics/wall3.png")
-    WALL_IMAGE_4 = pygame.image.load("Graphics/wall4.png")
-    WALL_IMAGE_5 = pygame.image.load("Graphics/wall5.png")
-    WALL_IMAGE_6 = pygame.image.load("Graphics/wall6.png")
-    WALL_IMAGE_7 = pygame.image.load("Graphics/wall7.png")
-    WALL_IMAGE_8 = pygame.image.load("Graphics/wall8.png")
-    WALL_IMAGE_10 = pygame.image.load("Graphics/wall10.png")
-    WALL_IMAGE_11 = pygame.image.load("Graphics/wall11.png")
-    WALL_IMAGE_12 = pygame.image.load("Graphics/wall12.png")
-    WALL_IMAGE_13 = pygame.image.load("Graphics/wall13.png")
+    COIN_IMAGE = assets.load_image("Graphics/coin.png", (27, 27))
+    POWERUP_IMAGE = assets.load_image("Graphics/powerup.png", (27, 27))
+    WALL_IMAGE_3 = assets.load_image("Graphics/wall3.png")
+    WALL_IMAGE_4 = assets.load_image("Graphics/wall4.png")
+    WALL_IMAGE_5 = assets.load_image("Graphics/wall5.png")
+    WALL_IMAGE_6 = assets.load_image("Graphics/wall6.png")
+    WALL_IMAGE_7 = assets.load_image("Graphics/wall7.png")
+    WALL_IMAGE_8 = assets.load_image("Graphics/wall8.png")
+    WALL_IMAGE_10 = assets.load_image("Graphics/wall10.png")
+    WALL_IMAGE_11 = assets.load_image("Graphics/wall11.png")
+    WALL_IMAGE_12 = assets.load_image("Graphics/wall12.png")
+    WALL_IMAGE_13 = assets.load_image("Graphics/wall13.png")
 
     def __init__(self, x, y, tile_type):
         """
@@ -52,9 +54,7 @@ class MapTile(pygame.sprite.Sprite):
         """
         super().__init__()
         self.tile_type = tile_type
-        image_surf = self.load_image()
-        image_surf = pygame.transform.scale(image_surf, (27, 27))
-        self.image = image_surf
+        self.image = self.scaled_image()
         self.rect = self.image.get_rect(center = (x,y))
 
     def load_image(self):
@@ -91,8 +91,17 @@ class MapTile(pygame.sprite.Sprite):
         image = image_mapping.get(self.tile_type, pygame.Surface((27, 27)))
         return image
 
+    def scaled_image(self):
+        """
+        Loads the image of the tile type, scaled to the size of a tile.
+
+        Returns:
+            pygame.Surface: Image representing the tile.
+        """
+        return pygame.transform.scale(self.load_image(), (27, 27))
+
     def update(self):
         """
         Updates the image of the MapTile.
         """
-        self.image = self.load_image()
+        self.image = self.scaled_image()
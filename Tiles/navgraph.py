@@ -0,0 +1,296 @@
+"""
+Pacman Navigation Graph Module
+
+This module defines the JunctionGraph class, which compresses the walkable tiles of the board
+into a graph of junctions linked by corridors. Each corridor is stored once as the list of tiles
+it covers, so a search only visits the junctions and the paths it returns are still tile by tile.
+The left and right edges of the board are connected, matching the teleport at the sides.
+
+Attributes:
+- GRAPH_CACHE_SIZE (int): Number of boards whose graphs are kept by graph_for_board.
+
+Classes:
+- JunctionGraph: Junctions and weighted corridor edges of a board, with a shortest path search.
+
+Functions:
+- graph_for_board(simple_board): Returns the JunctionGraph of a board, cached for recently used boards.
+- forget_graph(key, board_ref): Drops the cached graph of a board once the board is freed.
+- find_path(simple_board, start, target): Finds the shortest path between two tiles of a board.
+"""
+from collections import OrderedDict
+from functools import partial
+from threading import Lock
+import heapq
+import weakref
+
+GRAPH_CACHE_SIZE = 8
+_graph_cache = OrderedDict()
+_graph_lock = Lock()
+
+class JunctionGraph():
+    """
+    A graph of the junctions of the board linked by corridor edges.
+
+    A junction is a walkable tile that doesn't have exactly two walkable neighbors. Every other
+    walkable tile lies on exactly one corridor.
+
+    Attributes:
+    - width (int): Number of columns of the board.
+    - height (int): Number of rows of the board.
+    - nodes (set): The junction tiles.
+    - edges (list): The corridors, each a list of tiles from one junction to another, both included.
+    - adjacency (dict): For every junction, a list of (edge index, forward) pairs of corridors leaving it.
+    - corridor_of (dict): For every tile that is not a junction, its (edge index, position in the edge).
+    """
+    def __init__(self, simple_board):
+        """
+        Build the graph from the simplified board.
+
+        Parameters:
+        - simple_board (numpy.ndarray): 2D array indexed by (x, y) - 0s for walls, 1s for paths.
+        """
+        self.width, self.height = simple_board.shape
+        self.walkable = {(int(x), int(y)) for x, y in zip(*simple_board.nonzero())}
+        self.nodes = {tile for tile in self.walkable if len(self.neighbors(tile)) != 2}
+        self.edges = []
+        self.adjacency = {}
+        self.corridor_of = {}
+        self.create_edges()
+
+    def neighbors(self, tile):
+        """
+        Get the walkable neighbors of a tile, including the ones across the teleport.
+
+        Parameters:
+        - tile (tuple): The tile position (x, y).
+
+        Returns:
+        - list: The walkable neighboring tiles.
+        """
+        x, y = tile
+        candidates = [(x, y + 1), (x, y - 1), ((x + 1) % self.width, y), ((x - 1) % self.width, y)]
+        return [neighbor for neighbor in candidates if neighbor in self.walkable and neighbor != tile]
+
+    def create_edges(self):
+        """
+        Walk every corridor from its junctions and store it as an edge.
+
+        Returns:
+        None
+        """
+        for node in list(self.nodes):
+            self.adjacency.setdefault(node, [])
+        pending = sorted(self.nodes)
+        while True:
+            for node in pending:
+                for neighbor in self.neighbors(node):
+                    if neighbor not in self.nodes and neighbor in self.corridor_of:
+                        continue
+                    self.walk_corridor(node, neighbor)
+            # Loops without any junction on them get one of their tiles promoted to a junction
+            loose = sorted(self.walkable - self.nodes - set(self.corridor_of))
+            if not loose:
+                break
+            self.nodes.add(loose[0])
+            self.adjacency[loose[0]] = []
+            pending = [loose[0]]
+
+    def walk_corridor(self, start, first):
+        """
+        Follow a corridor from a junction until the next junction and store it as an edge.
+
+        Parameters:
+        - start (tuple): The junction the corridor starts at.
+        - first (tuple): The first tile of the corridor after the junction.
+
+        Returns:
+        None
+        """
+        tiles = [start, first]
+        while tiles[-1] not in self.nodes:
+            previous, current = tiles[-2], tiles[-1]
+            tiles.append(next(tile for tile in self.neighbors(current) if tile != previous))
+        end = tiles[-1]
+        # Corridors between two junctions are found from both ends, keep only one copy of them
+        if first in self.nodes and start >= end:
+            return
+        index = len(self.edges)
+        self.edges.append(tiles)
+        for position, tile in enumerate(tiles[1:-1], start=1):
+            self.corridor_of[tile] = (index, position)
+        self.adjacency[start].append((index, True))
+        if end != start or len(tiles) > 2:
+            self.adjacency[end].append((index, False))
+
+    def exits(self, tile):
+        """
+        Get the junctions reachable from a tile without passing any other junction.
+
+        Parameters:
+        - tile (tuple): The tile position (x, y).
+
+        Returns:
+        - list: (junction, distance, tiles) tuples, where tiles lead from the tile to the junction, excluding the tile.
+        """
+        if tile in self.nodes:
+            return [(tile, 0, [])]
+        index, position = self.corridor_of[tile]
+        tiles = self.edges[index]
+        return [(tiles[0], position, tiles[position - 1::-1]), (tiles[-1], len(tiles) - 1 - position, tiles[position + 1:])]
+
+    def corridor_path(self, start, target):
+        """
+        Find the path between two tiles of the same corridor that doesn't pass any junction.
+
+        Parameters:
+        - start (tuple): The starting tile.
+        - target (tuple): The target tile.
+
+        Returns:
+        - list or None: The tiles from start to target, excluding start, or None if the tiles aren't on the same corridor.
+        """
+        if start not in self.corridor_of or target not in self.corridor_of:
+            return None
+        index, start_position = self.corridor_of[start]
+        target_index, target_position = self.corridor_of[target]
+        if index != target_index:
+            return None
+        tiles = self.edges[index]
+        if start_position < target_position:
+            return tiles[start_position + 1:target_position + 1]
+        return tiles[target_position:start_position][::-1]
+
+    def entries(self, target):
+        """
+        Get the junctions a tile can be reached from without passing any other junction.
+
+        Parameters:
+        - target (tuple): The tile position (x, y).
+
+        Returns:
+        - dict: For every junction, the distance to the tile and the tiles leading to it, excluding the junction.
+        """
+        entries = {}
+        for node, distance, tiles in self.exits(target):
+            # The tiles lead from the target to the junction, reverse them to lead from the junction to the target
+            if node not in entries or distance < entries[node][0]:
+                entries[node] = (distance, tiles[-2::-1] + [target] if tiles else [])
+        return entries
+
+    def find_path(self, start, target):
+        """
+        Find the shortest path between two tiles with Dijkstra's algorithm over the junctions.
+
+        Parameters:
+        - start (tuple): The starting tile.
+        - target (tuple): The target tile.
+
+        Returns:
+        - list or None: The tiles from start to target, excluding start, or None if no path is found.
+        """
+        if start not in self.walkable or target not in self.walkable:
+            return None
+        if start == target:
+            return []
+
+        # Both tiles may lie on the same corridor, so the path doesn't have to touch any junction at all
+        best_path = self.corridor_path(start, target)
+        target_entries = self.entries(target)
+        distances = {}
+        previous = {}
+        queue = []
+        for node, distance, tiles in self.exits(start):
+            if node not in distances or distance < distances[node]:
+                distances[node] = distance
+                previous[node] = (None, tiles)
+                heapq.heappush(queue, (distance, node))
+
+        while queue:
+            distance, node = heapq.heappop(queue)
+            if best_path is not None and distance >= len(best_path):
+                break
+            if distance > distances[node]:
+                continue
+            if node in target_entries and (best_path is None or distance + target_entries[node][0] < len(best_path)):
+                best_path = self.expand(previous, node) + target_entries[node][1]
+            for index, forward in self.adjacency[node]:
+                tiles = self.edges[index] if forward else self.edges[index][::-1]
+                new_distance = distance + len(tiles) - 1
+                if tiles[-1] not in distances or new_distance < distances[tiles[-1]]:
+                    distances[tiles[-1]] = new_distance
+                    previous[tiles[-1]] = (node, tiles[1:])
+                    heapq.heappush(queue, (new_distance, tiles[-1]))
+        return best_path
+
+    @staticmethod
+    def expand(previous, node):
+        """
+        Turn the chain of junctions found by the search back into a list of tiles.
+
+        Parameters:
+        - previous (dict): For every reached junction, the junction before it and the tiles in between.
+        - node (tuple): The last junction of the path.
+
+        Returns:
+        - list: The tiles from the start to the junction, excluding the start.
+        """
+        parts = []
+        while node is not None:
+            node, tiles = previous[node]
+            parts.append(tiles)
+        return [tile for tiles in reversed(parts) for tile in tiles]
+
+def graph_for_board(simple_board):
+    """
+    Return the JunctionGraph of a board. The graphs of the last GRAPH_CACHE_SIZE boards are cached
+    by the identity of the board array, so boards must not be changed in place once searched.
+
+    Parameters:
+    - simple_board (numpy.ndarray): 2D array indexed by (x, y) - 0s for walls, 1s for paths.
+
+    Returns:
+    - JunctionGraph: The graph of the board.
+    """
+    key = id(simple_board)
+    with _graph_lock:
+        entry = _graph_cache.get(key)
+        # The weak reference tells a cached board apart from a new one that got the same id
+        if entry is not None and entry[0]() is simple_board:
+            _graph_cache.move_to_end(key)
+            return entry[1]
+    graph = JunctionGraph(simple_board)
+    with _graph_lock:
+        _graph_cache[key] = (weakref.ref(simple_board, partial(forget_graph, key)), graph)
+        _graph_cache.move_to_end(key)
+        while len(_graph_cache) > GRAPH_CACHE_SIZE:
+            _graph_cache.popitem(last=False)
+    return graph
+
+def forget_graph(key, board_ref):
+    """
+    Drop the cached graph of a board once the board is freed, so the graphs of the boards of past
+    levels don't stay in the cache until newer boards push them out.
+
+    Parameters:
+    - key (int): The key of the board in the cache.
+    - board_ref (weakref.ref): The dead reference to the board.
+    """
+    # Called while the board is freed, maybe on a thread holding the lock, so the entry is dropped
+    # without it. Only this board's entry goes, its id can't have been reused yet.
+    entry = _graph_cache.get(key)
+    if entry is not None and entry[0] is board_ref:
+        _graph_cache.pop(key, None)
+
+def find_path(simple_board, start, target):
+    """
+    Find the shortest path between two tiles of a board, teleport included.
+
+    Parameters:
+    - simple_board (numpy.ndarray): 2D array indexed by (x, y) - 0s for walls, 1s for paths.
+    - start (tuple): The starting tile.
+    - target (tuple): The target tile.
+
+    Returns:
+    - list or None: The tiles from start to target, excluding start, or None if no path is found.
+    """
+    return graph_for_board(simple_board).find_path(start, target)
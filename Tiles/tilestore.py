@@ -0,0 +1,393 @@
+"""
+Tile Store Module
+
+This module keeps the tiles of the map in one typed array instead of one MapTile sprite per cell.
+A cell is a single uint8 tile type; the images are shared, one scaled surface per tile type. The
+map's tile groups become TileLayer objects, which answer collisions by looking up the cells under
+a rectangle and draw the cells with the shared images. A TileView sprite is only created when a
+caller asks for the tiles of a layer, and it reads and writes its type in the array.
+
+Compare the memory per cell of both layouts for the game's board with:
+    python -m Tiles.map
+
+Attributes:
+    TILE_SIZE (int): The size of a tile, in pixels.
+    FLOOR, WALL, DOOR (str): The names of the layers of a store.
+
+Classes:
+    TileStore: The tile types of the map in a typed array.
+        - layer: Returns the layer of the store with the given name.
+        - reset: Puts back the coins and power-ups.
+        - draw: Draws every cell with the image of its type.
+
+    TileLayer: The cells of a store with some tile types, standing in for a sprite group.
+        - collides: Tells whether a rectangle overlaps a cell of the layer.
+        - collide: Returns views of the cells of the layer a rectangle overlaps.
+        - sprites: Returns views of all the cells of the layer.
+        - draw: Draws the cells of the layer.
+
+    TileView (pygame.sprite.Sprite): A sprite for one cell of a store, created on demand.
+
+    BoardLayer: The drawn board of a store, kept on a surface and patched where the types changed.
+        - bake: Draws every cell on the layer's surface.
+        - draw: Draws the changed cells again, then the layer on a surface.
+
+Functions:
+    tile_image: Returns the shared image of a tile type.
+    collide_any: Tells whether a sprite overlaps a sprite group or a tile layer.
+    sprite_groups: Creates one MapTile sprite per cell, in floor, wall and door groups, as the map used to.
+    memory_report: Measures the bytes per cell of MapTile sprites and of a tile store.
+"""
+import tracemalloc
+import numpy as np
+import pygame
+from Tiles.maptile import MapTile
+
+TILE_SIZE = 27
+FLOOR, WALL, DOOR = 'floor', 'wall', 'door'
+
+# The scaled image of every tile type, shared by all the cells of that type
+_images = {}
+
+def tile_image(tile_type):
+    """
+    Returns the shared image of a tile type, scaled to the size of a tile like MapTile does.
+
+    Parameters:
+        - tile_type (int): The tile type.
+
+    Returns:
+        - pygame.Surface: The image. It must not be drawn on, every cell of the type shows it.
+    """
+    tile_type = int(tile_type)
+    if tile_type not in _images:
+        _images[tile_type] = MapTile(0, 0, tile_type).image
+    return _images[tile_type]
+
+def collide_any(sprite, group):
+    """
+    Tells whether a sprite overlaps a sprite of a group, like pygame.sprite.spritecollideany, or a
+    cell of a tile layer, without creating any view.
+
+    Parameters:
+        - sprite (pygame.sprite.Sprite): The sprite.
+        - group (pygame.sprite.Group or TileLayer): The sprites or cells to test.
+
+    Returns:
+        - bool: True if they overlap.
+    """
+    if isinstance(group, TileLayer):
+        return group.collides(sprite.rect)
+    return pygame.sprite.spritecollideany(sprite, group) is not None
+
+class TileView(pygame.sprite.Sprite):
+    """
+    A sprite for one cell of a store, with the attributes of a MapTile. Its type lives in the
+    store, so changing it changes the map, and its image is the shared image of its type.
+
+    Attributes:
+        - store (TileStore): The store of the cell.
+        - cell (tuple): The (x, y) of the cell on the board.
+        - rect (pygame.Rect): The rectangle of the cell on the screen.
+    """
+    def __init__(self, store, x, y):
+        """
+        Initializes a view of a cell.
+
+        Parameters:
+            - store (TileStore): The store of the cell.
+            - x (int): The x coordinate of the cell on the board.
+            - y (int): The y coordinate of the cell on the board.
+        """
+        super().__init__()
+        self.store = store
+        self.cell = (x, y)
+        self.rect = pygame.Rect(x * TILE_SIZE - 13, y * TILE_SIZE - 13, TILE_SIZE, TILE_SIZE)
+
+    @property
+    def tile_type(self):
+        """
+        The type of the cell, read from and written to the store.
+        """
+        return int(self.store.types[self.cell])
+
+    @tile_type.setter
+    def tile_type(self, tile_type):
+        self.store.types[self.cell] = tile_type
+
+    @property
+    def image(self):
+        """
+        The shared image of the cell's type.
+        """
+        return tile_image(self.tile_type)
+
+    def update(self, *args, **kwargs):
+        """
+        Kept for the MapTile interface. The image always follows the type.
+        """
+
+class TileLayer():
+    """
+    The cells of a store with some tile types. It stands in for the sprite groups of the map:
+    collisions are answered from the array, and views are only created for the cells returned.
+
+    Attributes:
+        - store (TileStore): The store of the cells.
+        - member (numpy.ndarray): Whether each tile type belongs to the layer, indexed by type.
+    """
+    def __init__(self, store, tile_types):
+        """
+        Initializes a layer.
+
+        Parameters:
+            - store (TileStore): The store of the cells.
+            - tile_types (iterable): The tile types in the layer.
+        """
+        self.store = store
+        self.member = np.zeros(256, dtype=np.bool_)
+        self.member[list(tile_types)] = True
+
+    def covered(self, rect):
+        """
+        Returns the cells of the layer a rectangle overlaps.
+
+        Parameters:
+            - rect (pygame.Rect): The rectangle.
+
+        Returns:
+            - numpy.ndarray: The (x, y) of the cells, one row each, in the order of the rows of the board.
+        """
+        width, height = self.store.types.shape
+        # Cell i spans [27 * i - 13, 27 * i + 14), so it overlaps [left, right) when 27 * i - 13 < right and left < 27 * i + 14
+        first_x, last_x = max(-((13 - rect.left) // TILE_SIZE), 0), min((rect.right + 12) // TILE_SIZE, width - 1)
+        first_y, last_y = max(-((13 - rect.top) // TILE_SIZE), 0), min((rect.bottom + 12) // TILE_SIZE, height - 1)
+        if first_x > last_x or first_y > last_y or rect.width <= 0 or rect.height <= 0:
+            return np.empty((0, 2), dtype=np.intp)
+        cells = self.member[self.store.types[first_x:last_x + 1, first_y:last_y + 1]]
+        ys, xs = np.nonzero(cells.T)
+        return np.column_stack((xs + first_x, ys + first_y))
+
+    def collides(self, rect):
+        """
+        Tells whether a rectangle overlaps a cell of the layer.
+
+        Parameters:
+            - rect (pygame.Rect): The rectangle.
+
+        Returns:
+            - bool: True if they overlap.
+        """
+        return len(self.covered(rect)) > 0
+
+    def collide(self, rect):
+        """
+        Returns views of the cells of the layer a rectangle overlaps, like pygame.sprite.spritecollide.
+
+        Parameters:
+            - rect (pygame.Rect): The rectangle.
+
+        Returns:
+            - list: The TileView of every overlapped cell, in the order of the rows of the board.
+        """
+        return [TileView(self.store, x, y) for x, y in self.covered(rect).tolist()]
+
+    def cells(self):
+        """
+        Returns the cells of the layer.
+
+        Returns:
+            - numpy.ndarray: The (x, y) of the cells, one row each, in the order of the rows of the board.
+        """
+        ys, xs = np.nonzero(self.member[self.store.types].T)
+        return np.column_stack((xs, ys))
+
+    def sprites(self):
+        """
+        Returns views of all the cells of the layer, like pygame.sprite.Group.sprites.
+
+        Returns:
+            - list: The TileView of every cell.
+        """
+        return [TileView(self.store, x, y) for x, y in self.cells().tolist()]
+
+    def __iter__(self):
+        return iter(self.sprites())
+
+    def __len__(self):
+        return int(np.count_nonzero(self.member[self.store.types]))
+
+    def draw(self, surface):
+        """
+        Draws the cells of the layer with the images of their types.
+
+        Parameters:
+            - surface (pygame.Surface): The surface to draw on.
+        """
+        types = self.store.types
+        surface.blits([(tile_image(types[x, y]), (x * TILE_SIZE - 13, y * TILE_SIZE - 13)) for x, y in self.cells().tolist()], doreturn=False)
+
+class TileStore():
+    """
+    The tile types of the map in a typed array, indexed by (x, y) like the other boards.
+
+    Attributes:
+        - types (numpy.ndarray): The current type of every cell. Eaten coins and power-ups are 0.
+        - start (numpy.ndarray): The types at the start of a game.
+        - layers (dict): The floor, wall and door layers of the store.
+    """
+    def __init__(self, board):
+        """
+        Initializes a store for a board.
+
+        Parameters:
+            - board (list): The tile types, one list per row.
+        """
+        self.start = np.transpose(np.array(board)).astype(np.uint8)
+        self.start.flags.writeable = False
+        self.types = self.start.copy()
+        self.layers = {
+            FLOOR: TileLayer(self, range(3)),
+            WALL: TileLayer(self, (value for value in range(3, 256) if value != 9)),
+            DOOR: TileLayer(self, (9,)),
+        }
+
+    def layer(self, name):
+        """
+        Returns the layer of the store with the given name.
+
+        Parameters:
+            - name (str): FLOOR, WALL or DOOR.
+
+        Returns:
+            - TileLayer: The layer.
+        """
+        return self.layers[name]
+
+    def reset(self):
+        """
+        Puts back the coins and power-ups, in place so the views and the boards sharing the array see it.
+        """
+        self.types[:] = self.start
+
+    def draw(self, surface):
+        """
+        Draws every cell with the image of its type, floor first, then the walls and the door.
+
+        Parameters:
+            - surface (pygame.Surface): The surface to draw on.
+        """
+        for name in (FLOOR, WALL, DOOR):
+            self.layers[name].draw(surface)
+
+class BoardLayer():
+    """
+    The drawn board of a store, kept on a surface. Drawing it again only draws the cells whose type
+    changed since, e.g. an eaten coin, then blits the whole layer at once, which is much cheaper
+    than drawing every cell. The pixels are the same as TileStore.draw on a black surface.
+
+    Attributes:
+        - store (TileStore): The store drawn.
+        - surface (pygame.Surface): The drawn board, or None before it is baked.
+        - drawn (numpy.ndarray): The types the surface shows, indexed by (x, y).
+    """
+    def __init__(self, store):
+        """
+        Initializes a layer for a store, without drawing it yet.
+
+        Parameters:
+            - store (TileStore): The store to draw.
+        """
+        self.store = store
+        self.surface = None
+        self.drawn = None
+
+    def bake(self):
+        """
+        Draws every cell on the layer's surface. Needs no display, so it can run on a background thread.
+
+        Returns:
+            - pygame.Surface: The drawn board.
+        """
+        width, height = self.store.types.shape
+        surface = pygame.Surface((width * TILE_SIZE - 13, height * TILE_SIZE - 13))
+        surface.fill('black')
+        self.store.draw(surface)
+        self.drawn = self.store.types.copy()
+        self.surface = surface
+        return surface
+
+    def draw(self, surface):
+        """
+        Draws the cells whose type changed on the layer, baking it first if needed, then the layer on a surface.
+
+        Parameters:
+            - surface (pygame.Surface): The surface to draw on.
+        """
+        if self.surface is None:
+            self.bake()
+        types = self.store.types
+        for x, y in np.argwhere(types != self.drawn).tolist():
+            rect = pygame.Rect(x * TILE_SIZE - 13, y * TILE_SIZE - 13, TILE_SIZE, TILE_SIZE)
+            self.surface.fill('black', rect)
+            self.surface.blit(tile_image(types[x, y]), rect)
+            self.drawn[x, y] = types[x, y]
+        surface.blit(self.surface, (0, 0))
+
+def surface_bytes(surface):
+    """
+    Returns the bytes of the pixels of a surface.
+
+    Parameters:
+        - surface (pygame.Surface): The surface.
+
+    Returns:
+        - int: The number of bytes.
+    """
+    return surface.get_bytesize() * surface.get_width() * surface.get_height()
+
+def sprite_groups(board):
+    """
+    Creates one MapTile sprite per cell, in floor, wall and door groups, as the map used to.
+    Kept as the reference for the layers.
+
+    Parameters:
+        - board (list): The tile types, one list per row.
+
+    Returns:
+        - dict: The pygame.sprite.Group of every layer name.
+    """
+    groups = {FLOOR: pygame.sprite.Group(), WALL: pygame.sprite.Group(), DOOR: pygame.sprite.Group()}
+    for i, row in enumerate(board):
+        for j, tile_type in enumerate(row):
+            groups[FLOOR if tile_type < 3 else DOOR if tile_type == 9 else WALL].add(MapTile(j * TILE_SIZE, i * TILE_SIZE, tile_type))
+    return groups
+
+def memory_report(board):
+    """
+    Measures the bytes per cell of a board held as one MapTile sprite per cell, in three groups,
+    and held in a TileStore. Python objects are measured with tracemalloc, pixels from the surfaces.
+
+    Parameters:
+        - board (list): The tile types, one list per row.
+
+    Returns:
+        - dict: The number of cells, and the bytes per cell of the sprites and of the store.
+    """
+    cells = sum(len(row) for row in board)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    groups = sprite_groups(board)
+    sprite_bytes = tracemalloc.get_traced_memory()[0] - before
+    sprite_bytes += sum(surface_bytes(tile.image) for group in groups.values() for tile in group)
+    before = tracemalloc.get_traced_memory()[0]
+    store = TileStore(board)
+    store_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    store_bytes += sum(surface_bytes(tile_image(tile_type)) for tile_type in np.unique(store.start))
+    return {
+        'cells': cells,
+        'sprite_bytes_per_cell': sprite_bytes / cells,
+        'store_bytes_per_cell': store_bytes / cells,
+        'array_bytes_per_cell': store.types.nbytes / cells,
+    }
@@ -7,11 +7,13 @@ functions for rendering win and lose messages.
 
 Classes:
 - Game: Manages the main game loop, player input, and game state.
+- GameFactory: Creates games that reuse the loaded music, map and Pacman frames.
 - Pacman: Represents the player-controlled character.
 - Pinky, Blinky, Inky, Clyde: Subclasses of Ghost representing different ghost characters.
 - Map: Represents the game map and tiles.
 
 Functions:
+- load_music(): Loads the four music tracks of the game.
 - win_render(screen): Renders a victory message on the screen.
 - lose_render(screen): Renders a defeat message on the screen.
 
@@ -19,14 +21,75 @@ Usage:
 This module is intended to be run as the main script to start the Pacman game.
 """
 from math import inf
+import asyncio
 import sys
 import pygame
 from Players.pacman import Pacman
 from Players.ghost import Pinky, Blinky, Inky, Clyde
+from Players.pathworker import PathWorker
+from Players.controller import GameView, ControllerHarness
+from Players.inputbuffer import InputBuffer
 from Tiles.map import Map
 from Tiles.map import apply_effect_to_tile
+from Engine.levels import LEVELS, LevelLoader
+from Engine.timers import TimerWheel, TICKS_PER_SECOND
+from Engine.pacing import FramePacer, KEY_POLL_S
+from GUI.idle import IdleScheduler
+from GUI.assets import load_sound
+from Telemetry.events import EventBus, GHOST_EATEN, PACMAN_DEATH, MODE_CHANGE, LEVEL
+from Telemetry.profiler import FrameProfiler
+
+def load_music():
+    """
+    Loads the four music tracks of the game.
+
+    Returns:
+    - list: The closest, mid, far and vulnerable tracks, in this order.
+    """
+    pygame.mixer.init()
+    return [load_sound(f'Music/Pacman_{name}.mp3') for name in ('closest', 'mid', 'far', 'vulnerable')]
+
+class GameFactory():
+    """
+    Creates games that share what is expensive to load: the decoded music, the map with its scaled
+    tiles and Pacman's frames. A new game only resets the coins, positions, timers and lives, so
+    a game must be over before the next one is created.
+
+    Attributes:
+    - music: The loaded music tracks.
+    - map: Instance of the Map class shared by the games.
+    - player: Instance of the Pacman class shared by the games.
 
-class Game():
+    Methods:
+    - reset(): Puts back the coins and Pacman's start position, score and lives.
+    - new_game(controller): Resets the shared state and returns a new game.
+    """
+    def __init__(self):
+        self.music = load_music()
+        self.map = Map()
+        self.player = Pacman()
+
+    def reset(self):
+        """
+        Puts back the coins and Pacman's start position, score and lives.
+        """
+        self.map.reset()
+        self.player.reset()
+
+    def new_game(self, controller=None):
+        """
+        Resets the shared state and returns a new game.
+
+        Parameters:
+        - controller: Controller or ControllerHarness driving Pacman. Defaults to the keyboard.
+
+        Returns:
+        - Game: The new game.
+        """
+        self.reset()
+        return Game(controller, self)
+
+class Game(): # pylint: disable=too-many-instance-attributes
     """
     Class representing the main game logic and loop.
 
@@ -37,34 +100,90 @@ class Game():
     - vulnerable_timer: Countdown timer for the vulnerable state.
     - remaining_coins: Number of coins remaining in the game.
     - ghosts: List containing instances of Ghosts (Pinky, Blinky, Inky, Clyde).
+    - path_worker: Instance of the PathWorker class running the ghosts' path searches.
+    - controller: Instance of the ControllerHarness class running the controller that drives Pacman.
+    - observers: Objects whose on_tick(game, tick) method is called after every tick, e.g. a SpectatorServer.
+    - events: Instance of the EventBus class recording coins, power-ups, ghost kills, deaths, mode changes and turns.
+    - profiler: Instance of the FrameProfiler class, started with F9 or the PACMAN_PROFILE environment variable.
+    - level: The Level being played, whose settings apply to the ghosts and the frightened time.
+    - level_index: The index of the level being played in the level sequence.
+    - level_loader: Instance of the LevelLoader class building the next level in the background.
+    - frightened_time: The seconds a power-up frightens the ghosts for.
+    - timers: Instance of the TimerWheel class running the game's timers on ticks, advanced by effects.
+    - countdown: The TimerHandle counting the frightened timer down, or None outside frightened mode.
 
     Methods:
     - run_game(screen, clock): Main game loop that handles user input, updates game state, and renders the game.
-    - effects(last_time, ghost_group): Handles collision effects, power-ups, and updates timers.
+    - run_game_async(screen, pacer, hooks): The game loop as a coroutine, running hooks and other tasks between frames.
+    - start_loop(): Prepares the game loop.
+    - play_frame(screen, pacman, ghost, tick): Plays a frame and tells whether the game is over.
+    - end_loop(pacman): Stops what the game loop started.
+    - effects(ghost_group): Handles collision effects, power-ups, and advances the timers by a tick.
+    - start_countdown(): Starts counting the frightened timer down, once a second of ticks.
+    - count_down(): Counts the frightened timer down by a second.
+    - end_frightened(): Ends frightened mode.
+    - next_level(): Starts the next level of the sequence, once the board is cleared.
     - closest_ghost_distance(self): Calculates distance between Pacman and the closest ghost.
     - choose_music(self): Changes the song based on the ghost and Pacman distance.
     - update_players(pacman_icon_idx): Updates player and ghosts based on the game state.
     - draw_elements(screen, pacman, ghost): Renders the game elements on the screen.
     - render_text(screen): Renders text displaying score, remaining coins, frightened timer, and lives.
+    - win_render(screen), lose_render(screen): Render the result and wait for a key press.
+    - render_result(screen, text): Renders the result of the game.
+    - wait_for_key(): Waits for a key press.
+    - key_pressed(events): Looks for a key press among events.
     """
-    def __init__(self):
-        pygame.mixer.init()
-        MUSIC_CLOSEST = pygame.mixer.Sound('Music/Pacman_closest.mp3')
-        MUSIC_MID = pygame.mixer.Sound('Music/Pacman_mid.mp3')
-        MUSIC_FAR = pygame.mixer.Sound('Music/Pacman_far.mp3')
-        MUSIC_VULNERABLE = pygame.mixer.Sound('Music/Pacman_vulnerable.mp3')
-        self.music = [MUSIC_CLOSEST, MUSIC_MID, MUSIC_FAR, MUSIC_VULNERABLE]
+    def __init__(self, controller=None, factory=None, levels=LEVELS):
+        """
+        Initializes a new game.
+
+        Parameters:
+        - controller: Controller or ControllerHarness driving Pacman. Defaults to the keyboard, through an InputBuffer.
+        - factory: GameFactory whose loaded music, map and Pacman are reused. Use GameFactory.new_game,
+          which resets them first. Without a factory everything is loaded anew.
+        - levels: The levels of the game, in order. The map of the first one is the loaded map.
+        """
+        if factory is None:
+            self.music = load_music()
+            self.player = Pacman()
+            self.map = Map()
+        else:
+            self.music = factory.music
+            self.player = factory.player
+            self.map = factory.map
         for track in self.music:
             track.play(-1)
+        MUSIC_CLOSEST, MUSIC_MID, MUSIC_FAR, MUSIC_VULNERABLE = self.music
         MUSIC_CLOSEST.set_volume(0)
+        MUSIC_MID.set_volume(1)
         MUSIC_FAR.set_volume(0)
         MUSIC_VULNERABLE.set_volume(0)
-        self.player = Pacman()
-        self.map = Map()
         self.vulnerable_mode = False
         self.vulnerable_timer = 0
         self.remaining_coins = 242
         self.ghosts = [Pinky(), Blinky(), Inky(), Clyde()]
+        self.path_worker = PathWorker.for_board(self.map.simple_board)
+        for tmp_ghost in self.ghosts:
+            tmp_ghost.path_worker = self.path_worker
+            tmp_ghost.move_table = self.map.move_table
+        self.observers = []
+        if controller is None:
+            # The keyboard's turns are buffered until legal, and their latency measured once they show
+            controller = InputBuffer()
+            self.observers.append(controller)
+        if not isinstance(controller, ControllerHarness):
+            # A late key press is still applied, only measured as an overrun
+            controller = ControllerHarness(controller, drop_late=not isinstance(controller, InputBuffer))
+        self.controller = controller
+        self.events = EventBus()
+        self.profiler = FrameProfiler.from_environment()
+        self.level_loader = LevelLoader(levels)
+        self.level_index = 0
+        self.level = self.level_loader.levels[0]
+        self.frightened_time = self.level.frightened_time
+        self.level.apply(self)
+        self.timers = TimerWheel()
+        self.countdown = None
 
     def run_game(self, screen, clock):
         """
@@ -73,60 +192,147 @@ class Game():
         Parameters:
         - screen: Pygame display surface.
         - clock: Pygame Clock object.
+
+        Returns:
+        - bool: True if the game was won.
+        """
+        pacman, ghost = self.start_loop()
+        tick = 0
+        # Game Loop
+        while (win := self.play_frame(screen, pacman, ghost, tick)) is None:
+            clock.tick(60)
+            tick += 1
+        self.end_loop(pacman)
+
+        if win:
+            self.win_render(screen)
+            return True
+        self.lose_render(screen)
+        return False
+
+    async def run_game_async(self, screen, pacer=None, hooks=()):
+        """
+        The game loop of run_game as a coroutine of an asyncio event loop. Instead of blocking in
+        clock.tick until the next frame, it awaits a FramePacer, so the other tasks of the event
+        loop run in the rest of every frame. The end screen doesn't block either.
+
+        Every hook is a coroutine function, called as hook(game, tick) after every frame and run
+        between the frames. A hook still running from an earlier frame isn't called again, so a slow
+        one skips frames rather than piling up, and it is cancelled when the game ends. An error in a
+        hook ends the game loop.
+
+        Parameters:
+        - screen: Pygame display surface.
+        - pacer: FramePacer pacing the frames. Defaults to one at 60 frames per second.
+        - hooks: Coroutine functions run between the frames.
+
+        Returns:
+        - bool: True if the game was won.
+        """
+        pacer = FramePacer() if pacer is None else pacer
+        pacman, ghost = self.start_loop()
+        running = {}
+        tick = 0
+        try:
+            while (win := self.play_frame(screen, pacman, ghost, tick)) is None:
+                for hook in hooks:
+                    task = running.get(hook)
+                    if task is None or task.done():
+                        if task is not None:
+                            # Raises the error of the hook, if it had one
+                            task.result()
+                        running[hook] = asyncio.ensure_future(hook(self, tick))
+                await pacer.wait()
+                tick += 1
+        finally:
+            for task in running.values():
+                task.cancel()
+        self.end_loop(pacman)
+
+        self.render_result(screen, "YOU WON!" if win else "YOU LOST!")
+        while not self.key_pressed(pygame.event.get()):
+            await asyncio.sleep(KEY_POLL_S)
+        return win
+
+    def start_loop(self):
+        """
+        Prepares the game loop: groups the sprites, and starts building the next level.
+
+        Returns:
+        - tuple: The Pacman GroupSingle and the ghosts' Group.
         """
         pacman = pygame.sprite.GroupSingle()
         pacman.add(self.player)
         ghost = pygame.sprite.Group()
         ghost.add(self.ghosts)
+        # The next level is built while this one is played
+        self.level_loader.prepare(self.level_index + 1)
+        return pacman, ghost
 
-        last_time = pygame.time.get_ticks()
-        pacman_icon_idx = 0
-        win = False
-
-        # Game Loop
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                self.player.change_direction(event)
-
-            self.update_players(pacman_icon_idx)
-            last_time = self.effects(last_time, ghost)
-            self.draw_elements(screen, pacman, ghost)
-            self.choose_music()
-            pygame.display.update()
-            clock.tick(60)
-
-            if pacman_icon_idx < 19:
-                pacman_icon_idx += 1
-            else: pacman_icon_idx = 0
-
-            if self.remaining_coins == 0:
-                win = True
-                break
+    def play_frame(self, screen, pacman, ghost, tick):
+        """
+        Plays a frame: handles the events, updates and draws the game, then starts the next level
+        once the board is cleared.
 
-            if self.player.lives == 0:
-                break
+        Parameters:
+        - screen: Pygame display surface.
+        - pacman: Pygame sprite GroupSingle containing the Pacman instance.
+        - ghost: Pygame sprite Group containing the ghost instances.
+        - tick: The number of the frame.
 
+        Returns:
+        - bool or None: True once the game is won, False once it is lost, None while it goes on.
+        """
+        self.events.tick = tick
+        self.profiler.begin_frame(tick)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.profiler.close()
+                pygame.quit()
+                sys.exit()
+            self.profiler.handle_event(event)
+            self.controller.handle_event(event)
+
+        direction = self.controller.decide(GameView(self, tick))
+        if direction is not None:
+            self.player.direction = direction
+        self.update_players(tick % 20)
+        self.effects(ghost)
+        self.draw_elements(screen, pacman, ghost)
+        self.choose_music()
+        for observer in self.observers:
+            observer.on_tick(self, tick)
         pygame.display.update()
+        self.profiler.end_frame()
 
-        if win:
-            self.win_render(screen)
+        if self.remaining_coins == 0 and not self.next_level():
             return True
-        self.lose_render(screen)
-        return False
+        if self.player.lives == 0:
+            return False
+        return None
 
-    def effects(self, last_time, ghost_group):
+    def end_loop(self, pacman):
         """
-        Handles collision effects, power-ups, and updates timers.
+        Stops what the game loop started.
 
         Parameters:
-        - last_time: Last recorded time in milliseconds.
-        - ghost_group: Pygame sprite Group containing ghost instances.
+        - pacman: Pygame sprite GroupSingle containing the Pacman instance.
+        """
+        pygame.display.update()
+        # Pacman is shared by the games of a factory and would keep every game's group alive
+        pacman.empty()
+        self.level_loader.shutdown()
+        self.path_worker.shutdown()
+        self.controller.close()
+        self.profiler.close()
+
+    def effects(self, ghost_group):
+        """
+        Handles collision effects, power-ups, and advances the timers by a tick, which fires the
+        timers that are due, like the frightened countdown.
 
-        Returns:
-        - Updated last_time.
+        Parameters:
+        - ghost_group: Pygame sprite Group containing ghost instances.
         """
         collided_ghosts = pygame.sprite.spritecollide(self.player, ghost_group, False)
 
@@ -134,31 +340,81 @@ class Game():
             for ghost in collided_ghosts:
                 if ghost.freightened:
                     self.player.score += 100
+                    self.events.emit(GHOST_EATEN, ghost.rect.centerx // 27, ghost.rect.centery // 27, self.player.score)
                     ghost.respawn()
                 else:
+                    x, y = self.player.rect.centerx // 27, self.player.rect.centery // 27
                     self.player.respawn()
+                    self.events.emit(PACMAN_DEATH, x, y, self.player.lives)
 
         # Coins and Powerups picking
-        current_tile = pygame.sprite.spritecollide(self.player, self.map.tiles_board, False)
+        current_tile = self.map.tiles_board.collide(self.player.rect)
         for tile in current_tile:
             apply_effect_to_tile(tile, self.player, self, self.ghosts)
             tile.update()
 
-        current_time = pygame.time.get_ticks()
-        elapsed_time = current_time - last_time
+        self.timers.advance()
 
-        if elapsed_time >= 1000:
-            if self.vulnerable_mode:
-                self.vulnerable_timer -= 1
-                last_time = current_time
+    def start_countdown(self):
+        """
+        Starts counting the frightened timer down, once every second of ticks from now. A power-up
+        eaten in frightened mode starts the countdown again.
+        """
+        if self.countdown is not None:
+            self.countdown.cancel()
+        self.countdown = self.timers.schedule(TICKS_PER_SECOND, self.count_down, interval=TICKS_PER_SECOND)
 
-        if self.vulnerable_timer == 0:
-            self.vulnerable_mode = False
-            for tmp_ghost in self.ghosts:
-                tmp_ghost.freightened = False
-                tmp_ghost.speed = 1
+    def count_down(self):
+        """
+        Counts the frightened timer down by a second, and ends frightened mode at zero.
+        """
+        self.vulnerable_timer -= 1
+        if self.vulnerable_timer <= 0:
+            self.end_frightened()
 
-        return last_time
+    def end_frightened(self):
+        """
+        Ends frightened mode: the countdown stops and the ghosts get their speed back.
+        """
+        if self.countdown is not None:
+            self.countdown.cancel()
+            self.countdown = None
+        if self.vulnerable_mode:
+            self.events.emit(MODE_CHANGE, value=0)
+        self.vulnerable_mode = False
+        self.vulnerable_timer = 0
+        for tmp_ghost in self.ghosts:
+            tmp_ghost.freightened = False
+            tmp_ghost.speed = tmp_ghost.base_speed
+
+    def next_level(self):
+        """
+        Starts the next level of the sequence, once the board is cleared. The level was built in
+        the background while this one was played, so only references are swapped: the map, the
+        move table of the ghosts and the settings. Pacman and the ghosts go back to their starts,
+        keeping the score and lives, and the building of the level after it starts.
+
+        Returns:
+        - bool: False if this was the last level.
+        """
+        index = self.level_index + 1
+        if not self.level_loader.prepare(index):
+            return False
+        prepared = self.level_loader.take(index)
+        self.level_index = index
+        self.level = prepared.level
+        self.map = prepared.map
+        self.remaining_coins = prepared.coins
+        self.end_frightened()
+        self.player.rect.center = (15*27, 24*27)
+        self.player.direction = 0
+        for tmp_ghost in self.ghosts:
+            tmp_ghost.respawn()
+            tmp_ghost.move_table = self.map.move_table
+        self.level.apply(self)
+        self.events.emit(LEVEL, value=self.level.number)
+        self.level_loader.prepare(index + 1)
+        return True
 
     def closest_ghost_distance(self):
         """
@@ -210,7 +466,7 @@ class Game():
         Parameters:
         - pacman_icon_idx: Index of the Pacman icon for animation.
         """
-        current_tile = pygame.sprite.spritecollide(self.player, self.map.tiles_board, False)
+        current_tile = self.map.tiles_board.collide(self.player.rect)
         # Pacman can return collision with multiple tiles at once. Make sure we return one that isn't a wall.
         for tile in current_tile:
             if tile.tile_type < 3:
@@ -254,42 +510,61 @@ class Game():
 
     def win_render(self, screen):
         """
-        Renders the win text.
+        Renders the win text and waits for a key press.
 
         Parameters:
         - screen: Pygame display surface.
         """
-        font = pygame.font.Font(None, 36)
-        win_text = font.render("YOU WON!", True, (255,255,255))
-        screen.blit(win_text, (12*27, 13.4*27))
-        pygame.display.update()
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                elif event.type == pygame.KEYDOWN:
-                    for track in self.music:
-                        track.stop()
-                    return
+        self.render_result(screen, "YOU WON!")
+        self.wait_for_key()
 
     def lose_render(self, screen):
         """
-        Renders the lose text.
+        Renders the lose text and waits for a key press.
+
+        Parameters:
+        - screen: Pygame display surface.
+        """
+        self.render_result(screen, "YOU LOST!")
+        self.wait_for_key()
+
+    def render_result(self, screen, text):
+        """
+        Renders the result of the game over the board.
 
         Parameters:
         - screen: Pygame display surface.
+        - text: The result, e.g. "YOU WON!".
         """
         font = pygame.font.Font(None, 36)
-        lose_text = font.render("YOU LOST!", True, (255,255,255))
-        screen.blit(lose_text, (12*27, 13.4*27))
+        result_text = font.render(text, True, (255,255,255))
+        screen.blit(result_text, (12*27, 13.4*27))
         pygame.display.update()
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                elif event.type == pygame.KEYDOWN:
-                    for track in self.music:
-                        track.stop()
-                    return
+
+    def wait_for_key(self):
+        """
+        Waits for a key press without polling.
+        """
+        idle = IdleScheduler()
+        while not self.key_pressed(idle.wait()):
+            pass
+
+    def key_pressed(self, events):
+        """
+        Looks for a key press in events, which stops the music, and quits on a QUIT event.
+
+        Parameters:
+        - events: The pygame events.
+
+        Returns:
+        - bool: True if a key was pressed.
+        """
+        for event in events:
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            elif event.type == pygame.KEYDOWN:
+                for track in self.music:
+                    track.stop()
+                return True
+        return False
@@ -2,7 +2,7 @@
 Pacman Game Launcher
 
 This script initializes and launches the Pacman game, providing a graphical user interface
-with start and stop buttons. It uses the Pygame library for graphics and input handling.
+with start and stop buttons and the high scores. It uses the Pygame library for graphics and input handling.
 
 Dependencies:
 - Pygame: A cross-platform set of Python modules designed for writing video games.
@@ -14,9 +14,13 @@ Clicking the start button initializes a new game, while clicking the stop button
 import sys
 import pygame
 from GUI import button
-from game import Game
+from GUI.idle import IdleScheduler
+from GUI.leaderboard import Leaderboard
+from GUI.assets import load_image, load_sound
+from Telemetry.results import ResultStore
+from game import GameFactory
 
-def main():
+def main(): # pylint: disable=too-many-locals
     """
     Displays the menu of the Pacman game and starts it when the start button is clicked.
     """
@@ -30,42 +34,55 @@ def main():
     pygame.display.set_caption('Pacman')
     clock = pygame.time.Clock()
 
-    logo_surf = pygame.image.load('Graphics/pacman_2013.png').convert_alpha()
-    background_surf = pygame.image.load('Graphics/background.jpg').convert()
-
-    # Scale them to a smaller size
-    logo_surf = pygame.transform.scale(logo_surf, (logo_surf.get_width() // 2, logo_surf.get_height() // 2))
-    background_surf = pygame.transform.scale(background_surf, (1.7*background_surf.get_width() // 2, 1.7*background_surf.get_height() // 2))
+    # Loaded at a smaller size, already scaled in the asset pack
+    logo_surf = load_image('Graphics/pacman_2013.png', (600, 157)).convert_alpha()
+    background_surf = load_image('Graphics/background.jpg', (1632, 918)).convert()
 
     logo_rect = logo_surf.get_rect(midtop = (WIDTH // 2, 50))
-    music = pygame.mixer.Sound('Music/Pacman_mid.mp3')
+    music = load_sound('Music/Pacman_mid.mp3')
     music.play(-1)
 
+    # Loaded once, so starting another game only resets the board
+    factory = GameFactory()
+
+    # Every game's result is stored, the high scores are read without blocking the menu
+    leaderboard = Leaderboard(ResultStore.from_environment())
+    leaderboard.refresh()
+
     buttons = pygame.sprite.Group()
     buttons.add(button.Btn_Start(WIDTH, HEIGHT), button.Btn_Stop(WIDTH, HEIGHT))
 
+    # Block until something happens and only redraw when a button changes or the window needs it
+    idle = IdleScheduler()
     while True:
-        for event in pygame.event.get():
+        redraw = False
+        for event in idle.wait():
             if event.type == pygame.QUIT:
+                leaderboard.close()
                 pygame.quit()
                 sys.exit()
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 for btn in buttons:
                     if isinstance(btn, button.Btn_Start) and btn.rect.collidepoint(event.pos):
-                        new_game = Game()
+                        new_game = factory.new_game()
                         music.stop()
-                        new_game.run_game(screen, clock)
+                        leaderboard.record(new_game, new_game.run_game(screen, clock))
                         music.play(-1)
+                        redraw = True
                     elif isinstance(btn, button.Btn_Stop) and btn.rect.collidepoint(event.pos):
+                        leaderboard.close()
                         pygame.quit()
                         sys.exit()
+            elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                redraw = True
 
-        screen.blit(background_surf, (-80,-10))
-        screen.blit(logo_surf, logo_rect)
-        buttons.draw(screen)
         buttons.update()
-        pygame.display.update()
-        clock.tick(60)
+        if idle.changed((tuple(btn.btn_index for btn in buttons), leaderboard.update()), force=redraw):
+            screen.blit(background_surf, (-80,-10))
+            screen.blit(logo_surf, logo_rect)
+            buttons.draw(screen)
+            leaderboard.draw(screen, (WIDTH // 2, 730))
+            pygame.display.update()
 
 if __name__ == "__main__":
     main()
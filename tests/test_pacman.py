@@ -1,15 +1,50 @@
 from unittest.mock import patch
+from concurrent.futures import Future
+import json
+import io
+import pickle
+import socket
+import asyncio
+import gc
+import weakref
+import sys
+import time
 import pytest
 import inspect
+import numpy as np
 import pygame
 from pylint.lint import Run
 from pylint.reporters import CollectingReporter
 from Players.pacman import Pacman
-from Players.ghost import Ghost, Pinky, Blinky, Inky, Clyde
-from game import Game
+from Players.ghost import Ghost, Pinky, Blinky, Inky, Clyde, bfs
+from Players.pathworker import PathWorker, PathRequest
+from Tiles.navgraph import JunctionGraph, GRAPH_CACHE_SIZE, graph_for_board, find_path
+from Players.controller import GameView, Controller, KeyboardController, ControllerHarness
+from Players.inputbuffer import InputBuffer, can_move
+from Players.movement import FixedMover, sweep, FIXED_TILE
+from Players.autopilot import Autopilot, FAR
+from Engine.levels import LEVELS, Level, LevelLoader
+from Engine.timers import TimerWheel, TICKS_PER_SECOND, WHEEL_SIZE
+from Engine.pacing import FramePacer, FrameTimes, GameOverKey, UnthrottledClock, compare_pacing
+from Telemetry.results import ResultStore, ghost_config
+from Telemetry.heatmap import Heatmap, simulate, collect, wander
+from Telemetry.soak import SoakHarness, grows
+from Telemetry.spectator import SpectatorServer, take_snapshot, snapshot_delta
+from Telemetry.statestream import StateStreamWriter, StateStreamReader, capture_frame
+from Telemetry.events import EventBus, EventWriter, COIN, POWERUP, MODE_CHANGE, TURN, LEVEL, EVENT_TYPES, read_binary_log
+from Telemetry.profiler import FrameProfiler, PROFILE_KEY, PROFILE_ENV, BUDGET_ENV, read_collapsed
+from game import Game, GameFactory
 from GUI.button import Btn_Start, Btn_Stop
-from Tiles.map import Map
+from GUI.idle import IdleScheduler
+from GUI.leaderboard import Leaderboard, LEADERBOARD_READY
+from GUI.capture import FrameCapture, SharedFrameBuffer, SHADES, tile_raster, benchmark_capture
+from GUI.export import FrameRenderer, export_frames, write_png
+from GUI.assets import AssetPack, ASSET_IMAGES, ASSET_SOUNDS, build_pack, load_image, load_sound, time_loading
+from Tiles.map import Map, LEGAL_MOVES, BOARD, apply_effect_to_tile
+from Engine.batch import BatchEngine, GHOST_DIRECTIONS, STOP, BLINKY, CLYDE
+from Engine.differential import PathCheck, MovementCheck, EffectsCheck, find_mismatch, shrink, run_check, run_checks
 from Tiles.maptile import MapTile
+from Tiles.tilestore import TileStore, TileView, BoardLayer, collide_any, memory_report, sprite_groups
 import menu
 
 pygame.init()
@@ -67,7 +102,7 @@ def test_button_initialization(btn_start, btn_stop):
 """
 PYLINT TESTING
 """
-@pytest.fixture(scope="session", params=[Pacman, Ghost, Map, MapTile, Btn_Start, Game, menu])
+@pytest.fixture(scope="session", params=[Pacman, Ghost, PathWorker, ControllerHarness, InputBuffer, FixedMover, SpectatorServer, StateStreamWriter, EventBus, EventWriter, FrameProfiler, IdleScheduler, FrameCapture, FrameRenderer, AssetPack, BatchEngine, PathCheck, LevelLoader, TimerWheel, ResultStore, Leaderboard, Heatmap, Autopilot, SoakHarness, FramePacer, Map, MapTile, TileStore, JunctionGraph, Btn_Start, Game, menu])
 def linter(request):
     """ Test codestyle for src file of render_tree function. """
     src_file = inspect.getfile(request.param)
@@ -195,9 +230,8 @@ def test_ghost_collision(game):
     ghost.rect.x, ghost.rect.y = (0,0)
     ghost_group = pygame.sprite.Group()
     ghost_group.add(ghost)
-    last_time = 1000
     game.player.rect.x, game.player.rect.y = (0,0)
-    game.effects(last_time, ghost_group)
+    game.effects(ghost_group)
     assert game.player.lives == 2
 
 # Checks if player gets 100 score when colliding with a frightened ghost
@@ -207,9 +241,8 @@ def test_ghost_collision_vulnerable(game):
     ghost.freightened = True
     ghost_group = pygame.sprite.Group()
     ghost_group.add(ghost)
-    last_time = 1000
     game.player.rect.x, game.player.rect.y = (0,0)
-    game.effects(last_time, ghost_group)
+    game.effects(ghost_group)
     assert game.player.score == 100
 
 # Checks if music is set to vulnerable when the game is in vulnerable mode
@@ -235,4 +268,1266 @@ def test_ghost_distance(game):
     ghost.rect.x, ghost.rect.y = (0,0)
     game.ghosts = [ghost]
     game.player.rect.x, game.player.rect.y = (1,0)
-    assert game.closest_ghost_distance() == 1
\ No newline at end of file
+    assert game.closest_ghost_distance() == 1
+"""
+PATH WORKER TESTING
+"""
+# Checks if the worker finds the same path as a synchronous search
+def test_path_worker_matches_bfs(map):
+    worker = PathWorker()
+    request = worker.submit(map.simple_board, (12, 14), (15, 24))
+    request.future.result(timeout=5)
+    assert request.done()
+    assert len(request.path()) == len(bfs(map.simple_board, (12, 14), (15, 24)))
+    worker.shutdown()
+
+# Checks if a pending search is replaced when the target moves
+def test_path_request_replaced_when_target_moves(map):
+    ghost = Inky()
+    ghost.path_worker = PathWorker()
+    ghost.request_path(map.simple_board, (14, 14), (15, 24))
+    first = ghost.pending_path
+    ghost.request_path(map.simple_board, (14, 14), (15, 24))
+    assert ghost.pending_path is first
+    ghost.request_path(map.simple_board, (14, 14), (6, 24))
+    assert ghost.pending_path is not first
+    assert ghost.pending_path.target == (6, 24)
+    ghost.path_worker.shutdown()
+
+# Checks if a ghost waits instead of blocking and still reaches Pacman when results arrive late
+@pytest.mark.parametrize("ghost_class", [Pinky, Inky])
+def test_ghost_reaches_target_with_path_worker(map, ghost_class):
+    ghost = ghost_class()
+    ghost.path_worker = PathWorker()
+    target = (15, 24)
+    for _ in range(2000):
+        if ghost.pending_path is not None:
+            ghost.pending_path.future.result(timeout=5)
+        ghost.update(map.wall_group, map.ghostdoor_group, map.simple_board, target)
+        if (ghost.rect.centerx // 27, ghost.rect.centery // 27) == target and ghost.rect.centerx % 27 == 0:
+            break
+    assert (ghost.rect.centerx // 27, ghost.rect.centery // 27) == target
+    ghost.path_worker.shutdown()
+
+"""
+MOVE TABLE TESTING
+"""
+# Checks if the move table gives the same directions as probing the walls on every reachable tile
+def test_move_table_matches_collisions(map):
+    ghost = Blinky()
+    for x, y in zip(*map.simple_board[1:-1, 1:-1].nonzero()):
+        ghost.rect.center = ((x + 1) * 27, (y + 1) * 27)
+        if pygame.sprite.spritecollideany(ghost, map.ghostdoor_group):
+            continue
+        for door_open in (True, False):
+            ghost.move_table = None
+            probed = set(ghost.legal_directions(map.wall_group, map.ghostdoor_group, door_open))
+            ghost.move_table = map.move_table
+            assert set(ghost.legal_directions(map.wall_group, map.ghostdoor_group, door_open)) == probed
+
+# Checks if the ghost door is only open for ghosts that are still inside the house
+def test_move_table_ghost_door(map):
+    ghost = Clyde()
+    ghost.move_table = map.move_table
+    ghost.rect.center = (14*27, 12*27)
+    assert (0, 1) in ghost.legal_directions(map.wall_group, map.ghostdoor_group)
+    ghost.check_outside()
+    assert ghost.outside
+    assert (0, 1) not in ghost.legal_directions(map.wall_group, map.ghostdoor_group)
+
+# Checks if the teleport is a legal move on both sides of the board
+def test_move_table_teleport(map):
+    assert LEGAL_MOVES[map.move_table[0, 15] & 0xF] == ((1, 0), (-1, 0))
+    assert LEGAL_MOVES[map.move_table[29, 15] & 0xF] == ((1, 0), (-1, 0))
+
+# Checks if random-walk ghosts never end up inside a wall
+@pytest.mark.parametrize("ghost_class", [Blinky, Clyde])
+def test_random_walk_stays_off_walls(map, ghost_class):
+    ghost = ghost_class()
+    ghost.move_table = map.move_table
+    for step in range(3000):
+        ghost.freightened = step % 1000 > 500
+        ghost.update(map.wall_group, map.ghostdoor_group, map.simple_board, (15, 24))
+        assert not pygame.sprite.spritecollideany(ghost, map.wall_group)
+
+"""
+NAVIGATION GRAPH TESTING
+"""
+# Checks if the junction graph finds paths as short as BFS, made of neighboring tiles
+def test_junction_graph_matches_bfs(map):
+    graph = graph_for_board(map.simple_board)
+    tiles = sorted(graph.walkable)
+    for start, target in zip(tiles[::7], tiles[3::5]):
+        path = find_path(map.simple_board, start, target)
+        reference = bfs(map.simple_board, start, target)
+        assert (path is None) == (reference is None)
+        if path is None:
+            continue
+        assert len(path) == len(reference)
+        previous = start
+        for tile in path:
+            assert tile in graph.neighbors(previous)
+            previous = tile
+        assert previous == target
+
+# Checks if the graph is much smaller than the board it was built from
+def test_junction_graph_compresses_corridors(map):
+    graph = graph_for_board(map.simple_board)
+    assert len(graph.nodes) < len(graph.walkable) // 2
+    assert graph_for_board(map.simple_board) is graph
+
+# Checks if paths go through the teleport when it is shorter
+def test_path_through_teleport(map):
+    path = find_path(map.simple_board, (2, 15), (27, 15))
+    assert path == [(1, 15), (0, 15), (29, 15), (28, 15), (27, 15)]
+
+# Checks if a chasing ghost walks through the teleport and comes out on the other side
+def test_ghost_follows_path_through_teleport(map):
+    ghost = Inky()
+    ghost.rect.center = (2*27, 15*27)
+    ghost.prev_centerx, ghost.prev_centery = 2, 15
+    for _ in range(200):
+        ghost.update(map.wall_group, map.ghostdoor_group, map.simple_board, (27, 15))
+    assert ghost.rect.center == (27*27, 15*27)
+
+"""
+CONTROLLER TESTING
+"""
+class GoLeft(Controller):
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def decide(self, view):
+        time.sleep(self.delay)
+        return 1
+
+# Checks if the game view can't be used to change the game
+def test_game_view_read_only(game):
+    view = GameView(game, 0)
+    assert view.score == 0 and view.lives == 3 and view.remaining_coins == 242
+    assert view.ghosts.shape == (4, 2)
+    with pytest.raises(ValueError):
+        view.tiles[2, 2] = 0
+
+# Checks if the keyboard controller applies each key press once
+def test_keyboard_controller(game):
+    controller = KeyboardController()
+    controller.handle_event(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_UP))
+    assert controller.decide(GameView(game, 0)) == 2
+    assert controller.decide(GameView(game, 1)) is None
+
+# Checks if decisions over the budget are measured, reported and dropped
+def test_harness_drops_slow_decisions(game):
+    harness = ControllerHarness(GoLeft(delay=0.01), budget_ms=1)
+    assert harness.decide(GameView(game, 0)) is None
+    report = harness.report()
+    assert report['decisions'] == 1 and report['overruns'] == 1
+    assert report['max_ms'] >= 10
+
+# Checks if a controller in a separate process can't stall the game for longer than the budget
+def test_harness_process_budget(game):
+    fast = ControllerHarness(GoLeft(), budget_ms=1000, use_process=True)
+    process = fast.process
+    assert fast.decide(GameView(game, 0)) == 1
+    fast.close()
+    assert not process.is_alive()
+    slow = ControllerHarness(GoLeft(delay=0.5), budget_ms=5, use_process=True)
+    process = slow.process
+    start = time.perf_counter()
+    for tick in range(3):
+        assert slow.decide(GameView(game, tick)) is None
+    assert time.perf_counter() - start < 0.4
+    assert slow.report()['overruns'] == 3
+    slow.close()
+    assert not process.is_alive()
+
+# Checks if the late answer of a controller process is measured with its real duration
+def test_harness_process_reports_late_time(game):
+    harness = ControllerHarness(GoLeft(delay=0.05), budget_ms=5, use_process=True)
+    assert harness.decide(GameView(game, 0)) is None
+    time.sleep(0.1)
+    harness.decide(GameView(game, 1))
+    assert harness.report()['max_ms'] >= 50
+    harness.close()
+
+# Checks if the view a controller process receives is still read-only
+def test_game_view_read_only_after_pickling(game):
+    view = pickle.loads(pickle.dumps(GameView(game, 0)))
+    with pytest.raises(ValueError):
+        view.ghosts[0, 0] = 0
+
+# Checks if a late key press is reported as an overrun but still applied
+def test_harness_keeps_late_key_press(game):
+    harness = ControllerHarness(GoLeft(delay=0.01), budget_ms=1, drop_late=False)
+    assert harness.decide(GameView(game, 0)) == 1
+    assert harness.report()['overruns'] == 1
+    assert game.controller.drop_late is False
+
+# Checks if respawning cancels the pending path search
+def test_respawn_cancels_path_request(map):
+    ghost = Pinky()
+    request = PathRequest((14, 14), (15, 24), Future())
+    ghost.pending_path = request
+    ghost.respawn()
+    assert ghost.pending_path is None
+    assert request.future.cancelled()
+
+# Checks if only the graphs of the most recently used boards are kept
+def test_graph_cache_is_bounded(map):
+    boards = [map.simple_board.copy() for _ in range(GRAPH_CACHE_SIZE + 2)]
+    graphs = [graph_for_board(board) for board in boards]
+    assert graph_for_board(boards[-1]) is graphs[-1]
+    assert graph_for_board(boards[0]) is not graphs[0]
+
+# Checks if the graph of a board is dropped from the cache once the board is freed
+def test_graph_cache_drops_freed_boards(map):
+    board = map.simple_board.copy()
+    graph = weakref.ref(graph_for_board(board))
+    del board
+    gc.collect()
+    assert graph() is None
+
+# Checks if a process worker searches on the board it was started with
+def test_process_path_worker(map):
+    worker = PathWorker(use_processes=True, simple_board=map.simple_board)
+    request = worker.submit(map.simple_board, (2, 15), (27, 15))
+    assert request.future.result(timeout=30) == find_path(map.simple_board, (2, 15), (27, 15))
+    worker.shutdown()
+
+"""
+SPECTATOR TESTING
+"""
+# Checks if a delta only holds the fields that changed
+def test_snapshot_delta(game):
+    previous = take_snapshot(game, 0)
+    game.player.score += 10
+    game.map.tile_types[2, 2] = 0
+    delta = snapshot_delta(previous, take_snapshot(game, 1))
+    assert delta == {'tick': 1, 'score': 10, 'eaten': [[2, 2]]}
+
+# Checks if a spectator receives a keyframe and then the deltas of the following ticks
+def test_spectator_receives_deltas(game):
+    server = SpectatorServer().start()
+    game.observers.append(server)
+    server.on_tick(game, 0)
+    with socket.create_connection((server.host, server.port), timeout=5) as client:
+        stream = client.makefile('r')
+        keyframe = json.loads(stream.readline())
+        assert keyframe['tick'] == 0 and keyframe['lives'] == 3 and len(keyframe['ghosts']) == 4
+        game.player.score += 50
+        server.on_tick(game, 1)
+        assert json.loads(stream.readline()) == {'tick': 1, 'score': 50}
+    server.stop()
+
+# Checks if a spectator that doesn't read is dropped without slowing down the game
+def test_slow_spectator_dropped(game):
+    server = SpectatorServer(queue_size=2).start()
+    with socket.socket() as client:
+        client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024)
+        client.connect((server.host, server.port))
+        deadline = time.perf_counter() + 5
+        while not server.clients and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        full, empty = game.map.tile_types.copy(), game.map.tile_types * 0
+        start = time.perf_counter()
+        # Eating and restoring every coin makes each delta a few kilobytes, more than the socket buffers hold
+        for tick in range(4000):
+            game.map.tile_types = empty if tick % 2 else full
+            server.on_tick(game, tick)
+        assert time.perf_counter() - start < 2
+        deadline = time.perf_counter() + 5
+        while server.dropped == 0 and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        assert server.dropped == 1
+    server.stop()
+
+"""
+STATE STREAM TESTING
+"""
+def record_frames(game, ticks):
+    ghosts = pygame.sprite.Group(game.ghosts)
+    frames = []
+    for tick in range(ticks):
+        game.player.direction = tick // 40 % 4
+        game.update_players(tick % 20)
+        game.effects(ghosts)
+        frames.append(capture_frame(game, tick))
+    return frames
+
+# Checks if a recorded game is decoded frame by frame exactly as it was captured
+@pytest.mark.parametrize("compression", ['none', 'zlib'])
+def test_state_stream_round_trip(game, compression):
+    frames = record_frames(game, 300)
+    stream = io.BytesIO()
+    writer = StateStreamWriter(stream, game.map.tile_types.shape, len(game.ghosts), compression, block_frames=64)
+    for frame in frames:
+        writer.write(frame)
+    writer.close()
+    stream.seek(0)
+    decoded = list(StateStreamReader(stream))
+    assert len(decoded) == len(frames)
+    for frame, copy in zip(frames, decoded):
+        assert copy['tick'] == frame['tick'] and copy['pacman'] == frame['pacman']
+        assert copy['ghosts'] == frame['ghosts'] and copy['counters'] == frame['counters']
+        assert (copy['coins'] == frame['coins']).all()
+
+# Checks if delta frames are much smaller than pickled games
+def test_state_stream_is_compact(game):
+    stream = io.BytesIO()
+    writer = StateStreamWriter.for_game(stream, game)
+    for frame in record_frames(game, 300):
+        writer.write(frame)
+    writer.close()
+    assert len(stream.getvalue()) < 300 * 20
+
+# Checks if frames are decoded lazily, one block at a time
+def test_state_stream_streams(game):
+    stream = io.BytesIO()
+    writer = StateStreamWriter(stream, game.map.tile_types.shape, len(game.ghosts), block_frames=64)
+    for frame in record_frames(game, 300):
+        writer.write(frame)
+    writer.close()
+    stream.seek(0)
+    frames = iter(StateStreamReader(stream))
+    next(frames)
+    assert stream.tell() < len(stream.getvalue())
+
+"""
+EVENT LOG TESTING
+"""
+# Checks if picking up coins and power-ups records typed events
+def test_coin_and_powerup_events(game):
+    record_frames(game, 300)
+    events = game.events.drain()
+    coins = events[events['type'] == COIN]
+    assert len(coins) == 242 - game.remaining_coins > 0
+    assert coins['value'][-1] <= game.player.score
+    game.player.rect.center = (1*27 + 13, 3*27 + 13)
+    game.effects(pygame.sprite.Group(game.ghosts))
+    types = list(game.events.drain()['type'])
+    assert types.count(POWERUP) == 1 and types.count(MODE_CHANGE) == 1
+
+# Checks if events the writer didn't take in time are counted as lost
+def test_event_ring_buffer_overflow():
+    bus = EventBus(capacity=8)
+    for value in range(20):
+        bus.emit(COIN, value=value)
+    events = bus.drain()
+    assert list(events['value']) == list(range(12, 20))
+    assert bus.lost == 12
+
+# Checks if the background writer flushes JSON Lines and binary logs
+def test_event_writer(tmp_path):
+    bus = EventBus()
+    with open(tmp_path / 'events.jsonl', 'w') as text, open(tmp_path / 'events.bin', 'wb') as binary:
+        for _ in range(2):
+            bus.tick += 1
+            bus.emit(COIN, 3, 4, 10)
+        EventWriter(bus, text, interval=0.01).start().stop()
+        bus.emit(POWERUP, 1, 3, 60)
+        EventWriter(bus, binary, binary=True).start().stop()
+    lines = [json.loads(line) for line in (tmp_path / 'events.jsonl').read_text().splitlines()]
+    assert lines == [{'tick': tick, 'type': 'coin', 'x': 3, 'y': 4, 'value': 10} for tick in (1, 2)]
+    rows = read_binary_log(tmp_path / 'events.bin')
+    assert EVENT_TYPES[rows[0]['type']] == 'powerup' and rows[0]['value'] == 60
+
+# Checks if recording events costs only a few microseconds per tick
+def test_event_overhead():
+    bus = EventBus()
+    for tick in range(1000):
+        bus.tick = tick
+        bus.emit(COIN, 1, 1, tick)
+    assert bus.report()['us_per_tick'] < 50
+
+"""
+GAME FACTORY TESTING
+"""
+# Checks if a game from the factory starts with every coin back and Pacman reset
+def test_factory_resets_game():
+    factory = GameFactory()
+    first = factory.new_game()
+    record_frames(first, 300)
+    assert first.remaining_coins < 242 and (first.map.tile_types == 0).sum() > 162
+    second = factory.new_game()
+    assert second.map is first.map and second.player is first.player
+    assert second.remaining_coins == 242 and second.player.score == 0 and second.player.lives == 3
+    assert (second.map.tile_types == Map().tile_types).all()
+    assert sum(tile.tile_type == 1 for tile in second.map.tiles_board) == 242
+    assert all(tile.image.get_size() == (27, 27) for tile in second.map.tiles_board)
+
+# Checks if a game from the factory is created much faster than a fresh one
+def test_factory_is_fast():
+    factory = GameFactory()
+    start = time.perf_counter()
+    factory.new_game()
+    assert time.perf_counter() - start < 0.02
+
+"""
+IDLE SCHEDULER TESTING
+"""
+# Checks if waiting without events blocks instead of spinning
+def test_idle_wait_blocks():
+    pygame.event.clear()
+    idle = IdleScheduler(timeout_ms=100)
+    start = time.perf_counter()
+    for _ in range(3):
+        assert idle.wait() == []
+    assert time.perf_counter() - start >= 0.25
+    report = idle.report()
+    assert report['wakeups'] == 3 and report['cpu_percent'] < 50
+
+# Checks if a posted event wakes the scheduler up
+def test_idle_wait_returns_events():
+    pygame.event.clear()
+    idle = IdleScheduler(timeout_ms=5000)
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_a))
+    start = time.perf_counter()
+    assert [event.type for event in idle.wait()] == [pygame.KEYDOWN]
+    assert time.perf_counter() - start < 1
+
+# Checks if only changes of the visible state ask for a redraw
+def test_idle_redraw_on_change():
+    idle = IdleScheduler()
+    assert idle.changed((0, 0))
+    assert not idle.changed((0, 0))
+    assert idle.changed((1, 0))
+    assert idle.changed((1, 0), force=True)
+    assert idle.report()['redraws'] == 3
+
+# Checks if the end screen waits for a key press without polling
+def test_end_screen_returns_on_key(game):
+    pygame.event.clear()
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_a))
+    game.lose_render(screen)
+
+"""
+ASSET PACK TESTING
+"""
+@pytest.fixture(scope="module")
+def asset_pack(tmp_path_factory):
+    path = tmp_path_factory.mktemp('assets') / 'assets.pack'
+    build_pack(str(path))
+    return AssetPack(str(path))
+
+# Checks if packed images and sounds are the same as the ones decoded from their files
+def test_asset_pack_matches_files(asset_pack):
+    for path, size in ASSET_IMAGES:
+        packed = load_image(path, size, asset_pack)
+        decoded = load_image(path, size, False)
+        assert packed.get_size() == decoded.get_size()
+        assert pygame.image.tobytes(packed, 'RGBA') == pygame.image.tobytes(decoded, 'RGBA')
+    for path in ASSET_SOUNDS:
+        assert load_sound(path, asset_pack).get_length() == load_sound(path, False).get_length()
+    assert asset_pack.misses == 0
+
+# Checks if assets missing from the pack are loaded from their files
+def test_asset_pack_falls_back(asset_pack):
+    assert load_image('Graphics/coin.png', (10, 10), asset_pack).get_size() == (10, 10)
+    assert asset_pack.misses == 1
+
+# Checks if loading every asset from the pack is much faster than decoding the files
+def test_asset_pack_is_fast(asset_pack):
+    assert time_loading(asset_pack) * 5 < time_loading(False)
+
+"""
+BATCH ENGINE TESTING
+"""
+# Checks if the batched games follow the sprite-based games pixel by pixel when there are no ghosts
+def test_batch_engine_matches_game():
+    starts = [None, (2 * 27 - 10, 15 * 27 - 10), (27 * 27 - 10, 15 * 27 - 10), (3 * 27 - 10, 24 * 27 - 10)]
+    engine = BatchEngine(len(starts), ghosts=False)
+    games = [Game() for _ in starts]
+    for row, (game, start) in enumerate(zip(games, starts)):
+        game.ghosts = []
+        if start is not None:
+            engine.pacman[row] = start
+            game.player.rect.topleft = start
+    rng = np.random.default_rng(0)
+    directions = np.array([0, 1, 0, 1])
+    for _ in range(2000):
+        previous = engine.pacman.copy()
+        engine.step(directions)
+        for row, game in enumerate(games):
+            game.player.direction = int(directions[row])
+            game.update_players(0)
+            game.effects(pygame.sprite.Group())
+            assert tuple(engine.pacman[row]) == game.player.rect.topleft
+            assert engine.score[row] == game.player.score and engine.remaining[row] == game.remaining_coins
+            assert engine.timer[row] == game.vulnerable_timer and engine.vulnerable[row] == game.vulnerable_mode
+        # Turn somewhere else whenever Pacman runs into a wall
+        stuck = (engine.pacman == previous).all(axis=1)
+        directions = np.where(stuck, rng.integers(0, 4, len(games)), directions)
+    for row, game in enumerate(games):
+        assert (engine.coin_board(row) == np.where(np.isin(game.map.tile_types, (1, 2)), game.map.tile_types, 0)).all()
+
+# Checks if the chasing ghosts' next-direction table leads along the shortest paths
+def test_batch_engine_shortest_paths(map):
+    engine = BatchEngine(1)
+    rng = np.random.default_rng(1)
+    cells = np.flatnonzero(map.simple_board)
+    for start, target in rng.choice(cells, (50, 2)):
+        position = divmod(int(start), engine.height)
+        goal = divmod(int(target), engine.height)
+        path = bfs(map.simple_board, position, goal)
+        if path is None:
+            assert start == target or engine.next_directions[start, target] == STOP
+            continue
+        steps = 0
+        while position != goal:
+            direction = engine.next_directions[position[0] * engine.height + position[1], target]
+            dx, dy = GHOST_DIRECTIONS[direction]
+            position = ((position[0] + dx) % engine.width, position[1] + dy)
+            steps += 1
+        assert steps == len(path)
+
+# Checks if the ghosts only walk on corridors and cost Pacman his lives
+def test_batch_engine_ghosts():
+    engine = BatchEngine(500, seed=2)
+    board = np.transpose(np.array(BOARD))
+    walkable = (board < 3) | (board == 9)
+    rng = np.random.default_rng(2)
+    for tick in range(3000):
+        engine.step(rng.integers(0, 4, engine.games) if tick % 30 == 0 else None)
+        x, y = engine.ghosts[..., 0], engine.ghosts[..., 1]
+        centered = (x % 27 == 0) & (y % 27 == 0)
+        assert walkable[x[centered] // 27 % engine.width, y[centered] // 27].all()
+    assert (engine.lives < 3).mean() > 0.5 and engine.done.any()
+    assert engine.outside[:, CLYDE].any()
+
+# Checks if a frightened ghost is eaten and a normal one costs a life
+def test_batch_engine_ghost_collisions():
+    engine = BatchEngine(2, seed=3)
+    engine.ghosts[:, BLINKY] = engine.pacman + 10
+    engine.frightened[0, BLINKY] = True
+    engine.collide_ghosts(np.ones(2, dtype=bool))
+    assert engine.score.tolist() == [100, 0] and engine.lives.tolist() == [3, 2]
+    assert tuple(engine.ghosts[0, BLINKY]) == (13 * 27, 11 * 27) and not engine.frightened[0, BLINKY]
+
+# Checks if the batch engine steps at least a million game-ticks per second
+def test_batch_engine_is_fast():
+    engine = BatchEngine(5000, seed=4)
+    directions = np.random.default_rng(4).integers(0, 4, (10, engine.games))
+    start = time.perf_counter()
+    for tick in range(200):
+        engine.step(directions[tick // 20])
+    assert engine.games * 200 / (time.perf_counter() - start) > 1e6
+
+"""
+PROFILER TESTING
+"""
+def busy_frame(milliseconds):
+    end = time.perf_counter() + milliseconds / 1000
+    while time.perf_counter() < end:
+        pass
+
+# Checks if a session records the stacks of every frame it covers
+def test_profiler_session(tmp_path):
+    profiler = FrameProfiler(str(tmp_path / 'session.folded'), interval=0.001)
+    profiler.start()
+    for frame in range(5):
+        profiler.begin_frame(frame)
+        busy_frame(30)
+        profiler.end_frame()
+    profiler.stop()
+    frames = read_collapsed(profiler.path)
+    assert sorted(frames) == list(range(5))
+    assert all(any(stack.endswith('test_pacman.py:busy_frame') for stack in stacks) for stacks in frames.values())
+    profiler.close()
+
+# Checks if only the frames over the budget are kept outside of a session
+def test_profiler_budget(tmp_path):
+    profiler = FrameProfiler(str(tmp_path / 'hitches.folded'), interval=0.001, budget_ms=20)
+    for frame in range(6):
+        profiler.begin_frame(frame)
+        busy_frame(40 if frame in (2, 5) else 1)
+        profiler.end_frame()
+    profiler.close()
+    assert [frame for frame, _ in profiler.hitches] == [2, 5]
+    assert sorted(read_collapsed(profiler.path)) == [2, 5]
+
+# Checks if the profile key and the environment start a session, and an idle profiler doesn't sample
+def test_profiler_triggers(game):
+    assert not game.profiler.active and game.profiler.thread is None
+    game.profiler.handle_event(pygame.event.Event(pygame.KEYDOWN, key=PROFILE_KEY))
+    assert game.profiler.active and game.profiler.thread is not None
+    game.profiler.close()
+    profiler = FrameProfiler.from_environment({PROFILE_ENV: 'game.folded', BUDGET_ENV: '25'})
+    assert profiler.active and profiler.path == 'game.folded' and profiler.budget_ms == 25
+
+"""
+FRAME CAPTURE TESTING
+"""
+# Checks if consumers get a view of the rendered screen instead of a copy
+def test_capture_is_a_view(game):
+    frames = []
+    capture = FrameCapture(screen, downscale=3, consumers=[lambda pixels, tick: frames.append((pixels.base is not None, pixels[1, 2].tolist(), pixels.shape, tick))])
+    game.observers.append(capture)
+    screen.fill((255, 0, 0))
+    capture.on_tick(game, 7)
+    assert frames == [(True, [255, 0, 0], (265, 300, 3), 7)]
+
+# Checks if a frame in shared memory can be read back by name
+def test_capture_shared_memory(game):
+    game.draw_elements(screen, pygame.sprite.GroupSingle(game.player), pygame.sprite.Group(game.ghosts))
+    capture = FrameCapture(screen, shared=True)
+    capture.on_tick(game, 3)
+    reader = SharedFrameBuffer.attach(capture.shared.memory.name, (900, 795))
+    assert reader.tick[0] == 3
+    assert (reader.rgb() == pygame.surfarray.array3d(screen).transpose(1, 0, 2)).all()
+    reader.close()
+    capture.close()
+
+# Checks if the tile raster shows walls, coins and Pacman on their tiles
+def test_tile_raster(game):
+    raster = tile_raster(game)
+    assert raster.shape == game.map.tile_types.shape
+    assert raster[0, 0] == SHADES['wall'] and raster[2, 2] == SHADES['coin']
+    assert raster[15, 24] == SHADES['pacman'] and raster[13, 11] == SHADES['ghost']
+
+# Checks if handing out a view costs a small fraction of copying the screen
+def test_capture_benchmark(game):
+    timings = benchmark_capture(game, screen, frames=20)
+    assert timings['pixels3d view'] * 20 < timings['array3d copy']
+    assert timings['shared memory'] < timings['array3d copy']
+
+"""
+VIDEO EXPORT TESTING
+"""
+# Checks if an exported frame is pixel for pixel the screen the game drew at that tick
+def test_export_matches_game(game, tmp_path):
+    frames = record_frames(game, 400)
+    game.draw_elements(screen, pygame.sprite.GroupSingle(game.player), pygame.sprite.Group(game.ghosts))
+    expected = pygame.surfarray.array3d(screen)
+    renderer = FrameRenderer(pygame.Surface(screen.get_size()))
+    for frame in frames[::50] + frames[-1:]:
+        renderer.render(frame)
+    assert (pygame.surfarray.array3d(renderer.surface) == expected).all()
+    write_png(renderer.surface, str(tmp_path / 'frame.png'))
+    assert (pygame.surfarray.array3d(pygame.image.load(str(tmp_path / 'frame.png'))) == expected).all()
+
+# Checks if a worker pool writes one PNG per tick and pipes raw frames to an encoder
+def test_export_frames(game, tmp_path):
+    frames = record_frames(game, 30)
+    report = export_frames(frames, str(tmp_path / 'png'), workers=1, chunk_frames=8)
+    assert report['frames'] == 30 and report['realtime'] > 0
+    assert sorted(path.name for path in (tmp_path / 'png').iterdir())[-1] == 'frame_000029.png'
+    copy = [sys.executable, '-c', 'import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, open(sys.argv[1], "wb"))', '{output}']
+    export_frames(frames, str(tmp_path / 'video'), workers=1, chunk_frames=8, encoder=copy)
+    segments = (tmp_path / 'video' / 'segments.txt').read_text().split()
+    assert segments[1::2] == ["'segment_000000.mp4'", "'segment_000008.mp4'", "'segment_000016.mp4'", "'segment_000024.mp4'"]
+    assert sum(path.stat().st_size for path in (tmp_path / 'video').glob('segment_*')) == 30 * 795 * 900 * 3
+
+"""
+INPUT BUFFER TESTING
+"""
+def play_ticks(game, ticks, first=0):
+    for tick in range(first, first + ticks):
+        direction = game.controller.decide(GameView(game, tick))
+        if direction is not None:
+            game.player.direction = direction
+        game.update_players(tick % 20)
+        for observer in game.observers:
+            observer.on_tick(game, tick)
+
+# Checks if the legality of a step is predicted exactly as Pacman.move decides it
+def test_can_move_matches_pacman(game):
+    walls, door = game.map.wall_group, game.map.ghostdoor_group
+    for frame in record_frames(game, 600)[::3]:
+        x, y, _ = frame['pacman']
+        for direction in range(4):
+            game.player.rect.center = (x, y)
+            game.player.direction = direction
+            game.player.move(walls, door)
+            assert can_move(game.map.tile_types, x, y, direction) == (game.player.rect.center != (x, y))
+
+# Checks if a turn pressed before an intersection is kept until it's legal, then measured and recorded
+def test_buffered_turn(game):
+    assert isinstance(game.controller.controller, InputBuffer) and game.controller.controller in game.observers
+    buffer = game.controller.controller
+    game.player.direction = 1
+    game.controller.handle_event(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_UP))
+    play_ticks(game, 1)
+    assert game.player.direction == 1 and buffer.requested == 2
+    for tick in range(1, 200):
+        play_ticks(game, 1, tick)
+        if game.player.direction == 2:
+            break
+    x, y = game.player.rect.center
+    assert x % 27 == 0 and y % 27 == 26 and buffer.requested is None
+    assert buffer.report()['turns'] == 1 and buffer.latencies[0] > 0
+    turns = [row for row in game.events.drain() if row['type'] == TURN]
+    assert len(turns) == 1 and (turns[0]['x'], turns[0]['y']) == (x // 27, y // 27)
+
+# Checks if a turn into a wall is kept instead of stopping Pacman, and a newer key replaces it
+def test_buffered_turn_keeps_moving(game):
+    game.controller.handle_event(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_DOWN))
+    start = game.player.rect.centerx
+    play_ticks(game, 5)
+    assert game.player.direction == 0 and game.player.rect.centerx == start + 5
+    game.controller.handle_event(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_LEFT))
+    play_ticks(game, 2, 5)
+    assert game.player.direction == 1 and game.player.rect.centerx == start + 3
+    assert game.controller.controller.report()['turns'] == 1
+
+"""
+TILE STORE TESTING
+"""
+# Checks if the layers report the same collisions, in the same order, as sprite groups of MapTiles
+def test_tile_layers_match_sprite_groups(map):
+    groups = sprite_groups(BOARD)
+    probe = pygame.sprite.Sprite()
+    for x in range(-20, 820, 7):
+        for y in range(-20, 900, 11):
+            probe.rect = pygame.Rect(x, y, 20, 20)
+            for name, group in groups.items():
+                layer = map.store.layer(name)
+                assert collide_any(probe, layer) == collide_any(probe, group)
+                assert [tile.rect for tile in layer.collide(probe.rect)] == [tile.rect for tile in pygame.sprite.spritecollide(probe, group, False)]
+    assert len(map.tiles_board) == len(groups['floor']) and len(map.wall_group) == len(groups['wall'])
+
+# Checks if views write through to the array, share the images of their type, and reset puts the coins back
+def test_tile_views(map):
+    tile = next(tile for tile in map.tiles_board if tile.tile_type == 1)
+    other = next(other for other in map.tiles_board if other.tile_type == 1 and other.cell != tile.cell)
+    assert tile.image is other.image and tile.rect.center == (tile.cell[0] * 27, tile.cell[1] * 27)
+    tile.tile_type = 0
+    assert map.tile_types[tile.cell] == 0 and TileView(map.store, *tile.cell).image is not other.image
+    map.reset()
+    assert map.tile_types[tile.cell] == 1
+
+# Checks if the store takes a small fraction of the memory of one sprite per cell
+def test_tile_store_memory():
+    report = memory_report(BOARD)
+    assert report['cells'] == 990 and report['array_bytes_per_cell'] == 1
+    assert report['store_bytes_per_cell'] * 20 < report['sprite_bytes_per_cell']
+
+"""
+DIFFERENTIAL TESTING
+"""
+class ShortPathCheck(PathCheck):
+    """ A candidate that drops the last step of paths to the right half of the board. """
+    def candidate(self, setup, inputs):
+        return [path[:-1] if path and target[0] > 15 else path for path, (_, target) in zip(super().candidate(setup, inputs), inputs)]
+
+class DoorlessMovementCheck(MovementCheck):
+    """ A candidate that lets Pacman through the ghost door. """
+    def candidate(self, setup, inputs):
+        return self.run(self.map.wall_group, pygame.sprite.Group(), setup, inputs)
+
+# Checks if the fast paths match their reference implementations on fuzzed cases
+def test_differential_checks():
+    reports = run_checks([PathCheck(), MovementCheck(), EffectsCheck()], cases=15, seed=3)
+    assert [report['check'] for report in reports] == ['pathfinding', 'movement', 'effects']
+    for report in reports:
+        assert report['mismatches'] == 0 and report['reproducer'] is None
+        assert report['inputs'] >= 15 and report['speedup'] > 0
+    assert reports[0]['speedup'] > 1
+
+# Checks if a mismatch is found and shrunk to a minimal reproducer that still fails
+def test_differential_shrinks_mismatches():
+    check = ShortPathCheck()
+    report = run_check(check, cases=20, seed=4)
+    reproducer = report['reproducer']
+    assert report['mismatches'] > 0 and len(reproducer['inputs']) == 1
+    assert reproducer['inputs'][0][1][0] > 15 and reproducer['expected'][0] == reproducer['actual'][0] + 1
+    assert find_mismatch(check, reproducer['setup'], reproducer['inputs']) is not None
+
+# Checks if a movement mismatch shrinks to the steps that walk into the ghost door
+def test_differential_shrinks_movement():
+    check = DoorlessMovementCheck()
+    setup, inputs = (14 * 27, 12 * 27), [0] * 20 + [1] * 20 + [3] * 15 + [2] * 10
+    shrunk, mismatch = shrink(check, setup, inputs)
+    assert set(shrunk) == {3} and len(shrunk) < 15
+    assert mismatch['expected'] != mismatch['actual'] and find_mismatch(check, setup, shrunk[:-1]) is None
+
+"""
+MOVEMENT TESTING
+"""
+# Checks if a fractional speed moves as far in every direction
+@pytest.mark.parametrize("direction", [(1, 0), (-1, 0), (0, 1), (0, -1)])
+def test_fractional_speed(direction):
+    rect = pygame.Rect(0, 0, 27, 27)
+    rect.center = (6 * 27, 15 * 27)
+    mover = FixedMover(rect)
+    start = rect.center
+    for _ in range(100):
+        mover.advance(rect, direction, 0.8)
+    assert (rect.centerx - start[0], rect.centery - start[1]) == (80 * direction[0], 80 * direction[1])
+
+# Checks if a frightened ghost reaches the next tile center exactly, at 0.8 pixels a tick
+def test_frightened_ghost_speed(map):
+    ghost = Clyde()
+    ghost.move_table = map.move_table
+    ghost.rect.center = (6 * 27, 15 * 27)
+    ghost.freightened = True
+    ghost.update(map.wall_group, map.ghostdoor_group, map.simple_board, (15, 24))
+    ticks = 1
+    while not ghost.at_tile_center():
+        ghost.update(map.wall_group, map.ghostdoor_group, map.simple_board, (15, 24))
+        ticks += 1
+    assert ticks == 34 and ghost.mover.x % FIXED_TILE == 0 and ghost.mover.carry > 0
+
+# Checks if a sweep stops flush against the nearest obstacle, wherever it is
+def test_sweep_stops_flush():
+    wall = pygame.sprite.Sprite()
+    wall.rect = pygame.Rect(50, 0, 27, 27)
+    rect = pygame.Rect(0, 0, 20, 20)
+    assert sweep(rect, (1, 0), 100, [pygame.sprite.Group(wall)]) == 30
+    assert sweep(rect, (1, 0), 10, [pygame.sprite.Group(wall)]) == 10
+    assert sweep(rect, (-1, 0), 100, [pygame.sprite.Group(wall)]) == 100
+
+# Checks if Pacman never goes through a wall, even many pixels a tick
+@pytest.mark.parametrize("speed", [1, 7.5, 40])
+def test_fast_pacman_stops_at_walls(map, pacman, speed):
+    pacman.speed = speed
+    pacman.direction = 0
+    for _ in range(600 // int(speed)):
+        pacman.mover.advance(pacman.rect, (1, 0), speed, (map.wall_group, map.ghostdoor_group), turn=lambda direction: direction)
+        assert not map.wall_group.collides(pacman.rect)
+    assert map.wall_group.collides(pacman.rect.move(1, 0)) and pacman.rect.centerx == 598
+
+"""
+LEVELS TESTING
+"""
+# Checks if the baked board layer draws the same pixels as the store, after coins are eaten
+def test_board_layer_matches_store(map):
+    layer = BoardLayer(map.store)
+    layer_surface, store_surface = pygame.Surface((795, 900)), pygame.Surface((795, 900))
+    layer.draw(layer_surface)
+    map.tile_types[2, 2] = map.tile_types[2, 4] = 0
+    layer.draw(layer_surface)
+    store_surface.fill('black')
+    map.store.draw(store_surface)
+    assert pygame.image.tobytes(layer_surface, 'RGB') == pygame.image.tobytes(store_surface, 'RGB')
+    map.reset()
+
+# Checks if a cleared board moves the game to the next level, built in the background
+def test_next_level(game):
+    game.level_loader.prepare(1)
+    game.level_loader.pending[1].result()
+    game.player.score = 2420
+    game.player.rect.center = (27, 27)
+    game.remaining_coins = 0
+    old_map = game.map
+    assert game.next_level()
+    assert game.level.number == 2 and game.level_loader.waits == [0.0]
+    assert game.map is not old_map and game.map.board_layer.surface is not None
+    assert game.remaining_coins == 242 and game.player.score == 2420 and game.player.rect.center == (15*27, 24*27)
+    assert all(ghost.speed == LEVELS[1].ghost_speed and ghost.move_table is game.map.move_table for ghost in game.ghosts)
+    assert LEVEL in game.events.drain()['type']
+    game.level_loader.shutdown()
+
+# Checks if the game is won after the last level, and the frightened time follows the level
+def test_last_level(game):
+    game.level_loader = LevelLoader((Level(1, 1, 0.5, 5),))
+    game.level_loader.levels[0].apply(game)
+    assert not game.next_level()
+    tile = TileView(game.map.store, 2, 4)
+    apply_effect_to_tile(tile, game.player, game, game.ghosts)
+    assert game.vulnerable_timer == 5
+    game.ghosts[0].update(game.map.wall_group, game.map.ghostdoor_group, game.map.simple_board, (15, 24))
+    assert game.ghosts[0].speed == 0.5
+    game.map.reset()
+
+# Checks if building a level prepares its map, navigation graph and board layer
+def test_build_level():
+    prepared = LEVELS[2].build()
+    assert prepared.level.number == 3 and prepared.coins == 242
+    assert prepared.map.board_layer.surface is not None
+    assert prepared.graph.find_path((2, 2), (27, 30)) is not None
+
+"""
+TIMER WHEEL TESTING
+"""
+# Checks if every timer fires on its exact tick, near, across ring turns and past the last ring
+def test_timer_wheel_fires_on_time():
+    wheel = TimerWheel(tick=5)
+    fired = []
+    rng = np.random.default_rng(0)
+    delays = [1, WHEEL_SIZE - 1, WHEEL_SIZE, WHEEL_SIZE + 1, WHEEL_SIZE ** 2, WHEEL_SIZE ** 4 + 3] + rng.integers(1, 20000, 500).tolist()
+    for delay in delays:
+        wheel.schedule(delay, lambda due: fired.append((due, wheel.tick)), 5 + delay)
+    assert len(wheel) == len(delays)
+    wheel.advance(WHEEL_SIZE ** 4 + 3)
+    assert len(fired) == len(delays) and all(due == tick for due, tick in fired)
+    assert len(wheel) == 0
+
+# Checks if cancelled timers don't fire, even when cancelled by a timer of the same tick
+def test_timer_wheel_cancel():
+    wheel = TimerWheel()
+    fired = []
+    wheel.schedule(10, lambda: later.cancel())
+    later = wheel.schedule(10, fired.append, 'later')
+    first = wheel.schedule(10, fired.append, 'first')
+    wheel.schedule(10, fired.append, 'last')
+    assert first.cancel() and not first.cancel() and later.remaining() == 10
+    wheel.advance(10)
+    assert fired == ['last'] and not later.active() and later.remaining() == 0
+
+# Checks if a repeating timer fires every interval until it cancels itself
+def test_timer_wheel_repeat():
+    wheel = TimerWheel()
+    ticks = []
+    def callback():
+        ticks.append(wheel.tick)
+        if len(ticks) == 3:
+            handle.cancel()
+    handle = wheel.schedule(2, callback, interval=TICKS_PER_SECOND)
+    wheel.advance(1000)
+    assert ticks == [2, 62, 122] and len(wheel) == 0 and wheel.fired == 3
+
+# Checks if a tick costs the timers that fire, not the timers pending
+def test_timer_wheel_cost():
+    wheel = TimerWheel()
+    for delay in range(100000):
+        wheel.schedule(WHEEL_SIZE ** 3 + delay, print)
+    start = time.perf_counter()
+    assert wheel.advance(WHEEL_SIZE - 1) == 0
+    assert time.perf_counter() - start < 0.01
+    assert len(wheel) == 100000
+
+# Checks if frightened mode lasts its seconds in ticks, and a second power-up starts it again
+def test_frightened_countdown(game):
+    no_ghosts = pygame.sprite.Group()
+    apply_effect_to_tile(TileView(game.map.store, 2, 4), game.player, game, game.ghosts)
+    assert game.vulnerable_mode and game.vulnerable_timer == game.frightened_time
+    for _ in range(TICKS_PER_SECOND * 10):
+        game.effects(no_ghosts)
+    assert game.vulnerable_timer == game.frightened_time - 10
+    apply_effect_to_tile(TileView(game.map.store, 27, 4), game.player, game, game.ghosts)
+    assert game.vulnerable_timer == game.frightened_time and len(game.timers) == 1
+    for _ in range(TICKS_PER_SECOND * game.frightened_time - 1):
+        game.effects(no_ghosts)
+    assert game.vulnerable_mode and game.vulnerable_timer == 1
+    game.effects(no_ghosts)
+    assert not game.vulnerable_mode and len(game.timers) == 0
+    assert all(ghost.speed == ghost.base_speed and not ghost.freightened for ghost in game.ghosts)
+    game.map.reset()
+
+"""
+RESULTS TESTING
+"""
+# Checks if the best scores, counts and percentiles follow the filters
+def test_result_store_queries(tmp_path):
+    store = ResultStore(tmp_path / 'results.sqlite3')
+    rng = np.random.default_rng(0)
+    scores = rng.integers(0, 5000, 3000)
+    for index, score in enumerate(scores.tolist()):
+        store.add(score, seed=index % 3, ghosts='Pinky,Blinky' if index % 2 else '', level=2, won=score > 4000, played=1000.0 + index)
+    store.flush()
+    best = store.top(3)
+    assert [row[0] for row in best] == sorted(scores.tolist(), reverse=True)[:3]
+    assert store.top(1, ghosts='Pinky,Blinky')[0][2] == 'Pinky,Blinky'
+    assert [row[0] for row in store.top(5, seed=1)] == sorted(scores[1::3].tolist(), reverse=True)[:5]
+    assert store.count(seed=2, ghosts='') == len(scores[2::6]) and store.count(since=1500.0, until=2000.0) == 500
+    assert store.count(ghosts='Inky') == 0 and store.top(ghosts='Inky') == []
+    ranks = np.sort(scores[:1000])
+    assert store.percentiles((0.0, 0.5, 0.99, 1.0), until=2000.0) == {0.0: ranks[0], 0.5: ranks[499], 0.99: ranks[989], 1.0: ranks[999]}
+    assert store.percentiles((0.5,), seed=7) == {0.5: None}
+    store.close()
+
+# Checks if results are inserted a batch at a time and kept with their ghost configurations
+def test_result_store_batches(tmp_path, game):
+    store = ResultStore(tmp_path / 'results.sqlite3', batch=3)
+    for score in range(7):
+        store.add(score, ghosts='Clyde')
+    assert store.inserted == 6 and len(store.pending) == 1
+    store.close()
+    store = ResultStore(tmp_path / 'results.sqlite3')
+    store.add_game(game, False)
+    assert store.count() == 8 and store.configs == {'Clyde': 1, ghost_config(game.ghosts): 2}
+    assert store.top(1, ghosts='Pinky,Blinky,Inky,Clyde')[0][:6] == (game.player.score, None, 'Pinky,Blinky,Inky,Clyde', 1, 0, game.player.lives)
+    store.close()
+
+# Checks if the queries walk an index instead of sorting or scanning the table
+@pytest.mark.parametrize("filters", [{}, {'seed': 1}, {'ghosts': 'Clyde'}])
+def test_result_store_indexes(tmp_path, filters):
+    store = ResultStore(tmp_path / 'results.sqlite3')
+    store.add_many([(1, 1, 'Clyde', 1, 0, 0, 0, 0.0)])
+    statements = []
+    connection = store.reader()
+    # The trace has the statements with their parameters in place
+    connection.set_trace_callback(statements.append)
+    store.top(**filters)
+    store.percentiles(**filters)
+    connection.set_trace_callback(None)
+    plans = [connection.execute('EXPLAIN QUERY PLAN ' + statement).fetchall() for statement in statements]
+    details = [row[-1] for plan in plans for row in plan]
+    # Only equal scores are sorted again, by id
+    assert not any(detail in ('USE TEMP B-TREE FOR ORDER BY', 'SCAN results') for detail in details)
+    store.close()
+
+# Checks if a run of games is stored at more than 100k rows a second
+def test_result_store_throughput(tmp_path):
+    store = ResultStore(tmp_path / 'results.sqlite3')
+    rng = np.random.default_rng(0)
+    rows = list(zip(rng.integers(0, 5000, 200000).tolist(), range(200000), ['Pinky,Blinky,Inky,Clyde'] * 200000, [1] * 200000, [0] * 200000, [0] * 200000, [3000] * 200000, [1000.0] * 200000))
+    start = time.perf_counter()
+    store.add_many(rows[:100000])
+    store.add_many(rows[100000:])
+    assert 200000 / (time.perf_counter() - start) > 100000
+    assert store.count() == 200000
+    store.close()
+
+# Checks if the menu's leaderboard reads the scores on the reader thread and wakes the menu
+def test_leaderboard(tmp_path, game):
+    leaderboard = Leaderboard(ResultStore(tmp_path / 'results.sqlite3'), count=2)
+    pygame.event.clear()
+    game.player.score = 1230
+    leaderboard.record(game, True)
+    leaderboard.query.result()
+    assert pygame.event.wait(1000).type == LEADERBOARD_READY
+    assert leaderboard.update()[0][0] == 1230 and leaderboard.query is None
+    leaderboard.draw(pygame.Surface((795, 900)), (397, 730))
+    leaderboard.close()
+
+"""
+HEATMAP TESTING
+"""
+# Checks if every center counts on its tile, and centers in the teleport on the edge tile
+def test_heatmap_record():
+    heatmap = Heatmap()
+    heatmap.record([(27, 27), (40, 27), (41, 27), (-20, 15 * 27), (820, 15 * 27)], [[(27, 54), (27, 54)]] * 5)
+    assert heatmap.pacman[1, 1] == 2 and heatmap.pacman[2, 1] == 1
+    assert heatmap.pacman[0, 15] == 1 and heatmap.pacman[29, 15] == 1
+    assert heatmap.ghosts[0, 1, 2] == 5 and heatmap.ghosts[1, 1, 2] == 5 and heatmap.ghosts[2:].sum() == 0
+    assert heatmap.ticks == 5
+
+# Checks if the heatmap of batched games counts every tick, lost life and eaten ghost
+def test_heatmap_batch():
+    heatmap = simulate(3, games=64, ticks=1500)
+    # The same games played again without a heatmap
+    played = BatchEngine(64, seed=3)
+    controller = wander(3)
+    for _ in range(1500):
+        if played.done.all():
+            break
+        played.step(controller(played))
+    assert heatmap.games == 64 and heatmap.pacman.sum() == heatmap.ticks and heatmap.ghosts.sum() == 4 * heatmap.ticks
+    assert not heatmap.pacman[~played.walkable].any()
+    assert heatmap.deaths.sum() == (3 - played.lives).sum() > 0
+    pickups = (played.coins[:, :-1] == 1).sum(axis=1) * 10 + (played.coins[:, :-1] == 2).sum(axis=1) * 50
+    assert heatmap.kills.sum() * 100 == (played.score - (242 * 10 + 4 * 50 - pickups)).sum()
+
+# Checks if a game observed tick by tick counts its deaths and kills from its events, while they are drained
+def test_heatmap_game_observer(game):
+    heatmap = Heatmap()
+    ghost = game.ghosts[0]
+    ghost.rect.center = game.player.rect.center
+    tile = (game.player.rect.centerx // 27, game.player.rect.centery // 27)
+    game.effects(pygame.sprite.Group(ghost))
+    heatmap.on_tick(game, 0)
+    game.events.drain()
+    ghost.freightened = True
+    ghost.rect.center = game.player.rect.center
+    game.effects(pygame.sprite.Group(ghost))
+    heatmap.on_tick(game, 1)
+    heatmap.on_tick(game, 2)
+    assert heatmap.deaths[tile] == 1 and heatmap.deaths.sum() == 1 and heatmap.kills.sum() == 1
+    assert heatmap.games == 1 and heatmap.ticks == 3 and heatmap.ghosts.sum() == 3 * len(game.ghosts)
+    game.player.lives = 3
+    ghost.freightened = False
+
+# Checks if the heatmaps of worker processes merge into the heatmap of all their games, and survive a file
+def test_heatmap_collect(tmp_path):
+    merged = collect([0, 1], games=16, ticks=300, workers=2)
+    expected = simulate(0, games=16, ticks=300).merge(simulate(1, games=16, ticks=300))
+    merged.save(tmp_path / 'heatmap.npz')
+    loaded = Heatmap.load(tmp_path / 'heatmap.npz')
+    for heatmap in (merged, loaded):
+        assert heatmap.games == 32 and heatmap.ticks == expected.ticks
+        assert all((heatmap.layer(name) == expected.layer(name)).all() for name in ('pacman', 'ghosts', 'ghost2', 'deaths', 'kills'))
+
+# Checks if a layer is drawn over the board, leaving the tiles never visited untouched
+def test_heatmap_render():
+    heatmap = Heatmap()
+    heatmap.record([(27, 27)] * 9 + [(54, 27)])
+    game_map = Map()
+    board = game_map.board_layer.bake().copy()
+    image = heatmap.render(game_map)
+    assert image.get_size() == board.get_size()
+    assert image.get_at((27, 27)) != board.get_at((27, 27)) and image.get_at((54, 27)) != board.get_at((54, 27))
+    assert image.get_at((27, 27)) != image.get_at((54, 27)) and image.get_at((81, 27)) == board.get_at((81, 27))
+
+"""
+AUTOPILOT TESTING
+"""
+# Checks if the danger field is the corridor distance from the nearest dangerous ghost
+def test_autopilot_danger_field():
+    pilot = Autopilot()
+    cells = np.array([[10 * 33 + 24, 20 * 33 + 24]])
+    field = pilot.danger_field(cells, np.array([[True, True]])).reshape(30, 33)
+    assert field[10, 24] == 0 and field[20, 24] == 0 and field[15, 24] == 5 and field[11, 23] == FAR
+    assert field[1, 15] == field[28, 15] + 1
+    assert (pilot.danger_field(cells, np.array([[False, False]])) == FAR).all()
+
+# Checks if Pacman turns away from a ghost coming at him, and chases it once it is frightened
+def test_autopilot_flees_and_chases(game):
+    pilot = Autopilot()
+    ghost = game.ghosts[0]
+    ghost.rect.center = (18 * 27, 24 * 27)
+    assert pilot.decide(GameView(game, 0)) == 1
+    ghost.rect.center = (12 * 27, 24 * 27)
+    assert pilot.decide(GameView(game, 1)) is None
+    ghost.freightened = True
+    game.vulnerable_timer = 10
+    game.player.direction = 1
+    assert pilot.decide(GameView(game, 2)) is None
+    ghost.rect.center = (18 * 27, 24 * 27)
+    assert pilot.decide(GameView(game, 3)) == 0
+
+# Checks if a Game and a BatchEngine in the same state get the same decision
+def test_autopilot_matches_batch(game):
+    pilot = Autopilot()
+    engine = BatchEngine(1, seed=0)
+    assert pilot.decide(GameView(game, 0)) is None and pilot.steer(engine)[0] == -1
+    game.ghosts[0].rect.center = (18 * 27, 24 * 27)
+    engine.ghosts[0, 0] = (18 * 27, 24 * 27)
+    assert pilot.decide(GameView(game, 1)) == pilot.steer(engine)[0] == 1
+    game.player.rect.center = (5 * 27 + 9, 24 * 27)
+    engine.pacman[0] = (5 * 27 + 9 - 10, 24 * 27 - 10)
+    assert pilot.decide(GameView(game, 1)) is None and pilot.steer(engine)[0] == -1
+
+# Checks if batched games on autopilot score more and lose fewer lives than wandering ones
+def test_autopilot_plays_batch():
+    scores = {}
+    for name, controller in (('wander', wander(0)), ('autopilot', Autopilot().steer)):
+        engine = BatchEngine(64, seed=0)
+        engine.run(3000, controller)
+        scores[name] = (engine.score.mean(), engine.lives.mean())
+    assert scores['autopilot'][0] > 2 * scores['wander'][0] and scores['autopilot'][1] > scores['wander'][1]
+
+# Checks if the autopilot plays a game within the frame budget, each decision well under a millisecond
+def test_autopilot_plays_game(game):
+    harness = ControllerHarness(Autopilot())
+    ghosts = pygame.sprite.Group(game.ghosts)
+    for tick in range(600):
+        direction = harness.decide(GameView(game, tick))
+        if direction is not None:
+            game.player.direction = direction
+        game.update_players(tick % 20)
+        game.effects(ghosts)
+    report = harness.controller.report()
+    assert game.player.score > 200 and report['decisions'] == 600
+    assert report['mean_ms'] < 0.5 and report['p99_ms'] < 1
+    game.player.reset()
+    game.map.reset()
+
+"""
+SOAK TESTING
+"""
+# Checks if only series that never go down and grow past the tolerance are growing
+def test_soak_grows():
+    assert grows([1, 2, 2, 5])
+    assert not grows([1, 3, 2, 5])
+    assert not grows([1, 1, 1]) and not grows([1, 2, 3], tolerance=2)
+    assert not grows([1, 2])
+
+# Checks if a game played to its end without anyone there returns, and lets go of Pacman
+def test_soak_game_over_key(game):
+    game.observers.append(GameOverKey(30))
+    assert game.run_game(pygame.display.get_surface(), UnthrottledClock()) is False
+    assert game.events.tick == 29 and game.player.groups() == []
+    game.player.reset()
+    game.map.reset()
+
+class LeakyPilot(Autopilot):
+    """ An autopilot that keeps a Surface of every game it plays, and a copy of its pixels. """
+    def __init__(self):
+        super().__init__()
+        self.kept = []
+
+    def decide(self, view):
+        if view.tick == 0:
+            surface = pygame.Surface((64, 64))
+            self.kept.append((surface, pygame.image.tobytes(surface, 'RGBA')))
+        return super().decide(view)
+
+# Checks if a soak of the menu cycle finds nothing growing, and leaves no more channels playing or Surfaces alive
+def test_soak_clean():
+    soak = SoakHarness(cycles=6, interval=1, warmup=2, max_ticks=120)
+    # The test process holds what the other tests left, its heap still settles for a while
+    soak.tolerances['rss'] = 64 * 1024 * 1024
+    report = soak.run()
+    assert report['growing'] == [] and [sample['cycle'] for sample in report['samples']] == [2, 3, 4, 5, 6]
+    assert len({sample['channels'] for sample in report['samples']}) == 1
+    assert len({sample['surfaces'] for sample in report['samples']}) == 1
+
+# Checks if a soak reports leaked Surfaces, and the line allocating the leaked pixels
+def test_soak_finds_leak():
+    report = SoakHarness(cycles=5, interval=1, warmup=1, max_ticks=60, controller=LeakyPilot()).run()
+    assert 'surfaces' in report['growing']
+    assert any('test_pacman.py' in site for site in report['sites'])
+
+"""
+ASYNC LOOP TESTING
+"""
+# Checks if hooks run between the frames, a slow one skipping frames, while other tasks of the event loop keep running
+def test_async_loop_hooks(game):
+    calls = []
+    slow_calls = []
+    background = []
+
+    async def record(hooked, tick):
+        calls.append((tick, hooked.events.tick))
+
+    async def slow(hooked, tick):
+        slow_calls.append(tick)
+        await asyncio.sleep(0.05)
+
+    async def other_task():
+        while True:
+            background.append(time.perf_counter())
+            await asyncio.sleep(0.005)
+
+    async def play():
+        task = asyncio.ensure_future(other_task())
+        won = await game.run_game_async(pygame.display.get_surface(), hooks=(record, slow))
+        task.cancel()
+        return won
+
+    game.observers.append(GameOverKey(30))
+    assert asyncio.run(play()) is False
+    assert calls == [(tick, tick) for tick in range(29)]
+    assert 2 < len(slow_calls) < 15 and len(background) > 30
+    assert game.player.groups() == []
+    game.player.reset()
+    game.map.reset()
+
+# Checks if an error in a hook ends the game loop
+def test_async_loop_hook_error(game):
+    async def broken(hooked, tick):
+        raise ValueError(tick)
+
+    game.observers.append(GameOverKey(30))
+    with pytest.raises(ValueError):
+        asyncio.run(game.run_game_async(pygame.display.get_surface(), FramePacer(), hooks=(broken,)))
+    game.path_worker.shutdown()
+    game.level_loader.shutdown()
+    game.player.reset()
+    game.map.reset()
+
+# Checks if a frame that ends late starts a new schedule instead of hurrying the next ones
+def test_frame_pacer_resyncs():
+    times = FrameTimes()
+    pacer = FramePacer(times=times)
+
+    async def frames():
+        await pacer.wait()
+        time.sleep(0.05)
+        await pacer.wait()
+        await pacer.wait()
+
+    asyncio.run(frames())
+    assert pacer.resyncs == 1
+    assert times.times[2] - times.times[1] == pytest.approx(1 / 60, abs=0.003)
+
+# Checks if the asyncio loop keeps the frame rate, and paces most frames closer to it than the blocking loop
+def test_compare_pacing():
+    factory = GameFactory()
+    pilot = Autopilot()
+    reports = compare_pacing(lambda: factory.new_game(pilot), pygame.display.get_surface(), 90)
+    assert reports['blocking']['frames'] == reports['asyncio']['frames'] == 89
+    assert reports['asyncio']['mean_ms'] == pytest.approx(1000 / 60, abs=0.3)
+    # A background thread holding the GIL can delay a frame of either loop, most frames aren't
+    assert reports['asyncio']['median_error_ms'] < reports['blocking']['median_error_ms']